@@ -0,0 +1,536 @@
+"""
+Pluggable screen capture backends.
+
+    screenshot-tool backends [--measure]     # list backends, capabilities and cost
+
+A backend instance speaks the subset of the mss API the rest of the tool
+uses: a monitors list (index 0 being the whole virtual desktop), grab() of
+a region dict and close(). Frames look like an mss ScreenShot (raw, size,
+width, height) plus a pixel_format of 'BGRA' (mss's layout, assumed when
+absent) or 'RGB'. Backends produce their native format; convert_frame()
+and CaptureSession.grab(monitor, pixel_format) convert on request.
+
+Backends:
+    mss         mss (XShmGetImage/XGetImage, GDI, CoreGraphics); the default
+    xshm        direct X11 MIT-SHM via ctypes, reusing one shared segment across grabs
+    pillow      PIL.ImageGrab
+    synthetic   deterministic procedurally generated screens; needs no display
+
+Backend instances are not thread-safe; CaptureSession opens one per
+thread. Nothing in here imports tkinter.
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import sys
+import time
+
+from PIL import Image
+
+import config
+
+PIXEL_FORMATS = ('BGRA', 'RGB')
+
+
+class Frame:
+    """Grabbed pixels in the same shape as an mss ScreenShot.
+
+    When a backend already holds a decoded PIL image it is kept in image so
+    frame.frame_to_image can return it without another copy; raw is then
+    produced on first use.
+    """
+
+    def __init__(self, raw, monitor, pixel_format='BGRA', image=None):
+        self._raw = raw
+        self.image = image
+        self.pixel_format = pixel_format
+        self.left, self.top = monitor['left'], monitor['top']
+        self.width, self.height = monitor['width'], monitor['height']
+        self.size = (self.width, self.height)
+
+    @property
+    def raw(self):
+        if self._raw is None:
+            self._raw = self.image.tobytes("raw", "BGRX" if self.pixel_format == 'BGRA' else "RGB")
+        return self._raw
+
+
+def convert_frame(shot, pixel_format):
+    """Return shot in pixel_format, converting if needed"""
+    current = getattr(shot, 'pixel_format', 'BGRA')
+    if current == pixel_format:
+        return shot
+    monitor = {'left': shot.left, 'top': shot.top, 'width': shot.width, 'height': shot.height}
+    image = getattr(shot, 'image', None)
+    if image is None:
+        mode = "BGRX" if current == 'BGRA' else "RGB"
+        image = Image.frombuffer("RGB", shot.size, shot.raw, "raw", mode, 0, 1)
+    return Frame(None, monitor, pixel_format, image=image)
+
+
+class CaptureBackend:
+    """Base class of the backends; subclasses provide monitors and grab()"""
+
+    name = None
+    description = ""
+    native_formats = ('BGRA',)
+    # What the backend can do; 'cost' is a rough relative cost per megapixel (1 = mss)
+    capabilities = {}
+
+    @classmethod
+    def available(cls):
+        """(ok, reason) telling whether the backend can run here"""
+        return True, ""
+
+    @classmethod
+    def open(cls, **options):
+        return cls(**options)
+
+    @property
+    def monitors(self):
+        raise NotImplementedError
+
+    def requery_monitors(self):
+        """Drop the cached monitor list and query it again over the open connection"""
+        self._monitors = None
+        return self.monitors
+
+    def grab(self, region):
+        """Grab a region dict (left/top/width/height) in the native format"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _monitor_list():
+    """Monitor list from a short-lived mss instance, for backends that cannot enumerate monitors"""
+    import mss
+    with mss.mss() as sct:
+        return [dict(monitor) for monitor in sct.monitors]
+
+
+def requery_monitors(instance):
+    """Fresh monitor list of a backend instance, without reconnecting to the display"""
+    requery = getattr(instance, 'requery_monitors', None)
+    if requery is not None:
+        return requery()
+    # mss instances fill _monitors on first use and again once it is cleared
+    instance._monitors = None
+    return instance.monitors
+
+
+class MssBackend(CaptureBackend):
+    """mss itself; its instances already implement the backend interface"""
+
+    name = 'mss'
+    description = "mss (XShmGetImage/XGetImage on X11, GDI on Windows, CoreGraphics on macOS)"
+    capabilities = {'multi_monitor': True, 'needs_display': True, 'shared_memory': 'X11 only', 'cost': 1.0}
+
+    @classmethod
+    def available(cls):
+        try:
+            import mss  # noqa: F401
+        except ImportError:
+            return False, "mss is not installed"
+        return True, ""
+
+    @classmethod
+    def open(cls, **options):
+        import mss
+        return mss.mss()
+
+
+class _XImage(ctypes.Structure):
+    # Leading fields of Xlib's XImage; only ever used through pointers from Xlib
+    _fields_ = [
+        ('width', ctypes.c_int), ('height', ctypes.c_int), ('xoffset', ctypes.c_int), ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p), ('byte_order', ctypes.c_int), ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int), ('bitmap_pad', ctypes.c_int), ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int), ('bits_per_pixel', ctypes.c_int),
+    ]
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong), ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p), ('readOnly', ctypes.c_int),
+    ]
+
+
+class XShmBackend(CaptureBackend):
+    """Grabs straight into a System V shared-memory segment with XShmGetImage.
+
+    The segment is attached once and reused for every grab; it only grows
+    when a larger region is requested. Monitors are enumerated through mss.
+    """
+
+    name = 'xshm'
+    description = "direct X11 MIT-SHM (XShmGetImage) via ctypes, reusing one shared segment"
+    capabilities = {'multi_monitor': True, 'needs_display': True, 'shared_memory': True, 'local_only': True,
+                    'cost': 0.6}
+
+    ZPIXMAP = 2
+    ALL_PLANES = 0xFFFFFFFF
+    IPC_PRIVATE = 0
+    IPC_CREAT = 0o1000
+    IPC_RMID = 0
+
+    @classmethod
+    def _libraries(cls):
+        names = [ctypes.util.find_library(lib) for lib in ('X11', 'Xext', 'c')]
+        if not all(names):
+            return None
+        return tuple(ctypes.CDLL(name) for name in names)
+
+    @classmethod
+    def available(cls):
+        if not sys.platform.startswith('linux'):
+            return False, "MIT-SHM needs X11 on Linux"
+        libs = cls._libraries()
+        if libs is None:
+            return False, "libX11/libXext not found"
+        xlib, xext, _ = libs
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        display = xlib.XOpenDisplay(None)
+        if not display:
+            return False, "cannot open X display"
+        try:
+            xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+            if not xext.XShmQueryExtension(display):
+                return False, "X server lacks MIT-SHM (remote display?)"
+        finally:
+            xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+            xlib.XCloseDisplay(display)
+        return True, ""
+
+    def __init__(self, **options):
+        libs = self._libraries()
+        if libs is None:
+            raise RuntimeError("libX11/libXext not found")
+        self.xlib, self.xext, self.libc = libs
+        self._declare()
+        self.display = self.xlib.XOpenDisplay(None)
+        if not self.display:
+            raise RuntimeError("cannot open X display")
+        if not self.xext.XShmQueryExtension(self.display):
+            self.xlib.XCloseDisplay(self.display)
+            raise RuntimeError("X server lacks MIT-SHM")
+        screen = self.xlib.XDefaultScreen(self.display)
+        self.root = self.xlib.XDefaultRootWindow(self.display)
+        self.visual = self.xlib.XDefaultVisual(self.display, screen)
+        self.depth = self.xlib.XDefaultDepth(self.display, screen)
+        # One segment info for the instance's lifetime: the XImage keeps a pointer to it
+        self.shminfo = _XShmSegmentInfo()
+        self.segment = None
+        self.capacity = 0
+        self.ximage = None
+        self.ximage_size = None
+        self._monitors = None
+
+    def _declare(self):
+        xlib, xext, libc = self.xlib, self.xext, self.libc
+        vp, ul, i = ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int
+        xlib.XOpenDisplay.restype, xlib.XOpenDisplay.argtypes = vp, [ctypes.c_char_p]
+        xlib.XCloseDisplay.argtypes = [vp]
+        xlib.XDefaultScreen.argtypes = [vp]
+        xlib.XDefaultRootWindow.restype, xlib.XDefaultRootWindow.argtypes = ul, [vp]
+        xlib.XDefaultVisual.restype, xlib.XDefaultVisual.argtypes = vp, [vp, i]
+        xlib.XDefaultDepth.argtypes = [vp, i]
+        xlib.XSync.argtypes = [vp, i]
+        xlib.XFree.argtypes = [vp]
+        xext.XShmQueryExtension.argtypes = [vp]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmCreateImage.argtypes = [vp, vp, ctypes.c_uint, i, vp, ctypes.POINTER(_XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmAttach.argtypes = [vp, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [vp, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [vp, ul, ctypes.POINTER(_XImage), i, i, ul]
+        libc.shmget.argtypes = [i, ctypes.c_size_t, i]
+        libc.shmat.restype, libc.shmat.argtypes = vp, [i, vp, i]
+        libc.shmdt.argtypes = [vp]
+        libc.shmctl.argtypes = [i, i, vp]
+
+    @property
+    def monitors(self):
+        if self._monitors is None:
+            self._monitors = _monitor_list()
+        return self._monitors
+
+    def _ensure_segment(self, nbytes):
+        """Attach a segment of at least nbytes, reusing the current one when it fits"""
+        if self.segment is not None and nbytes <= self.capacity:
+            return
+        self._detach_segment()
+        segment = self.shminfo
+        segment.shmid = self.libc.shmget(self.IPC_PRIVATE, nbytes, self.IPC_CREAT | 0o600)
+        if segment.shmid < 0:
+            raise RuntimeError("shmget failed")
+        segment.shmaddr = self.libc.shmat(segment.shmid, None, 0)
+        if segment.shmaddr in (None, ctypes.c_void_p(-1).value):
+            self.libc.shmctl(segment.shmid, self.IPC_RMID, None)
+            raise RuntimeError("shmat failed")
+        segment.readOnly = 0
+        if not self.xext.XShmAttach(self.display, ctypes.byref(segment)):
+            self.libc.shmdt(segment.shmaddr)
+            self.libc.shmctl(segment.shmid, self.IPC_RMID, None)
+            raise RuntimeError("XShmAttach failed")
+        self.xlib.XSync(self.display, 0)
+        # Removed once both sides detach, so a crash cannot leak the segment
+        self.libc.shmctl(segment.shmid, self.IPC_RMID, None)
+        self.segment = segment
+        self.capacity = nbytes
+
+    def _release_segment(self):
+        self._free_ximage()
+        self._detach_segment()
+
+    def _detach_segment(self):
+        if self.segment is not None:
+            self.xext.XShmDetach(self.display, ctypes.byref(self.segment))
+            self.xlib.XSync(self.display, 0)
+            self.libc.shmdt(self.segment.shmaddr)
+            self.segment = None
+            self.capacity = 0
+
+    def _free_ximage(self):
+        if self.ximage is not None:
+            # The pixel data lives in the segment; only the XImage header is freed
+            self.ximage.contents.data = None
+            self.xlib.XFree(self.ximage)
+            self.ximage = None
+            self.ximage_size = None
+
+    def grab(self, region):
+        width, height = region['width'], region['height']
+        if self.ximage_size != (width, height):
+            self._free_ximage()
+            self.ximage = self.xext.XShmCreateImage(
+                self.display, self.visual, self.depth, self.ZPIXMAP, None,
+                ctypes.byref(self.shminfo), width, height
+            )
+            if not self.ximage:
+                raise RuntimeError("XShmCreateImage failed")
+            self.ximage_size = (width, height)
+        image = self.ximage.contents
+        if image.bits_per_pixel != 32:
+            raise RuntimeError(f"unsupported X visual: {image.bits_per_pixel} bits per pixel")
+        # Rows can be padded, so size the segment from the image's own stride
+        self._ensure_segment(image.bytes_per_line * image.height)
+        image.data = self.segment.shmaddr
+        if not self.xext.XShmGetImage(self.display, self.root, self.ximage,
+                                      region['left'], region['top'], self.ALL_PLANES):
+            raise RuntimeError("XShmGetImage failed")
+        # Copy out of the segment; it is overwritten by the next grab
+        raw = bytearray(ctypes.string_at(self.segment.shmaddr, image.bytes_per_line * height))
+        if image.bytes_per_line != width * 4:
+            row = width * 4
+            raw = bytearray(b"".join(raw[y * image.bytes_per_line:y * image.bytes_per_line + row]
+                                     for y in range(height)))
+        return Frame(raw, region)
+
+    def close(self):
+        if self.display:
+            self._release_segment()
+            self.xlib.XCloseDisplay(self.display)
+            self.display = None
+
+
+class PillowBackend(CaptureBackend):
+    name = 'pillow'
+    description = "PIL.ImageGrab (X11 via XCB, Windows, macOS)"
+    native_formats = ('RGB',)
+    capabilities = {'multi_monitor': True, 'needs_display': True, 'shared_memory': False, 'cost': 1.5}
+
+    @classmethod
+    def available(cls):
+        try:
+            from PIL import ImageGrab  # noqa: F401
+        except ImportError as e:
+            return False, str(e)
+        return True, ""
+
+    def __init__(self, **options):
+        from PIL import ImageGrab
+        self.image_grab = ImageGrab
+        self._monitors = None
+
+    @property
+    def monitors(self):
+        if self._monitors is None:
+            try:
+                self._monitors = _monitor_list()
+            except Exception:
+                # ImageGrab cannot enumerate monitors; treat the whole screen as one
+                width, height = self.image_grab.grab(all_screens=True).size
+                screen = {'left': 0, 'top': 0, 'width': width, 'height': height}
+                self._monitors = [screen, dict(screen)]
+        return self._monitors
+
+    def grab(self, region):
+        bbox = (region['left'], region['top'], region['left'] + region['width'], region['top'] + region['height'])
+        image = self.image_grab.grab(bbox=bbox, all_screens=True).convert("RGB")
+        return Frame(None, region, 'RGB', image=image)
+
+
+def parse_layout(spec):
+    """Parse 'WxH+X+Y,WxH+X+Y' into an mss-style monitor list"""
+    monitors = []
+    for part in spec.split(','):
+        size, _, position = part.strip().partition('+')
+        width, height = (int(v) for v in size.split('x'))
+        left, top = (int(v) for v in position.split('+')) if position else (0, 0)
+        monitors.append({'left': left, 'top': top, 'width': width, 'height': height})
+    left = min(m['left'] for m in monitors)
+    top = min(m['top'] for m in monitors)
+    right = max(m['left'] + m['width'] for m in monitors)
+    bottom = max(m['top'] + m['height'] for m in monitors)
+    return [{'left': left, 'top': top, 'width': right - left, 'height': bottom - top}] + monitors
+
+
+class SyntheticBackend(CaptureBackend):
+    """Procedurally generated screens for tests and benchmarks.
+
+    Pixels depend only on their desktop coordinates and the seed, so any
+    region grabbed twice, or grabbed as part of a larger region, has the
+    same pixels. Areas outside every monitor are black, like a real
+    multi-head desktop.
+    """
+
+    name = 'synthetic'
+    description = "deterministic procedurally generated screens (no display needed)"
+    capabilities = {'multi_monitor': True, 'needs_display': False, 'shared_memory': False, 'cost': 0.2}
+
+    TILE = 256
+
+    def __init__(self, layout="1920x1080+0+0,1920x1080+1920+0", seed=0, **options):
+        self._monitors = parse_layout(layout)
+        self.seed = seed
+        self._desktop = None
+
+    @property
+    def monitors(self):
+        return self._monitors
+
+    def requery_monitors(self):
+        # The layout is fixed at construction
+        return self._monitors
+
+    def _tile_rows(self):
+        """BGRA rows of one TILE x TILE pattern tile"""
+        rows = []
+        for y in range(self.TILE):
+            row = bytearray(self.TILE * 4)
+            for x in range(self.TILE):
+                row[x * 4:x * 4 + 4] = bytes(((x ^ y) + self.seed & 255, y, x, 255))
+            rows.append(bytes(row))
+        return rows
+
+    def _build_desktop(self):
+        virtual = self._monitors[0]
+        width, height = virtual['width'], virtual['height']
+        tile_rows = self._tile_rows()
+        desktop = bytearray(width * height * 4)
+        view = memoryview(desktop)
+        for monitor in self._monitors[1:]:
+            x0, y0 = monitor['left'] - virtual['left'], monitor['top'] - virtual['top']
+            for y in range(y0, y0 + monitor['height']):
+                pattern = tile_rows[y % self.TILE]
+                # Rotate the tile row so the pattern is anchored to desktop coordinates
+                start = x0 % self.TILE * 4
+                pattern = pattern[start:] + pattern[:start]
+                row = (pattern * (monitor['width'] // self.TILE + 1))[:monitor['width'] * 4]
+                offset = (y * width + x0) * 4
+                view[offset:offset + len(row)] = row
+        return desktop
+
+    def grab(self, region):
+        if self._desktop is None:
+            self._desktop = self._build_desktop()
+        virtual = self._monitors[0]
+        stride = virtual['width'] * 4
+        row = region['width'] * 4
+        raw = bytearray(row * region['height'])
+        for y in range(region['height']):
+            desktop_y = region['top'] - virtual['top'] + y
+            if not 0 <= desktop_y < virtual['height']:
+                continue
+            x = region['left'] - virtual['left']
+            x1, x2 = max(x, 0), min(x + region['width'], virtual['width'])
+            if x2 > x1:
+                src = desktop_y * stride + x1 * 4
+                dst = y * row + (x1 - x) * 4
+                raw[dst:dst + (x2 - x1) * 4] = self._desktop[src:src + (x2 - x1) * 4]
+        return Frame(raw, region)
+
+
+BACKENDS = {backend.name: backend for backend in (MssBackend, XShmBackend, PillowBackend, SyntheticBackend)}
+
+
+def get_backend(name):
+    """Backend class registered under name"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"unknown capture backend '{name}'; choose from {', '.join(BACKENDS)}")
+
+
+def create_backend(name='mss', **options):
+    """Open an instance of the named backend"""
+    return get_backend(name).open(**options)
+
+
+def measure_cost(instance, repeat=3):
+    """Best measured milliseconds per megapixel for grabbing the first monitor"""
+    monitors = instance.monitors
+    monitor = monitors[1] if len(monitors) > 1 else monitors[0]
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        instance.grab(monitor)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000 / (monitor['width'] * monitor['height'] / 1e6)
+
+
+def backend_options(settings):
+    """Backend constructor options taken from the settings"""
+    return {'layout': settings.get('synthetic_layout', "1920x1080+0+0,1920x1080+1920+0")} \
+        if settings.get('capture_backend', 'mss') == 'synthetic' else {}
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool backends'"""
+    parser = argparse.ArgumentParser(prog="screenshot-tool backends", description="List capture backends")
+    parser.add_argument("--measure", action="store_true", help="time a grab of the first monitor with each backend")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+    selected = settings.get('capture_backend', 'mss')
+
+    for name, backend in BACKENDS.items():
+        ok, reason = backend.available()
+        marker = "*" if name == selected else " "
+        print(f"{marker} {name:<10} {backend.description}")
+        caps = ", ".join(f"{key}={value}" for key, value in backend.capabilities.items())
+        print(f"    formats={'/'.join(backend.native_formats)}, {caps}")
+        if not ok:
+            print(f"    unavailable: {reason}")
+        elif args.measure:
+            try:
+                instance = create_backend(name, **(backend_options(settings) if name == selected else {}))
+                try:
+                    print(f"    measured: {measure_cost(instance):.1f} ms per megapixel")
+                finally:
+                    instance.close()
+            except Exception as e:
+                print(f"    measurement failed: {e}")
+    return 0
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-desktop grab, single bounding-box grab vs parallel per-monitor grabs.
+
+Times ``DesktopGrabber.grab`` with each method on 1-, 2- and 4-monitor
+layouts and reports the best wall time plus the timestamp spread between
+monitors. Layouts are rectangles of the X root window, so with --xvfb the
+benchmark starts its own Xvfb with one screen per monitor, joined by
+Xinerama, and needs no real display:
+
+    python benchmarks/bench_desktop_grab.py --xvfb [--repeat N]
+    python benchmarks/bench_desktop_grab.py            # uses $DISPLAY
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import capture_session  # noqa: E402
+import desktop_grab  # noqa: E402
+
+MONITOR_WIDTH, MONITOR_HEIGHT = 1920, 1080
+
+
+def layout(count):
+    """mss-style monitor list for count monitors side by side"""
+    monitors = [
+        {'left': i * MONITOR_WIDTH, 'top': 0, 'width': MONITOR_WIDTH, 'height': MONITOR_HEIGHT}
+        for i in range(count)
+    ]
+    virtual = {'left': 0, 'top': 0, 'width': count * MONITOR_WIDTH, 'height': MONITOR_HEIGHT}
+    return [virtual] + monitors
+
+
+def start_xvfb(display, screens):
+    """Start Xvfb with one screen per monitor, joined into one root by Xinerama"""
+    if not shutil.which("Xvfb"):
+        sys.exit("Xvfb not found; install it or run without --xvfb")
+    cmd = ["Xvfb", display, "+xinerama", "-nolisten", "tcp"]
+    for screen in range(screens):
+        cmd += ["-screen", str(screen), f"{MONITOR_WIDTH}x{MONITOR_HEIGHT}x24"]
+    server = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = display
+    return server
+
+
+def time_method(grabber, monitors, method, repeat):
+    best = float("inf")
+    skew = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        desktop = grabber.grab(monitors, method=method)
+        elapsed = time.perf_counter() - start
+        if elapsed < best:
+            best, skew = elapsed, desktop.skew_ms
+    return best, skew
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="rounds per layout (best time is reported)")
+    parser.add_argument("--xvfb", action="store_true", help="run against a private multi-screen Xvfb")
+    parser.add_argument("--display", default=":99", help="display number for --xvfb (default: %(default)s)")
+    args = parser.parse_args()
+
+    counts = (1, 2, 4)
+    server = start_xvfb(args.display, max(counts)) if args.xvfb else None
+    try:
+        with capture_session.CaptureSession() as session:
+            grabber = desktop_grab.DesktopGrabber(session)
+            print(f"{'monitors':>8} | {'single ms':>9} | {'parallel ms':>11} | {'skew ms':>7} | {'faster':>8}")
+            print("-" * 56)
+            for count in counts:
+                monitors = layout(count)
+                single_s, _ = time_method(grabber, monitors, 'single', args.repeat)
+                parallel_s, skew = time_method(grabber, monitors, 'parallel', args.repeat)
+                faster = 'parallel' if parallel_s < single_s else 'single'
+                print(f"{count:>8} | {single_s * 1000:9.1f} | {parallel_s * 1000:11.1f} | {skew:7.2f} | {faster:>8}")
+            grabber.close()
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
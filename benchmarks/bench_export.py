@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: output size and encode time per export policy.
+
+Encodes a fixed corpus of generated screenshots (flat UI, antialiased UI,
+code editor, photo-like, and UI with an embedded photo) with plain PNG,
+each explicit format and each quality policy of format 'auto', and reports
+the chosen format, bytes and best encode time. The corpus is seeded, so
+numbers are comparable between runs. No display is needed.
+
+    python benchmarks/bench_export.py [--repeat N] [--scale S]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import capture  # noqa: E402
+import export  # noqa: E402
+
+# (label, format, policy) encodings measured for every image
+CASES = [
+    ("png (default)", 'PNG', 'lossless'),
+    ("png8", 'PNG8', 'lossless'),
+    ("webp lossless", 'WEBP', 'lossless'),
+    ("jpeg q90", 'JPEG', 'balanced'),
+    ("qoi", 'QOI', 'lossless'),
+] + [(f"auto/{policy}", 'AUTO', policy) for policy in export.QUALITY_POLICIES]
+
+
+def flat_ui(width, height, rng):
+    """Window chrome, buttons and solid panels: a few dozen colors"""
+    img = Image.new("RGB", (width, height), (236, 236, 236))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, width, 32), fill=(45, 45, 48))
+    draw.rectangle((0, 32, 220, height), fill=(250, 250, 250))
+    for i in range(40):
+        x, y = rng.randrange(240, width - 160), rng.randrange(48, height - 40)
+        draw.rectangle((x, y, x + 140, y + 28), fill=(0, 120, 215), outline=(0, 90, 180))
+    return img
+
+
+def antialiased_ui(width, height, rng):
+    """Flat UI with smooth text and rounded shapes, well over 256 colors"""
+    small = Image.new("RGB", (width // 2, height // 2), (250, 250, 250))
+    draw = ImageDraw.Draw(small)
+    for row in range(0, height // 2, 14):
+        draw.text((8, row), "The quick brown fox %d jumps over the lazy dog" % row, fill=(30, 30, 30))
+    for _ in range(20):
+        x, y = rng.randrange(width // 4), rng.randrange(height // 2)
+        draw.ellipse((x, y, x + 40, y + 40), fill=(rng.randrange(256), 120, 200))
+    return small.resize((width, height), Image.BICUBIC)
+
+
+def code_editor(width, height, rng):
+    """Dark editor with syntax-coloured monospace text"""
+    img = Image.new("RGB", (width, height), (30, 30, 30))
+    draw = ImageDraw.Draw(img)
+    colors = [(86, 156, 214), (206, 145, 120), (181, 206, 168), (212, 212, 212), (197, 134, 192)]
+    for row in range(0, height, 16):
+        x = 40
+        while x < width - 80:
+            word = "".join(rng.choice("abcdefghij_(){}=") for _ in range(rng.randrange(2, 10)))
+            draw.text((x, row), word, fill=rng.choice(colors))
+            x += 8 * len(word) + 8
+    return img
+
+
+def photo(width, height, rng):
+    """Smooth gradients with sensor-like noise"""
+    red = Image.effect_mandelbrot((width, height), (-2.2, -1.4, 0.9, 1.4), 80)
+    green = Image.linear_gradient("L").resize((width, height))
+    blue = Image.radial_gradient("L").resize((width, height))
+    base = Image.merge("RGB", (red, green, blue)).filter(ImageFilter.GaussianBlur(3))
+    noise = Image.merge("RGB", [Image.effect_noise((width, height), 12 + 4 * i) for i in range(3)])
+    return Image.blend(base, noise, 0.15)
+
+
+def ui_with_photo(width, height, rng):
+    """A browser-like page: flat UI around a photo"""
+    img = flat_ui(width, height, rng)
+    img.paste(photo(width // 2, height // 2, rng), (width // 4, height // 4))
+    return img
+
+
+CORPUS = [
+    ("flat ui", flat_ui),
+    ("aa ui", antialiased_ui),
+    ("code", code_editor),
+    ("photo", photo),
+    ("ui+photo", ui_with_photo),
+]
+
+
+def time_encode(img, image_format, policy, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data, plan = export.encode(img, image_format, policy)
+        best = min(best, time.perf_counter() - start)
+    return data, plan, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per encoding (best time is reported)")
+    parser.add_argument("--scale", type=float, default=1.0, help="corpus image size relative to 1920x1080")
+    args = parser.parse_args()
+
+    width, height = int(1920 * args.scale), int(1080 * args.scale)
+    print(f"Corpus: {len(CORPUS)} images at {width}x{height}\n")
+    print(f"{'image':>9} | {'encoding':>16} | {'chosen':>16} | {'KB':>8} | {'vs png':>6} | {'ms':>7}")
+    print("-" * 76)
+    totals = {}
+    for name, make in CORPUS:
+        img = make(width, height, random.Random(name))
+        start = time.perf_counter()
+        stats = export.analyze(img)
+        analyze_ms = (time.perf_counter() - start) * 1000
+        png_size = len(capture.encode_image(img, 'PNG'))
+        for label, image_format, policy in CASES:
+            data, plan, seconds = time_encode(img, image_format, policy, args.repeat)
+            size, ms = totals.get(label, (0, 0.0))
+            totals[label] = (size + len(data), ms + seconds * 1000)
+            print(
+                f"{name:>9} | {label:>16} | {plan.label:>16} | {len(data) / 1024:8.1f} | "
+                f"{len(data) / png_size:6.2f} | {seconds * 1000:7.1f}"
+            )
+        print(f"{'':>9}   {stats!r}, analyzed in {analyze_ms:.1f} ms")
+        print("-" * 76)
+
+    print("\nCorpus totals")
+    png_total = totals["png (default)"][0]
+    for label, (size, ms) in totals.items():
+        print(f"  {label:>16}: {size / 1024:9.1f} KB ({size / png_total:5.2f} x png), {ms:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
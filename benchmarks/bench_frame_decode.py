@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decoding a grabbed BGRA frame into a PIL image.
+
+Compares the legacy ``Image.frombytes("RGB", size, shot.rgb)`` path with
+``frame.frame_to_image`` and reports wall time and the peak of temporary
+Python allocations per capture, measured with tracemalloc. The decoded
+image itself lives in Pillow's own memory, which tracemalloc does not see
+and which is the same size on both paths. Runs on synthetic frames, so no
+display is needed.
+
+    python benchmarks/bench_frame_decode.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+from PIL import Image
+from mss.screenshot import ScreenShot
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import frame  # noqa: E402
+
+SIZES = [
+    ("1920x1080", 1920, 1080),
+    ("3840x2160", 3840, 2160),
+    ("7680x2160", 7680, 2160),
+]
+
+
+def legacy_decode(shot):
+    return Image.frombytes("RGB", shot.size, shot.rgb)
+
+
+def time_decode(decode, data, width, height, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        # A fresh ScreenShot each round so mss's cached rgb is not reused
+        shot = ScreenShot.from_size(data, width, height)
+        start = time.perf_counter()
+        decode(shot)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def peak_allocated(decode, data, width, height):
+    """Peak bytes allocated through Python while decoding one frame"""
+    shot = ScreenShot.from_size(data, width, height)
+    tracemalloc.start()
+    try:
+        decode(shot)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per size (best time is reported)")
+    args = parser.parse_args()
+
+    print(f"{'frame':>10} | {'legacy ms':>9} | {'legacy tmp MB':>13} | {'frame ms':>8} | {'frame tmp MB':>12}")
+    print("-" * 66)
+    for label, width, height in SIZES:
+        data = bytearray(os.urandom(1024)) * (width * height * 4 // 1024)
+        reference = legacy_decode(ScreenShot.from_size(data, width, height))
+        assert frame.frame_to_image(ScreenShot.from_size(data, width, height)).tobytes() == reference.tobytes()
+        del reference
+
+        legacy_s = time_decode(legacy_decode, data, width, height, args.repeat)
+        frame_s = time_decode(frame.frame_to_image, data, width, height, args.repeat)
+        # Measured apart from the timings, which tracemalloc would slow down
+        legacy_peak = peak_allocated(legacy_decode, data, width, height)
+        frame_peak = peak_allocated(frame.frame_to_image, data, width, height)
+        print(
+            f"{label:>10} | {legacy_s * 1000:9.1f} | {legacy_peak / 1e6:13.1f} | "
+            f"{frame_s * 1000:8.1f} | {frame_peak / 1e6:12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
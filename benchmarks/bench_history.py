@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark: history store against plain PNGs on a recorded capture sequence.
+
+Stores a sequence of captures of one region once as plain PNG files and
+once in a history_store.HistoryStore, and reports disk usage, write time
+and random-access decode time (mean, p95, worst) before and after
+compaction. Every frame read back is compared with the original pixels.
+
+Without --frames the sequence is generated: a code editor being typed in,
+with a blinking cursor and a ticking clock, switching to another window
+every 100 captures. --frames DIR replays a real recording instead (image
+files of one size, in name order).
+
+    python benchmarks/bench_history.py [--frames DIR] [--count N] [--reads N] [--interval K]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import history_store  # noqa: E402
+from bench_export import antialiased_ui, code_editor, flat_ui  # noqa: E402
+
+
+def recorded_session(count, width=1920, height=1080):
+    """Yield count captures of a desktop where a little changes between captures"""
+    rng = random.Random("history")
+    scenes = [make(width, height, random.Random(make.__name__)) for make in (code_editor, flat_ui, antialiased_ui)]
+    img = scenes[0].copy()
+    x, y = 40, 16
+    for index in range(count):
+        if index and index % 100 == 0:
+            img = scenes[index // 100 % len(scenes)].copy()
+            x, y = 40, 16
+        draw = ImageDraw.Draw(img)
+        # A few typed characters, wrapping onto the next line
+        for _ in range(rng.randrange(0, 4)):
+            draw.text((x, y), rng.choice("abcdefghij_(){}="), fill=(212, 212, 212))
+            x += 8
+            if x > width // 2:
+                x, y = 40, (y + 16) % height
+        # Blinking cursor and a clock in the corner
+        draw.rectangle((x, y, x + 1, y + 12), fill=(255, 255, 255) if index % 2 else (30, 30, 30))
+        draw.rectangle((width - 80, height - 20, width, height), fill=(45, 45, 48))
+        draw.text((width - 72, height - 16), time.strftime("%H:%M:%S", time.gmtime(index)), fill=(200, 200, 200))
+        yield img.copy()
+
+
+def load_frames(directory):
+    for name in sorted(os.listdir(directory)):
+        with Image.open(os.path.join(directory, name)) as img:
+            yield img.convert("RGB")
+
+
+def directory_bytes(directory):
+    return sum(
+        os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(directory) for name in names
+    )
+
+
+def timed_reads(read, ids, frames):
+    times = []
+    for frame_id in ids:
+        start = time.perf_counter()
+        img = read(frame_id)
+        times.append(time.perf_counter() - start)
+        assert img.tobytes() == frames[frame_id].tobytes(), f"frame {frame_id} does not round-trip"
+    times.sort()
+    return (
+        sum(times) / len(times) * 1000,
+        times[int(len(times) * 0.95)] * 1000,
+        times[-1] * 1000,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", metavar="DIR", help="replay these captures instead of a generated session")
+    parser.add_argument("--count", type=int, default=300, help="captures in the generated session")
+    parser.add_argument("--reads", type=int, default=100, help="random frames decoded per measurement")
+    parser.add_argument("--interval", type=int, default=history_store.KEYFRAME_INTERVAL,
+                        help="keyframe interval for compaction")
+    args = parser.parse_args()
+
+    source = load_frames(args.frames) if args.frames else recorded_session(args.count)
+    with tempfile.TemporaryDirectory() as tmp:
+        png_dir = os.path.join(tmp, "png")
+        os.makedirs(png_dir)
+        store = history_store.HistoryStore(os.path.join(tmp, "history"), keyframe_interval=args.interval, fsync='none')
+        frames, ids = {}, []
+        png_s = history_s = 0.0
+        for index, img in enumerate(source):
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG")
+            with open(os.path.join(png_dir, f"{index:06d}.png"), "wb") as f:
+                f.write(buffer.getvalue())
+            png_s += time.perf_counter() - start
+            start = time.perf_counter()
+            frame_id = store.add(img, (0, 0) + img.size)
+            history_s += time.perf_counter() - start
+            frames[frame_id] = img
+            ids.append(frame_id)
+
+        label = f"{len(ids)} captures of {frames[ids[0]].size[0]}x{frames[ids[0]].size[1]}"
+        print(f"{label}; random reads of {args.reads} frames\n")
+        print(f"{'storage':>22} | {'MB':>8} | {'write ms':>8} | {'read ms':>7} | {'p95':>7} | {'worst':>7}")
+        print("-" * 76)
+        sample = [random.Random(len(ids)).choice(ids) for _ in range(args.reads)]
+        paths = {frame_id: os.path.join(png_dir, f"{index:06d}.png") for index, frame_id in enumerate(ids)}
+
+        def read_png(frame_id):
+            with Image.open(paths[frame_id]) as img:
+                img.load()
+                return img
+
+        def read_history(frame_id):
+            # Cold reads: no frame decoded before helps
+            store.latest.clear()
+            store.recent.clear()
+            return store.get(frame_id)
+
+        rows = [("plain png", directory_bytes(png_dir), png_s, timed_reads(read_png, sample, frames))]
+        rows.append(("history", directory_bytes(store.directory), history_s, timed_reads(read_history, sample, frames)))
+        start = time.perf_counter()
+        store.compact()
+        compact_s = time.perf_counter() - start
+        stats = store.get_stats()
+        rows.append((
+            "history, compacted", directory_bytes(store.directory), history_s + compact_s,
+            timed_reads(read_history, sample, frames),
+        ))
+        for name, size, seconds, (mean, p95, worst) in rows:
+            print(
+                f"{name:>22} | {size / 1e6:8.2f} | {seconds / len(ids) * 1000:8.1f} | "
+                f"{mean:7.1f} | {p95:7.1f} | {worst:7.1f}"
+            )
+        print(f"\nAfter compaction: {stats['keyframes']} keyframes, {stats['deltas']} deltas, "
+              f"longest chain {stats['longest_chain']} (compaction took {compact_s:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parallel PNG writer against Pillow on large captures.
+
+Encodes generated desktop-like images of increasing size with Pillow's
+single-threaded PNG encoder and with png_writer on 1, 2, 4, ... worker
+threads, and reports wall time, speed-up and output size. Every parallel
+result is decoded once and compared with the source pixels.
+
+    python benchmarks/bench_png.py [--sizes 8,33,100] [--repeat N] [--level L]
+"""
+
+import argparse
+import io
+import os
+import random
+import sys
+import time
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import png_writer  # noqa: E402
+from bench_export import antialiased_ui, code_editor, photo, flat_ui  # noqa: E402
+
+
+def desktop(megapixels):
+    """A 16:9 mosaic of 1920x1080 screenshot tiles with about this many megapixels"""
+    width = int((megapixels * 1e6 * 16 / 9) ** 0.5)
+    height = int(megapixels * 1e6 / width)
+    tiles = [make(1920, 1080, random.Random(make.__name__)) for make in (flat_ui, antialiased_ui, code_editor, photo)]
+    img = Image.new("RGB", (width, height))
+    for i, y in enumerate(range(0, height, 1080)):
+        for j, x in enumerate(range(0, width, 1920)):
+            img.paste(tiles[(i + j) % len(tiles)], (x, y))
+    return img
+
+
+def best_time(encode, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        data = encode()
+        best = min(best, time.perf_counter() - start)
+    return data, best
+
+
+def pillow_png(img, level):
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG", compress_level=level)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="8,33,100", help="image sizes in megapixels, comma separated")
+    parser.add_argument("--repeat", type=int, default=1, help="rounds per encoding (best time is reported)")
+    parser.add_argument("--level", type=int, default=6, help="zlib compression level")
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = sorted({1 << i for i in range(cores.bit_length()) if 1 << i <= cores} | {cores})
+    print(f"{cores} core(s); compress_level {args.level}\n")
+    print(f"{'image':>11} | {'encoder':>12} | {'ms':>8} | {'speed-up':>8} | {'MB':>7}")
+    print("-" * 58)
+    for megapixels in (float(size) for size in args.sizes.split(",")):
+        img = desktop(megapixels)
+        label = f"{img.size[0]}x{img.size[1]}"
+        data, pillow_s = best_time(lambda: pillow_png(img, args.level), args.repeat)
+        print(f"{label:>11} | {'pillow':>12} | {pillow_s * 1000:8.0f} | {1.0:8.2f} | {len(data) / 1e6:7.2f}")
+        for count in workers:
+            data, seconds = best_time(lambda: png_writer.encode_png(img, args.level, count), args.repeat)
+            if count == workers[0]:
+                assert Image.open(io.BytesIO(data)).tobytes() == img.tobytes(), "parallel PNG does not round-trip"
+            print(
+                f"{'':>11} | {f'{count} thread(s)':>12} | {seconds * 1000:8.0f} | "
+                f"{pillow_s / seconds:8.2f} | {len(data) / 1e6:7.2f}"
+            )
+        print("-" * 58)
+
+
+if __name__ == "__main__":
+    main()
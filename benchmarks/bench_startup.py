@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time from process start to an interactive overlay.
+
+Starts the tool in fresh interpreters and reports the best of N runs:
+
+- import: ``import capture_tool`` alone, plus a check that the optional
+  and heavy modules (pyautogui, pyperclip, the settings dialog, ...) stay
+  unimported until used. Needs no display.
+- interactive: ``main.py --profile-startup --exit-when-ready``, i.e. process
+  start until the overlay's first idle callback. Needs a display; --xvfb
+  starts a private Xvfb.
+
+Both are compared against their targets; --check exits non-zero when a
+target is missed, so the benchmark can gate CI.
+
+    python benchmarks/bench_startup.py [--repeat N] [--xvfb] [--check]
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Targets in milliseconds
+IMPORT_TARGET_MS = 250
+INTERACTIVE_TARGET_MS = 600
+
+# Modules that must not be imported just to show the overlay
+LAZY_MODULES = ("pyautogui", "pyperclip", "win32clipboard", "settings", "ui_elements", "magnifier", "clipboard")
+
+
+def best_import_ms(repeat):
+    code = "import time; t = time.perf_counter(); import capture_tool; print((time.perf_counter() - t) * 1000)"
+    times = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+        times.append(float(out.stdout.split()[-1]))
+    return min(times)
+
+
+def eagerly_imported():
+    code = f"import sys, capture_tool; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def best_interactive_ms(repeat):
+    times = []
+    # Run from an empty directory so no user configuration is picked up
+    with tempfile.TemporaryDirectory() as cwd:
+        for _ in range(repeat):
+            out = subprocess.run(
+                [sys.executable, os.path.join(ROOT, "main.py"), "--profile-startup", "--exit-when-ready"],
+                cwd=cwd, capture_output=True, text=True, timeout=60,
+            )
+            match = re.search(r"Interactive overlay after ([\d.]+) ms", out.stdout)
+            if not match:
+                sys.exit(f"overlay did not start:\n{out.stdout}{out.stderr}")
+            times.append(float(match.group(1)))
+    return min(times)
+
+
+def start_xvfb(display):
+    if not shutil.which("Xvfb"):
+        sys.exit("Xvfb not found; install it or run without --xvfb")
+    server = subprocess.Popen(["Xvfb", display, "-nolisten", "tcp", "-screen", "0", "1920x1080x24"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':')}"
+    for _ in range(100):
+        if os.path.exists(socket_path):
+            break
+        time.sleep(0.05)
+    os.environ["DISPLAY"] = display
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement (best time is reported)")
+    parser.add_argument("--xvfb", action="store_true", help="run against a private Xvfb")
+    parser.add_argument("--display", default=":98", help="display number for --xvfb (default: %(default)s)")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 if a target is missed")
+    args = parser.parse_args()
+
+    missed = False
+    import_ms = best_import_ms(args.repeat)
+    eager = eagerly_imported()
+    ok = import_ms <= IMPORT_TARGET_MS and not eager
+    missed |= not ok
+    print(f"{'import capture_tool':<22} {import_ms:8.1f} ms  (target {IMPORT_TARGET_MS} ms) {'✅' if ok else '❌'}")
+    if eager:
+        print(f"   imported eagerly: {', '.join(eager)}")
+
+    server = start_xvfb(args.display) if args.xvfb else None
+    try:
+        if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+            interactive_ms = best_interactive_ms(args.repeat)
+            ok = interactive_ms <= INTERACTIVE_TARGET_MS
+            missed |= not ok
+            print(f"{'interactive overlay':<22} {interactive_ms:8.1f} ms  "
+                  f"(target {INTERACTIVE_TARGET_MS} ms) {'✅' if ok else '❌'}")
+        else:
+            print("interactive overlay    skipped (no display; use --xvfb)")
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+    return 1 if args.check and missed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""
+Screen capture and save helpers shared by the GUI and the headless CLI.
+
+Nothing in here imports tkinter, so it can be used without a display
+server window ever being created.
+"""
+
+import io
+import os
+import datetime
+
+from PIL import Image
+
+import desktop_grab
+import frame
+import output_writer
+import png_writer
+
+# Output formats and the file extension each one is saved with
+FORMAT_EXTENSIONS = {
+    'PNG': ('.png',),
+    'JPEG': ('.jpg', '.jpeg'),
+    'BMP': ('.bmp',),
+    'WEBP': ('.webp',),
+    'TIFF': ('.tiff', '.tif'),
+    'QOI': ('.qoi',),
+}
+
+try:
+    # Pillow reads QOI from 9.5 but writes it only from 11.0
+    from PIL import QoiImagePlugin  # noqa: F401
+except ImportError:
+    pass
+if 'QOI' not in Image.SAVE:
+    del FORMAT_EXTENSIONS['QOI']
+
+
+def region_to_monitor(x, y, width, height):
+    """Build an mss region dict from screen coordinates"""
+    return {"top": y, "left": x, "width": width, "height": height}
+
+
+def grab_image(session, monitor):
+    """Grab a region dict from the screen and decode it into a PIL image"""
+    return frame.frame_to_image(session.grab(monitor))
+
+
+def add_cursor(img, x, y, width, height):
+    """Draw the cursor onto a capture; cursor support is imported on demand"""
+    import clipboard
+    return clipboard.add_cursor_to_image(img, x, y, width, height)
+
+
+def capture_region(session, x, y, width, height, include_cursor=False):
+    """Capture a single screen region"""
+    img = grab_image(session, region_to_monitor(x, y, width, height))
+    if include_cursor:
+        img = add_cursor(img, x, y, width, height)
+    return img
+
+
+def capture_desktop(session, include_cursor=False, mode='auto'):
+    """Capture the whole virtual desktop, grabbing the monitors concurrently"""
+    grabber = desktop_grab.DesktopGrabber(session, mode)
+    try:
+        desktop = grabber.grab()
+    finally:
+        grabber.close()
+    img = frame.frame_to_image(desktop)
+    if include_cursor:
+        img = add_cursor(img, desktop.left, desktop.top, desktop.width, desktop.height)
+    return img
+
+
+def capture_regions(session, regions, include_cursor=False):
+    """Capture many (x, y, width, height) regions from a single grab.
+
+    The bounding box of all regions is grabbed once and every region is
+    cropped out of it, so all captures come from the same instant.
+    """
+    if not regions:
+        return []
+    left = min(x for x, y, w, h in regions)
+    top = min(y for x, y, w, h in regions)
+    right = max(x + w for x, y, w, h in regions)
+    bottom = max(y + h for x, y, w, h in regions)
+
+    full = grab_image(session, region_to_monitor(left, top, right - left, bottom - top))
+
+    images = []
+    for x, y, width, height in regions:
+        img = full.crop((x - left, y - top, x - left + width, y - top + height))
+        if include_cursor:
+            img = add_cursor(img, x, y, width, height)
+        images.append(img)
+    return images
+
+
+def timestamped_filename(prefix, image_format='PNG'):
+    """Default filename for a capture taken now; without an extension if image_format is None"""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    extension = FORMAT_EXTENSIONS[image_format][0] if image_format else ""
+    return f"{prefix}_{timestamp}{extension}"
+
+
+def format_from_filename(filename, default='PNG'):
+    """Guess the output format from a filename's extension, else default"""
+    ext = os.path.splitext(filename)[1].lower()
+    for image_format, extensions in FORMAT_EXTENSIONS.items():
+        if ext in extensions:
+            return image_format
+    return default
+
+
+def with_extension(filename, image_format):
+    """filename, with the format's extension appended unless it already has one"""
+    extensions = FORMAT_EXTENSIONS[image_format.upper()]
+    if not filename.lower().endswith(extensions):
+        filename += extensions[0]
+    return filename
+
+
+def _savable(img, image_format, colors=None):
+    """img in a mode the format can store, palettized to `colors` colors if given"""
+    if colors:
+        import export
+        return export.palettize(img, colors)
+    if image_format in ('JPEG', 'BMP') and img.mode not in ('RGB', 'L'):
+        return img.convert('RGB')
+    if image_format == 'QOI' and img.mode not in ('RGB', 'RGBA'):
+        return img.convert('RGB')
+    return img
+
+
+def write_image(img, fp, image_format='PNG', colors=None, **options):
+    """Encode img into a binary file object; colors and options as for save_image()"""
+    image_format = image_format.upper()
+    img = _savable(img, image_format, colors)
+    if image_format == 'PNG' and png_writer.wanted(img, options):
+        # Very large captures are deflated on all cores
+        png_writer.write_png(img, fp, options.get('compress_level', 6))
+    else:
+        img.save(fp, image_format, **options)
+
+
+def save_image(img, filename, image_format='PNG', colors=None, fsync='file', **options):
+    """Save img in the given format, fixing up the extension; returns the path written.
+
+    colors palettizes the image first (PNG8); options are passed to PIL's save().
+    The file is replaced atomically, so it is never seen half-written.
+    """
+    filename = with_extension(filename, image_format)
+    with output_writer.atomic_file(filename, fsync) as f:
+        write_image(img, f, image_format, colors, **options)
+    return filename
+
+
+def encode_image(img, image_format='PNG', colors=None, **options):
+    """Encode img in memory; colors and options as for save_image()"""
+    buffer = io.BytesIO()
+    write_image(img, buffer, image_format, colors, **options)
+    return buffer.getvalue()
+
+
+def write_encoded(data, filename, image_format='PNG', fsync='file'):
+    """Write bytes from encode_image() atomically, fixing up the extension; returns the path written"""
+    return output_writer.atomic_write(with_extension(filename, image_format), data, fsync)
@@ -0,0 +1,493 @@
+"""
+SQLite index of every capture.
+
+Saved captures used to be bare files, so finding last week's meant listing
+directories of tens of thousands of files. A CaptureIndex records each
+capture in one SQLite database: when it was taken and how (overlay, copy,
+save, cli, serve), its screen geometry and monitor, grab and encode times,
+the file written with its format and size, a BLAKE2b hash of its pixels,
+how many annotations it carries and whether it went to the clipboard.
+Queries by time range, monitor and hash use ordinary indexes; queries by
+region use an R*Tree when SQLite has one.
+
+record() and update() never wait for the database: rows are queued and
+inserted by a writer thread, several per transaction, and pixel hashes are
+computed there as well.
+
+Saved PNGs carry their capture's record in a 'screenshot-tool' text chunk
+(tag_png()). rebuild() walks directories for PNGs not already indexed at
+their current path, size and mtime, re-attaches moved files to their rows
+by capture id, recreates rows lost with the database, and clears the path
+of files that are gone. Unchanged files cost one stat each.
+
+    screenshot-tool index [--since 7d] [--until ...] [--region X,Y,W,H] [--monitor ID] [--hash H]
+    screenshot-tool index --rebuild [DIR ...]
+
+Nothing in here imports tkinter.
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+from PIL import Image
+
+import capture_store
+import config
+import topology
+
+# PNG text chunk holding a capture's record
+META_KEY = 'screenshot-tool'
+
+COLUMNS = (
+    'uid', 'time', 'source', 'x', 'y', 'width', 'height', 'monitor', 'path', 'format', 'bytes',
+    'hash', 'clipboard', 'annotations', 'grab_ms', 'encode_ms', 'mtime',
+)
+
+# Fields embedded in saved PNGs: enough to recreate the row without the database
+PNG_FIELDS = ('uid', 'time', 'source', 'x', 'y', 'width', 'height', 'monitor', 'annotations', 'grab_ms')
+
+# Rows written per transaction at most
+BATCH = 256
+
+# Records kept in memory for describe()
+RECENT = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    uid TEXT PRIMARY KEY,
+    time REAL NOT NULL,
+    source TEXT NOT NULL,
+    x INTEGER, y INTEGER, width INTEGER, height INTEGER,
+    monitor TEXT,
+    path TEXT,
+    format TEXT,
+    bytes INTEGER,
+    hash TEXT,
+    clipboard INTEGER NOT NULL DEFAULT 0,
+    annotations INTEGER NOT NULL DEFAULT 0,
+    grab_ms REAL,
+    encode_ms REAL,
+    mtime REAL
+);
+CREATE INDEX IF NOT EXISTS captures_time ON captures (time);
+CREATE INDEX IF NOT EXISTS captures_monitor ON captures (monitor, time);
+CREATE INDEX IF NOT EXISTS captures_hash ON captures (hash);
+CREATE INDEX IF NOT EXISTS captures_path ON captures (path);
+"""
+
+REGION_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS capture_regions USING rtree(id, x1, x2, y1, y2)"
+
+
+def default_index_path():
+    """Per-user index location, preferring XDG_DATA_HOME"""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "screenshot-tool", "captures.db")
+
+
+def monitor_id_at(monitors, x, y, width, height):
+    """ID of the monitor holding the centre of a capture region (see topology.monitor_id)"""
+    monitor = topology.monitor_at(monitors, x + width // 2, y + height // 2)
+    # By identity: a single monitor's dict equals the virtual desktop's
+    return topology.monitor_id(monitor, next(i for i, m in enumerate(monitors) if m is monitor))
+
+
+def tag_png(data, record):
+    """PNG bytes with a capture record added as a text chunk right after IHDR"""
+    if data[12:16] != b'IHDR':
+        raise ValueError("not a PNG")
+    fields = {key: record[key] for key in PNG_FIELDS if record.get(key) is not None}
+    text = META_KEY.encode('latin-1') + b"\0" + json.dumps(fields, separators=(',', ':')).encode('ascii')
+    chunk = struct.pack(">I", len(text)) + b"tEXt" + text + struct.pack(">I", zlib.crc32(text, zlib.crc32(b"tEXt")))
+    return data[:33] + chunk + data[33:]
+
+
+def read_png_record(path):
+    """The capture record embedded in a PNG by tag_png(), or None"""
+    try:
+        with Image.open(path) as img:
+            # Text chunks before the image data are read with the header
+            text = img.info.get(META_KEY)
+        return json.loads(text) if text else None
+    except (OSError, ValueError):
+        return None
+
+
+def parse_time(value):
+    """Unix time from '30m', '12h' or '7d' ago, or an ISO date/time such as 2026-10-17T09:30"""
+    units = {'m': 60, 'h': 3600, 'd': 86400}
+    if value[-1:] in units and value[:-1].replace('.', '', 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{value}', expected e.g. 7d, 12h or 2026-10-17T09:30")
+
+
+def _scan_pngs(directory):
+    """DirEntry of every .png below directory"""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from _scan_pngs(entry.path)
+        elif entry.name.lower().endswith('.png'):
+            yield entry
+
+
+class CaptureIndex:
+    """SQLite index of captures, written on a background thread"""
+
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.ops = queue.Queue()
+        self.writer = None
+        self.closed = False
+        # uid -> record of the latest captures, for tagging the files they are saved to
+        self.recent = collections.OrderedDict()
+        # The database is opened by the first connection: nothing touches disk before
+        self.open_lock = threading.Lock()
+        self.rtree = None
+
+    def _connection(self):
+        """This thread's connection; sqlite3 connections stay on the thread that made them"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            with self.open_lock:
+                if self.rtree is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                conn = sqlite3.connect(self.path, timeout=30)
+                conn.row_factory = sqlite3.Row
+                # Readers never block the writer thread, and commits skip most fsyncs
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                if self.rtree is None:
+                    conn.executescript(SCHEMA)
+                    try:
+                        conn.execute(REGION_SCHEMA)
+                        self.rtree = True
+                    except sqlite3.OperationalError:
+                        # SQLite built without R*Tree: region queries scan the time index instead
+                        self.rtree = False
+            self.local.conn = conn
+        return conn
+
+    def _submit(self, op):
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Capture index is closed")
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run, name="capture-index", daemon=True)
+                self.writer.start()
+            self.ops.put(op)
+
+    def record(self, img=None, source='overlay', **fields):
+        """Queue a new capture; fields are COLUMNS values. Returns its uid.
+
+        img is the capture's image, or a callable returning it, which the
+        writer thread calls to hash pixels the caller never decoded.
+        """
+        record = dict(fields, uid=uuid.uuid4().hex, source=source)
+        record.setdefault('time', time.time())
+        if img is not None and not callable(img):
+            record.setdefault('width', img.size[0])
+            record.setdefault('height', img.size[1])
+        with self.lock:
+            self.recent[record['uid']] = record
+            while len(self.recent) > RECENT:
+                self.recent.popitem(last=False)
+        self._submit(('insert', record, img))
+        return record['uid']
+
+    def update(self, uid, **fields):
+        """Queue changes to a recorded capture, e.g. its path once saved or clipboard=True"""
+        self._submit(('update', uid, fields))
+
+    def describe(self, uid):
+        """The record of a recent capture, for tag_png(); None if unknown"""
+        with self.lock:
+            return self.recent.get(uid)
+
+    def _run(self):
+        try:
+            conn = self._connection()
+        except (sqlite3.Error, OSError) as e:
+            # Captures work without their index: drop records, keep flush() answering.
+            # The writer warns on stderr, as stdout may carry image data (-o -)
+            print(f"⚠️  Capture index unavailable: {e}", file=sys.stderr)
+            conn = None
+        while True:
+            batch = [self.ops.get()]
+            while len(batch) < BATCH and batch[-1] is not None:
+                try:
+                    batch.append(self.ops.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            ops = [op for op in batch if op is not None]
+            if conn is None:
+                ops = [op for op in ops if op[0] == 'sync']
+            # Hashing happens outside the transaction, so readers wait for nothing
+            for op in ops:
+                if op[0] == 'insert' and op[2] is not None:
+                    try:
+                        img = op[2]() if callable(op[2]) else op[2]
+                        op[1].setdefault('hash', capture_store.pixel_digest(img))
+                    except Exception as e:
+                        print(f"⚠️  Capture index could not hash a capture: {e}", file=sys.stderr)
+            try:
+                if conn is not None:
+                    with conn:
+                        # One transaction per batch; each op gets a savepoint inside it
+                        conn.execute("BEGIN")
+                        for op in ops:
+                            if op[0] in ('insert', 'update'):
+                                self._apply(conn, op)
+            except Exception as e:
+                # A lost batch must never stop the writer: flush() waits on it
+                print(f"⚠️  Capture index write failed: {e}", file=sys.stderr)
+            for op in ops:
+                if op[0] == 'sync':
+                    op[1].set()
+            if stop:
+                if conn is not None:
+                    conn.close()
+                return
+
+    def _apply(self, conn, op):
+        """Write one insert or update; a failing one is rolled back alone, the batch goes on"""
+        conn.execute("SAVEPOINT capture_op")
+        try:
+            if op[0] == 'insert':
+                self._insert(conn, op[1])
+            else:
+                self._update(conn, op[1], op[2])
+        except Exception as e:
+            conn.execute("ROLLBACK TO capture_op")
+            print(f"⚠️  Capture index write failed: {e}", file=sys.stderr)
+        conn.execute("RELEASE capture_op")
+
+    @staticmethod
+    def _file_fields(fields):
+        """Absolute path plus size and mtime, so rebuild() can tell the file is unchanged"""
+        if fields.get('path'):
+            fields['path'] = os.path.abspath(fields['path'])
+            try:
+                st = os.stat(fields['path'])
+            except OSError:
+                # Already moved or deleted: rebuild() catches up with it
+                return fields
+            fields.setdefault('bytes', st.st_size)
+            fields.setdefault('mtime', st.st_mtime)
+        return fields
+
+    def _insert(self, conn, record):
+        row = self._file_fields({key: record.get(key) for key in COLUMNS})
+        row['clipboard'] = int(bool(row['clipboard']))
+        row['annotations'] = row['annotations'] or 0
+        # An upsert keeps the rowid of a row recorded again, which capture_regions is keyed by
+        conn.execute(
+            f"INSERT INTO captures ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+            f"ON CONFLICT(uid) DO UPDATE SET {', '.join(f'{key} = excluded.{key}' for key in COLUMNS[1:])}",
+            [row[key] for key in COLUMNS]
+        )
+        if self.rtree:
+            rowid = conn.execute("SELECT rowid FROM captures WHERE uid = ?", (row['uid'],)).fetchone()[0]
+            if None in (row['x'], row['y'], row['width'], row['height']):
+                conn.execute("DELETE FROM capture_regions WHERE id = ?", (rowid,))
+            else:
+                conn.execute(
+                    "INSERT OR REPLACE INTO capture_regions VALUES (?, ?, ?, ?, ?)",
+                    (rowid, row['x'], row['x'] + row['width'], row['y'], row['y'] + row['height'])
+                )
+
+    def _update(self, conn, uid, fields):
+        fields = self._file_fields({key: value for key, value in fields.items() if key in COLUMNS})
+        if 'clipboard' in fields:
+            fields['clipboard'] = int(bool(fields['clipboard']))
+        if fields:
+            conn.execute(
+                f"UPDATE captures SET {', '.join(f'{key} = ?' for key in fields)} WHERE uid = ?",
+                list(fields.values()) + [uid]
+            )
+
+    def flush(self, timeout=None):
+        """Wait until every queued record is written; returns False on timeout"""
+        with self.lock:
+            idle = self.writer is None or self.closed
+        if idle:
+            return True
+        done = threading.Event()
+        self._submit(('sync', done))
+        return done.wait(timeout)
+
+    def query(self, since=None, until=None, region=None, monitor=None, digest=None, source=None, limit=None):
+        """Captures matching every given filter, newest first, as dicts.
+
+        since/until are Unix times; region (x, y, w, h) matches captures
+        overlapping it; digest is a pixel hash (capture_store.pixel_digest).
+        """
+        self.flush()
+        sql = "SELECT c.* FROM captures c"
+        where, params = [], []
+        if region is not None:
+            x, y, width, height = region
+            if self.rtree:
+                sql += " JOIN capture_regions r ON r.id = c.rowid"
+                where += ["r.x1 < ?", "r.x2 > ?", "r.y1 < ?", "r.y2 > ?"]
+            else:
+                where += ["c.x < ?", "c.x + c.width > ?", "c.y < ?", "c.y + c.height > ?"]
+            params += [x + width, x, y + height, y]
+        for clause, value in (("c.time >= ?", since), ("c.time < ?", until), ("c.monitor = ?", monitor),
+                              ("c.hash = ?", digest), ("c.source = ?", source)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.time DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        return [dict(row) for row in self._connection().execute(sql, params)]
+
+    def rebuild(self, directories):
+        """Bring paths up to date with the PNGs below directories; returns counts per outcome"""
+        self.flush()
+        conn = self._connection()
+        counts = dict.fromkeys(('scanned', 'unchanged', 'moved', 'restored', 'missing'), 0)
+        known = {
+            row['path']: (row['bytes'], row['mtime'])
+            for row in conn.execute("SELECT path, bytes, mtime FROM captures WHERE path IS NOT NULL")
+        }
+        roots = [os.path.join(os.path.abspath(directory), '') for directory in directories]
+        seen = set()
+        with conn:
+            for root in roots:
+                for entry in _scan_pngs(root):
+                    path = os.path.abspath(entry.path)
+                    seen.add(path)
+                    counts['scanned'] += 1
+                    st = entry.stat()
+                    if known.get(path) == (st.st_size, st.st_mtime):
+                        counts['unchanged'] += 1
+                        continue
+                    record = read_png_record(path)
+                    if record is None or 'uid' not in record:
+                        # Not a capture of ours
+                        continue
+                    file_fields = {'path': path, 'bytes': st.st_size, 'mtime': st.st_mtime, 'format': 'PNG'}
+                    previous = conn.execute("SELECT path FROM captures WHERE uid = ?", (record['uid'],)).fetchone()
+                    if previous is not None:
+                        conn.execute(
+                            "UPDATE captures SET path = ?, bytes = ?, mtime = ?, format = ? WHERE uid = ?",
+                            list(file_fields.values()) + [record['uid']]
+                        )
+                        # The row no longer points at its old path, which must not count as missing
+                        known.pop(previous['path'], None)
+                        counts['moved'] += 1
+                        continue
+                    try:
+                        with Image.open(path) as img:
+                            digest = capture_store.pixel_digest(img)
+                    except OSError:
+                        # Truncated or damaged: nothing to restore
+                        continue
+                    self._insert(conn, dict(
+                        {key: record.get(key) for key in PNG_FIELDS}, hash=digest, **file_fields
+                    ))
+                    counts['restored'] += 1
+            for path in known:
+                if path not in seen and any(path.startswith(root) for root in roots) and not os.path.exists(path):
+                    cursor = conn.execute("UPDATE captures SET path = NULL WHERE path = ?", (path,))
+                    if cursor.rowcount:
+                        counts['missing'] += 1
+        return counts
+
+    def close(self):
+        """Write everything queued and stop the writer thread"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            writer = self.writer
+        if writer is not None:
+            self.ops.put(None)
+            writer.join()
+        conn = getattr(self.local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def from_settings(settings):
+    """CaptureIndex at the capture_index_path setting, or None when capture_index is off.
+
+    The database is opened by the first record or query, not here.
+    """
+    if not settings.get('capture_index', True):
+        return None
+    return CaptureIndex(settings.get('capture_index_path') or None)
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool index'"""
+    import cli
+
+    parser = argparse.ArgumentParser(prog="screenshot-tool index", description="Query the capture index")
+    parser.add_argument("--since", type=parse_time, metavar="TIME", help="captures at or after TIME (7d, 12h, ISO date)")
+    parser.add_argument("--until", type=parse_time, metavar="TIME", help="captures before TIME")
+    parser.add_argument("--region", type=cli.parse_region, metavar="X,Y,W,H", help="captures overlapping a region")
+    parser.add_argument("--monitor", metavar="ID", help="captures on monitor ID")
+    parser.add_argument("--hash", metavar="DIGEST", help="captures with these pixels")
+    parser.add_argument("--source", choices=("overlay", "copy", "save", "cli", "serve"), help="captures made this way")
+    parser.add_argument("--limit", type=int, default=50, help="most captures listed (default: %(default)s)")
+    parser.add_argument("--rebuild", nargs="*", metavar="DIR",
+                        help="re-scan DIRs (default: output_directory) for moved or unindexed PNGs")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+    settings['capture_index'] = True
+    index = from_settings(settings)
+    try:
+        with index:
+            if args.rebuild is not None:
+                counts = index.rebuild(args.rebuild or [settings.get('output_directory') or '.'])
+                print(f"🔎 Scanned {counts['scanned']} PNG(s): {counts['unchanged']} unchanged, "
+                      f"{counts['moved']} moved, {counts['restored']} restored, {counts['missing']} missing")
+                return 0
+            rows = index.query(args.since, args.until, args.region, args.monitor, args.hash, args.source, args.limit)
+            for row in rows:
+                taken = datetime.datetime.fromtimestamp(row['time']).isoformat(' ', 'seconds')
+                geometry = f"{row['width']}x{row['height']}+{row['x']}+{row['y']}" if row['x'] is not None else "-"
+                clipped = "📋" if row['clipboard'] else "  "
+                print(f"{taken}  {row['source']:<7} {geometry:<20} {row['monitor'] or '-':<16} {clipped} "
+                      f"{row['path'] or '-'}")
+    except (sqlite3.Error, OSError) as e:
+        print(f"❌ Capture index unavailable: {e}")
+        return 1
+    return 0
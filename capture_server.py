@@ -0,0 +1,299 @@
+"""
+Local capture API served over a Unix-domain socket.
+
+    screenshot-tool serve [--socket PATH] [--workers N]
+
+Each request is one JSON line; each response is one JSON header line,
+followed by 'length' bytes of image data when the header has a length.
+A connection may send any number of requests, one after another.
+
+Request fields:
+    target          "region" (default), "monitor" or "all"
+    region          [x, y, width, height] for target "region"
+    monitor         monitor number (1-based) for target "monitor"
+    output          "png" (default), "raw", "path" or "history"
+    path            file to write for output "path" (default: a new unique file
+                    from the output_* settings; writes are atomic either way)
+    compress_level  PNG zlib level 0-9 (default 6)
+
+Raw output is the grabbed BGRA buffer as-is ("format": "BGRA"). History
+output adds the capture to the history_store.HistoryStore in the
+history_directory setting, as a keyframe or as the tiles that changed
+since the last capture of the same region, and answers with its "frame" id;
+the store is compacted in the background. Responses
+carry "latency_ms" with queue, grab, encode and total times. With a
+capture index, every capture is recorded and its response carries the
+record's "capture" uid. Requests are
+run concurrently on a worker pool over one shared capture session. Each
+worker thread uses its own display connection.
+"""
+
+import argparse
+import concurrent.futures
+import functools
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+import backends
+import capture
+import capture_index
+import capture_session
+import config
+import daemon
+import desktop_grab
+import frame
+import history_store
+import output_writer
+
+OUTPUTS = ("png", "raw", "path", "history")
+
+
+class CaptureService:
+    """Runs capture requests on a worker pool over one shared session"""
+
+    def __init__(self, session, workers=4, settings=None, index=None):
+        self.session = session
+        self.settings = settings or dict(config.DEFAULT_SETTINGS)
+        # capture_index.CaptureIndex recording every capture, if any
+        self.index = index
+        # Unique names at any request rate, without ever listing the output directory
+        self.writer = output_writer.from_settings(self.settings)
+        # Opened on the first "history" request
+        self.history = None
+        self.history_lock = threading.Lock()
+        # Separate pool: per-monitor grabs are submitted from capture workers
+        self.desktop_grabber = desktop_grab.DesktopGrabber(session, self.settings.get('desktop_grab_mode', 'auto'))
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="capture-worker")
+        self.stats_lock = threading.Lock()
+        self.requests_served = 0
+        self.requests_failed = 0
+
+    def resolve_region(self, request):
+        """Turn a request into an mss region dict"""
+        target = request.get("target", "region")
+        if target == "region":
+            try:
+                x, y, width, height = (int(v) for v in request["region"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("target 'region' needs region: [x, y, width, height]")
+            if width <= 0 or height <= 0:
+                raise ValueError("region width and height must be positive")
+            return capture.region_to_monitor(x, y, width, height)
+        monitors = self.session.monitors
+        if target == "all":
+            return dict(monitors[0])
+        if target == "monitor":
+            index = int(request.get("monitor", 1))
+            if index < 1 or index >= len(monitors):
+                raise ValueError(f"no monitor {index}; {len(monitors) - 1} monitor(s) available")
+            return dict(monitors[index])
+        raise ValueError(f"unknown target '{target}'")
+
+    def handle(self, request, received):
+        """Serve one request on a worker thread; returns (header, payload)"""
+        started = time.perf_counter()
+        output = request.get("output", "png")
+        if output not in OUTPUTS:
+            raise ValueError(f"unknown output '{output}'")
+
+        monitor = self.resolve_region(request)
+        if request.get("target") == "all":
+            shot = self.desktop_grabber.grab()
+        else:
+            shot = self.session.grab(monitor)
+        grabbed = time.perf_counter()
+
+        header = {"width": shot.width, "height": shot.height}
+        payload = None
+        img = None if output == "raw" else frame.frame_to_image(shot)
+        region = (monitor["left"], monitor["top"], monitor["width"], monitor["height"])
+        uid = None
+        if self.index is not None:
+            # Raw frames are never decoded here: the index decodes them on its writer thread to hash them
+            uid = header["capture"] = self.index.record(
+                img if img is not None else functools.partial(frame.frame_to_image, shot), 'serve', x=region[0], y=region[1], width=shot.width, height=shot.height,
+                monitor=capture_index.monitor_id_at(self.session.monitors, *region),
+                grab_ms=round((grabbed - started) * 1000, 3)
+            )
+        if output == "raw":
+            # Raw output is always BGRA, whatever layout the backend grabs natively
+            header["format"] = "BGRA"
+            payload = backends.convert_frame(shot, "BGRA").raw
+        elif output == "history":
+            header["frame"] = self.open_history().add(img, region)
+        elif output == "png":
+            buffer = io.BytesIO()
+            img.save(buffer, "PNG", compress_level=int(request.get("compress_level", 6)))
+            header["format"] = "PNG"
+            payload = buffer.getbuffer()
+        else:
+            filename = request.get("path")
+            header["format"] = capture.format_from_filename(filename) if filename else "PNG"
+            if uid is not None and header["format"] == "PNG":
+                # The index record travels with the file
+                data = capture_index.tag_png(capture.encode_image(img, "PNG"), self.index.describe(uid))
+                if filename:
+                    path = capture.write_encoded(data, filename, "PNG", fsync=self.writer.fsync)
+                else:
+                    path = self.writer.write(data, ".png")
+            elif filename:
+                path = capture.save_image(img, filename, header["format"], fsync=self.writer.fsync)
+            else:
+                path = self.writer.write_with(lambda f: capture.write_image(img, f, "PNG"), ".png")
+            header["path"] = os.path.abspath(path)
+        done = time.perf_counter()
+        if uid is not None:
+            self.index.update(uid, path=header.get("path"), format=header.get("format"),
+                              encode_ms=round((done - grabbed) * 1000, 3))
+
+        header["latency_ms"] = {
+            "queue": round((started - received) * 1000, 3),
+            "grab": round((grabbed - started) * 1000, 3),
+            "encode": round((done - grabbed) * 1000, 3),
+            "total": round((done - received) * 1000, 3),
+        }
+        return header, payload
+
+    def open_history(self):
+        """The history store, opened and set compacting on first use"""
+        with self.history_lock:
+            if self.history is None:
+                self.history = history_store.from_settings(self.settings)
+                self.history.start_compaction()
+            return self.history
+
+    def submit(self, request):
+        """Queue a request on the pool and wait for it; never raises"""
+        received = time.perf_counter()
+        try:
+            header, payload = self.pool.submit(self.handle, request, received).result()
+            header["ok"] = True
+        except Exception as e:
+            header, payload = {"ok": False, "error": str(e)}, None
+        if "id" in request:
+            header["id"] = request["id"]
+        if payload is not None:
+            header["length"] = len(payload)
+        with self.stats_lock:
+            if header["ok"]:
+                self.requests_served += 1
+            else:
+                self.requests_failed += 1
+        return header, payload
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self.desktop_grabber.close()
+        if self.history is not None:
+            self.history.close()
+        if self.index is not None:
+            self.index.close()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                header, payload = {"ok": False, "error": f"bad request: {e}"}, None
+            else:
+                header, payload = self.server.service.submit(request)
+            self.wfile.write(json.dumps(header).encode("utf-8") + b"\n")
+            if payload is not None:
+                self.wfile.write(payload)
+            self.wfile.flush()
+
+
+class CaptureServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Accepts client connections; the actual capture work runs on the service's pool"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        daemon.prepare_socket_path(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+        self.socket_path = socket_path
+        self.service = service
+
+    def server_bind(self):
+        # Owner-only from the start: captures of the screen must not leak to other users
+        daemon.bind_private(self.socket, self.server_address)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class CaptureClient:
+    """Minimal client for the capture API; keeps one connection open"""
+
+    def __init__(self, socket_path=None, timeout=10.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(socket_path or daemon.default_socket_path("screenshot-capture.sock"))
+        self.reader = self.sock.makefile("rb")
+
+    def request(self, **request):
+        """Send one request; returns (header, payload bytes or None)"""
+        self.sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("capture server closed the connection")
+        header = json.loads(line)
+        payload = self.reader.read(header["length"]) if "length" in header else None
+        return header, payload
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool serve'"""
+    default_path = daemon.default_socket_path("screenshot-capture.sock")
+    parser = argparse.ArgumentParser(prog="screenshot-tool serve", description="Serve captures over a local socket")
+    parser.add_argument("--socket", default=default_path, help="socket path (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=4, help="capture worker threads (default: %(default)s)")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    parser.add_argument("--backend", choices=list(backends.BACKENDS),
+                        help="capture backend (default: capture_backend setting)")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("❌ The capture server needs Unix-domain sockets, which this platform lacks", file=sys.stderr)
+        return 1
+
+    settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+    if args.backend:
+        settings['capture_backend'] = args.backend
+    with capture_session.CaptureSession(settings['capture_backend'], **backends.backend_options(settings)) as session:
+        service = CaptureService(session, args.workers, settings, capture_index.from_settings(settings))
+        try:
+            server = CaptureServer(args.socket, service)
+        except Exception as e:
+            print(f"❌ Failed to start capture server: {e}", file=sys.stderr)
+            return 1
+        print(f"🚀 Capture server listening on {args.socket} ({args.workers} workers)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            service.close()
+    return 0
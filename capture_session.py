@@ -0,0 +1,93 @@
+import threading
+
+import backends
+
+
+class CaptureSession:
+    """Long-lived screen capture session shared across the application.
+
+    Opening a capture backend (mss by default, see backends.py) connects to
+    the display server and allocates shared memory, so the session keeps one
+    instance alive and reuses it for every grab. Backend instances must not
+    be shared between threads, so each thread that grabs through the session
+    gets its own lazily created instance; all of them are torn down together
+    by close().
+    """
+
+    def __init__(self, backend='mss', **options):
+        self.backend = backends.get_backend(backend)
+        self._options = options
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._instances = {}
+        self._closed = False
+
+    def _get_sct(self):
+        """Return the backend instance bound to the calling thread"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            with self._lock:
+                if self._closed:
+                    raise RuntimeError("Capture session is closed")
+                sct = self.backend.open(**self._options)
+                self._instances[threading.get_ident()] = sct
+            self._local.sct = sct
+        return sct
+
+    @property
+    def monitors(self):
+        """Monitor list as reported by the backend (index 0 is the virtual desktop)"""
+        return self._get_sct().monitors
+
+    def refresh_monitors(self):
+        """Re-query the monitor list; backends cache it, so drop the cache but keep the connection"""
+        return backends.requery_monitors(self._get_sct())
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def grab(self, monitor, pixel_format=None):
+        """Grab a region dict (left/top/width/height) from the screen.
+
+        pixel_format ('BGRA' or 'RGB') converts the frame if the backend
+        produces another layout; None keeps the backend's native one.
+        """
+        shot = self._get_sct().grab(monitor)
+        return shot if pixel_format is None else backends.convert_frame(shot, pixel_format)
+
+    def grab_monitor(self, index, pixel_format=None):
+        """Grab monitor index of the monitor list (0 is the whole virtual desktop)"""
+        monitors = self.monitors
+        if index < 0 or index >= len(monitors):
+            raise ValueError(f"no monitor {index}; {len(monitors) - 1} monitor(s) available")
+        return self.grab(monitors[index], pixel_format)
+
+    def release_thread(self):
+        """Close the instance owned by the calling thread, e.g. before a worker exits"""
+        sct = getattr(self._local, 'sct', None)
+        if sct is None:
+            return
+        with self._lock:
+            self._instances.pop(threading.get_ident(), None)
+        self._local.sct = None
+        sct.close()
+
+    def close(self):
+        """Close every display connection opened by this session"""
+        with self._lock:
+            self._closed = True
+            instances = list(self._instances.values())
+            self._instances.clear()
+        self._local = threading.local()
+        for sct in instances:
+            try:
+                sct.close()
+            except Exception as e:
+                print(f"⚠️  Failed to close capture session: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
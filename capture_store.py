@@ -0,0 +1,240 @@
+"""
+Content-addressed capture store.
+
+Monitoring jobs capture the same idle screens all day, and every capture
+used to become a new file. With capture_store enabled, saves go through a
+CaptureStore instead. Each capture is hashed on its raw pixels with
+BLAKE2b, which costs a few milliseconds per megapixel and no encoding.
+Pixels already in the store skip format analysis and encoding entirely;
+new pixels are encoded once into objects/<ab>/<digest>-<variant><ext>.
+The variant tells apart encodings of the same pixels with a different
+format or policy.
+
+Each capture still gets its human filename: a hard link to the object
+(links='hardlink', a copy where the filesystem has no hard links), or for
+auto-named captures only a line in manifest.jsonl (links='manifest').
+Names picked by the user always get a file. The manifest records every
+capture with its object, so resolve() finds the file behind a name, and
+get_stats() reports how many bytes duplicates saved. Hard-linked captures
+share their data with the object: edit copies, not the files themselves.
+
+    screenshot-tool store [--config FILE]
+
+prints the statistics of the configured store.
+
+Nothing in here imports tkinter.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import capture
+import config
+import export
+import output_writer
+
+LINK_MODES = ('hardlink', 'manifest')
+
+# Store directory inside output_directory unless capture_store_dir is set
+DEFAULT_DIRECTORY = '.capture_store'
+
+
+def pixel_digest(img):
+    """BLAKE2b hex digest of an image's mode, size and raw pixels"""
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{img.mode} {img.size[0]}x{img.size[1]}\n".encode('ascii'))
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def _variant(image_format, policy):
+    return f"{image_format.lower()}.{policy}"
+
+
+class CaptureStore:
+    """Stores each distinct capture once and links human filenames to it"""
+
+    def __init__(self, directory=DEFAULT_DIRECTORY, links='hardlink', fsync='file'):
+        if links not in LINK_MODES:
+            raise ValueError(f"unknown link mode '{links}', expected one of {', '.join(LINK_MODES)}")
+        self.directory = directory
+        self.links = links
+        self.fsync = fsync
+        self.objects_log = os.path.join(directory, 'objects.jsonl')
+        self.manifest = os.path.join(directory, 'manifest.jsonl')
+        self.lock = threading.Lock()
+        # key -> {'object': path relative to the store, 'bytes': size}; loaded on first use
+        self.objects = None
+        self.stats = None
+
+    def _load(self):
+        """Read the object log and manifest once; callers hold the lock"""
+        if self.objects is not None:
+            return
+        os.makedirs(os.path.join(self.directory, 'objects'), exist_ok=True)
+        self.objects = {}
+        self.stats = {'captures': 0, 'duplicates': 0, 'objects': 0, 'bytes_stored': 0, 'bytes_referenced': 0}
+        for entry in self._read_log(self.objects_log):
+            self.objects[entry['key']] = entry
+            self.stats['objects'] += 1
+            self.stats['bytes_stored'] += entry['bytes']
+        for entry in self._read_log(self.manifest):
+            self.stats['captures'] += 1
+            self.stats['duplicates'] += entry.get('duplicate', False)
+            self.stats['bytes_referenced'] += entry.get('bytes', 0)
+
+    @staticmethod
+    def _read_log(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A torn last line from a crash
+                continue
+        return entries
+
+    def _append(self, path, entry):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+    def _object_path(self, entry):
+        return os.path.join(self.directory, entry['object'])
+
+    def _lookup(self, key):
+        with self.lock:
+            self._load()
+            entry = self.objects.get(key)
+        # An object deleted behind our back is simply stored again
+        if entry is not None and os.path.exists(self._object_path(entry)):
+            return entry
+        return None
+
+    def _store_object(self, key, img, image_format, policy, encode):
+        """Encode img and write it as the object for key; returns its entry"""
+        started = time.perf_counter()
+        plan = export.plan_export(img, image_format, policy)
+        data = encode(img, plan.image_format, **plan.options)
+        relative = os.path.join('objects', key[:2], key + capture.FORMAT_EXTENSIONS[plan.image_format][0])
+        path = os.path.join(self.directory, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        output_writer.atomic_write(path, data, self.fsync)
+        entry = {
+            'key': key, 'object': relative, 'bytes': len(data), 'format': plan.label,
+            'encode_ms': round((time.perf_counter() - started) * 1000, 1),
+        }
+        with self.lock:
+            if key not in self.objects:
+                self.stats['objects'] += 1
+                self.stats['bytes_stored'] += len(data)
+                self._append(self.objects_log, entry)
+            self.objects[key] = entry
+        return entry
+
+    def _link(self, source, path):
+        """Hard-link source to path, replacing it; False without hard links"""
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(source, tmp)
+            os.replace(tmp, path)
+        except OSError:
+            return False
+        return True
+
+    def _copy(self, source, path=None, writer=None):
+        """Write the object's bytes to path (or a new name from writer); returns the path"""
+        with open(source, 'rb') as f:
+            data = f.read()
+        if path is None:
+            return writer.write(data, os.path.splitext(source)[1])
+        return output_writer.atomic_write(path, data, self.fsync)
+
+    def save(self, img, filename=None, image_format='AUTO', policy='lossless', writer=None,
+             encode=capture.encode_image):
+        """Store img once and expose it as filename; returns (path, duplicate).
+
+        filename None takes a new name from writer. encode(img, format, **options)
+        runs only for pixels the store has not seen, e.g. an EncodeCache's get().
+        """
+        key = f"{pixel_digest(img)}-{_variant(image_format, policy)}"
+        entry = self._lookup(key)
+        duplicate = entry is not None
+        if not duplicate:
+            entry = self._store_object(key, img, image_format, policy, encode)
+
+        source = self._object_path(entry)
+        extension = os.path.splitext(source)[1]
+        writer = writer or output_writer.OutputWriter(fsync=self.fsync)
+        linked, written = False, True
+        if filename is not None:
+            # A name the user picked always gets a file
+            path = capture.with_extension(filename, capture.format_from_filename(source))
+            linked = self.links == 'hardlink' and self._link(source, path)
+            if not linked:
+                self._copy(source, path)
+        elif self.links == 'hardlink':
+            try:
+                path = writer.link(source, extension)
+                linked = True
+            except OSError:
+                path = self._copy(source, writer=writer)
+        else:
+            # Manifest only: the capture is found through resolve()
+            path, written = writer.next_path(extension), False
+        with self.lock:
+            self.stats['captures'] += 1
+            self.stats['duplicates'] += duplicate
+            self.stats['bytes_referenced'] += entry['bytes']
+            self._append(self.manifest, {
+                'name': os.path.abspath(path), 'key': key, 'object': entry['object'], 'bytes': entry['bytes'],
+                'duplicate': duplicate, 'linked': linked, 'time': round(time.time(), 3),
+            })
+        return (path if written else source), duplicate
+
+    def resolve(self, name):
+        """Object file for a capture name from the manifest, or None"""
+        name = os.path.abspath(name)
+        found = None
+        for entry in self._read_log(self.manifest):
+            if entry['name'] == name:
+                found = entry
+        return self._object_path(found) if found else None
+
+    def get_stats(self):
+        with self.lock:
+            self._load()
+            stats = dict(self.stats)
+        stats['bytes_saved'] = stats['bytes_referenced'] - stats['bytes_stored']
+        return stats
+
+
+def from_settings(settings):
+    """CaptureStore configured by the capture_store_* settings"""
+    directory = settings.get('capture_store_dir') or os.path.join(
+        settings.get('output_directory', ''), DEFAULT_DIRECTORY
+    )
+    return CaptureStore(directory, settings.get('capture_store_links', 'hardlink'), settings.get('output_fsync', 'file'))
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool store'"""
+    parser = argparse.ArgumentParser(prog="screenshot-tool store", description="Show capture store statistics")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    args = parser.parse_args(argv)
+    settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+    store = from_settings(settings)
+    stats = store.get_stats()
+    print(f"📦 Capture store: {os.path.abspath(store.directory)}")
+    print(f"   {stats['captures']} captures, {stats['duplicates']} duplicates, {stats['objects']} objects")
+    print(f"   {stats['bytes_stored'] / 1e6:.1f} MB stored, {stats['bytes_saved'] / 1e6:.1f} MB saved by deduplication")
+    return 0
@@ -1,53 +1,91 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
-from PIL import Image, ImageTk, ImageDraw
-import mss
-import mss.tools
+from PIL import ImageDraw
 import os
-import datetime
+import sys
 import threading
 import time
 import math
+import queue
 
-# Import our modular components
-import settings
-import clipboard
-import magnifier
-import ui_elements
+# Import our modular components; settings, magnifier, ui_elements, clipboard,
+# capture_index and capture_store are imported when first used to keep startup fast
+import config
+import capture
+import backends
+import capture_session
+import desktop_grab
+import encode_cache
+import frame
+import output_writer
+import overlay
+import save_pipeline
+import startup_profile
+import topology
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if unknown"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
 
 class ScreenCaptureTool:
-    def __init__(self):
-        # Initialize configuration manager
-        self.config_manager = settings.ConfigManager()
-        
-        # Initialize settings with defaults
-        self.settings = {
-            'overlay_alpha': 0.2,
-            'selection_color': '#ff4444',
-            'selection_width': 2,
-            'background_color': '#2c2c2c',
-            'text_color': '#ffffff',
-            'auto_save': True,
-            'copy_to_clipboard': False,
-            'default_filename': 'screenshot',
-            'show_cursor': False,
-            'include_cursor': False,
-            'show_magnifier': False,
-            'magnifier_size': 150,
-            'magnifier_zoom': 3,
-            'overlay_color': '#222222',
-            'overlay_stipple': 'gray50',
-        }
-        
-        # Load configuration
-        self.settings = self.config_manager.load_config(self.settings)
-        
-        # Initialize monitor info
-        self.initialize_monitors()
+    def __init__(self, resident=False):
+        # A resident tool hides instead of exiting, keeping its window and session warm
+        self.resident = resident
         
-        # Initialize UI
-        self.setup_ui()
+        with startup_profile.phase("load settings"):
+            # Initialize configuration manager
+            self.config_manager = config.ConfigManager()
+            
+            # Initialize settings with defaults
+            self.settings = dict(config.DEFAULT_SETTINGS)
+            
+            # Load configuration
+            self.settings = self.config_manager.load_config(self.settings)
+        
+        with startup_profile.phase("open capture session"):
+            # One capture session for the lifetime of the tool
+            self.capture_session = capture_session.CaptureSession(
+                self.settings.get('capture_backend', 'mss'), **backends.backend_options(self.settings)
+            )
+            # Full-desktop and multi-monitor grabs run one monitor per worker thread
+            self.desktop_grabber = desktop_grab.DesktopGrabber(
+                self.capture_session, self.settings.get('desktop_grab_mode', 'auto')
+            )
+        
+            # Each capture is encoded at most once per format, shared by save and clipboard
+            self.encode_cache = encode_cache.EncodeCache()
+            store = None
+            if self.settings.get('capture_store'):
+                import capture_store
+                store = capture_store.from_settings(self.settings)
+            # Captures are encoded and written on background threads
+            self.save_pipeline = save_pipeline.SavePipeline(
+                self.settings.get('save_workers', 2), self.settings.get('save_queue_size', 4), self.encode_cache,
+                output_writer.from_settings(self.settings), store
+            )
+            self.save_poll_job = None
+            # (img, filename, uid) of saves waiting for room in the queue, in order
+            self.deferred_saves = []
+            # Every capture is recorded here, off the Tk thread; opened by the first record
+            self.capture_index = None
+        
+        with startup_profile.phase("query monitors"):
+            # Monitor layout, cached across launches and re-checked on every activation.
+            # A launch starts from the cached layout while the display is queried in the background
+            self.topology = topology.MonitorTopology(self.capture_session, use_cache=True)
+            self.topology.add_listener(self.on_topology_change)
+            self.topology.start_check()
+            
+            # Initialize monitor info
+            self.initialize_monitors()
         
         # State variables
         self.start_x = self.start_y = 0
@@ -55,6 +93,8 @@ class ScreenCaptureTool:
         self.selection_text = None
         self.is_dragging = False
         self.captured_image = None
+        # capture_index uid of the previewed capture
+        self.captured_uid = None
         self.preview_window = None
         self.magnifier_instance = None
         self.settings_dialog = None
@@ -63,92 +103,439 @@ class ScreenCaptureTool:
         self.annotation_redo_stack = []
         self.drawing_object = None
         self.text_entry = None
-        self.current_tool = tk.StringVar(value="line")
+        self.full_bg_img = None
+        self.full_bg_tk = None
+        self.background_shown = False
+        self.upload_steps = []
+        self.upload_job = None
+        self.active = False
+        self.last_activity = time.monotonic()
+        self.idle_check_id = None
+        
+        # Initialize UI
+        with startup_profile.phase("build overlay windows"):
+            self.setup_ui()
+            self.current_tool = tk.StringVar(master=self.root, value="line")
+        
+        if self.resident:
+            # Stay hidden until activate() is called
+            self.hide_overlay_windows()
+        else:
+            with startup_profile.phase("grab background"):
+                try:
+                    self.refresh_background(progressive=self.settings.get('progressive_background', True))
+                except Exception:
+                    # A stale cached layout can point outside the screen: check it now
+                    if not self.topology.verify():
+                        raise
+                    self.refresh_background(progressive=self.settings.get('progressive_background', True))
+            self.active = True
+            self.root.after_idle(self.check_topology)
+            
+            # Create magnifier only if explicitly enabled
+            if self.settings.get('show_magnifier', False):
+                with startup_profile.phase("create magnifier"):
+                    self.create_magnifier()
 
     def initialize_monitors(self):
         """Initialize monitor information with better error handling"""
         try:
-            with mss.mss() as sct:
-                # Get all monitors
-                self.monitors = sct.monitors
-                self.virtual_monitor = sct.monitors[0]  # Virtual monitor covering all screens
-                
-                # Calculate total display area
-                self.total_width = self.virtual_monitor['width']
-                self.total_height = self.virtual_monitor['height']
-                self.total_left = self.virtual_monitor['left']
-                self.total_top = self.virtual_monitor['top']
+            # Get all monitors
+            self.monitors = self.topology.monitors
+            self.virtual_monitor = self.monitors[0]  # Virtual monitor covering all screens
+            
+            # Calculate total display area
+            self.total_width = self.virtual_monitor['width']
+            self.total_height = self.virtual_monitor['height']
+            self.total_left = self.virtual_monitor['left']
+            self.total_top = self.virtual_monitor['top']
+            
+            print(f"📱 Detected {len(self.monitors)-1} monitor(s)")
+            for i, monitor in enumerate(self.monitors[1:], 1):
+                print(f"   Monitor {i}: {monitor['width']}x{monitor['height']} ({monitor['id']})")
                 
-                print(f"📱 Detected {len(self.monitors)-1} monitor(s)")
-                for i, monitor in enumerate(self.monitors[1:], 1):
-                    print(f"   Monitor {i}: {monitor['width']}x{monitor['height']}")
-                    
         except Exception as e:
             messagebox.showerror("Error", f"Failed to initialize monitors: {str(e)}")
             raise
 
+    def check_topology(self):
+        """Compare the layout a launch or activation started from with the display's"""
+        if self.topology.verify() and self.active:
+            # Only monitors whose overlay was rebuilt need a new grab
+            self.refresh_background(
+                progressive=self.settings.get('progressive_background', True),
+                overlays=[ov for ov in self.overlays if ov.image is None]
+            )
+            self.reset_overlay()
+            self.show_overlay_windows()
+
+    def on_topology_change(self, topo):
+        """Rebuild everything that depends on the monitor layout after a hotplug or mode change"""
+        print("🖥️  Monitor layout changed, rebuilding overlay")
+        # Overlays of unchanged monitors keep their frames; build_overlays() destroys the rest
+        self.hide_background()
+        self.full_bg_img = None
+        self.initialize_monitors()
+        self.desktop_grabber.reset()
+        self.per_monitor = self.use_per_monitor_overlays()
+        self.large_desktop = self.use_large_desktop_mode()
+        self.build_overlays()
+
     def setup_ui(self):
         """Setup the main UI with improved styling and functionality"""
         self.root = tk.Tk()
         self.root.title("Screen Capture Tool")
-        self.root.overrideredirect(True)
-        self.root.geometry(f"{self.total_width}x{self.total_height}+{self.total_left}+{self.total_top}")
-        
-        # Window attributes
-        self.root.lift()
-        self.root.attributes("-topmost", True)
-        self.root.attributes("-alpha", 1.0)
-        self.root.configure(bg=self.settings['background_color'])
-        
-        # Take a screenshot of the full screen for overlay effect
-        with mss.mss() as sct:
-            monitor = sct.monitors[0]
-            sct_img = sct.grab(monitor)
-            self.full_bg_img = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
-            self.full_bg_tk = ImageTk.PhotoImage(self.full_bg_img)
-        
-        # Bind keyboard shortcuts
-        self.root.bind("<Escape>", lambda e: self.cancel_capture())
-        self.root.bind("<Control-s>", lambda e: self.save_with_dialog())
-        self.root.bind("<Control-c>", lambda e: self.copy_to_clipboard())
-        self.root.bind("<Control-m>", lambda e: self.toggle_magnifier())
-        self.root.bind("<Control-comma>", lambda e: self.show_settings())
         
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.cancel_capture)
         
-        # Create canvas
-        self.canvas = tk.Canvas(
-            self.root,
-            cursor="crosshair",
-            bg=self.settings['background_color'],
-            highlightthickness=0,
-            width=self.total_width,
-            height=self.total_height
-        )
-        self.canvas.pack(fill=tk.BOTH, expand=True)
+        # Any input counts as activity for the idle policy
+        for sequence in ("<Motion>", "<KeyPress>", "<ButtonPress>"):
+            self.root.bind_all(sequence, self.note_activity, add="+")
         
-        # Display the screenshot as the canvas background
-        self.bg_img_id = self.canvas.create_image(0, 0, image=self.full_bg_tk, anchor="nw")
+        # One overlay window per monitor, or the root window covering the virtual desktop
+        self.per_monitor = self.use_per_monitor_overlays()
+        self.large_desktop = self.use_large_desktop_mode()
+        self.overlays = []
+        self.build_overlays()
         
-        # Draw a static thick yellow dashed border around the entire canvas
-        self.screen_border_id = self.canvas.create_rectangle(
-            1, 1, self.total_width-2, self.total_height-2,
-            outline="#FFD600", width=5, dash=(12, 6), tags="screen_border"
-        )
+        # Pointer-driven redraws are coalesced to the display frame rate
+        self.redraw_scheduler = overlay.RedrawScheduler(self.root, self.settings.get('overlay_fps', 60))
         
-        # Bind mouse events
-        self.canvas.bind("<ButtonPress-1>", self.on_button_press)
-        self.canvas.bind("<B1-Motion>", self.on_move_press)
-        self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
-        self.canvas.bind("<Motion>", self.on_mouse_move)
+        # Draw a static thick yellow dashed border around each monitor
+        self.create_screen_border()
         
         # Create instruction overlay
         self.create_instruction_overlay()
+
+    def use_per_monitor_overlays(self):
+        """Decide between one overlay window per monitor and one for the whole virtual desktop"""
+        layout = self.settings.get('overlay_layout', 'auto')
+        if layout in ('per_monitor', 'virtual'):
+            return layout == 'per_monitor'
+        # Separate windows pay off when the monitors leave part of the bounding box unused
+        covered = sum(m['width'] * m['height'] for m in self.monitors[1:])
+        return len(self.monitors) > 2 and covered < self.total_width * self.total_height
+
+    def build_overlays(self):
+        """Create the overlay windows, keeping those whose monitor geometry is unchanged"""
+        if self.per_monitor:
+            # The root only parents the overlay windows and dialogs
+            self.root.withdraw()
+            targets = [monitor for _, monitor in desktop_grab.physical_monitors(self.monitors)]
+        else:
+            targets = [self.virtual_monitor]
         
-        # Create magnifier only if explicitly enabled
+        def reusable(ov, monitor):
+            return (ov.matches(monitor, self.virtual_monitor) and ov.large == self.large_desktop
+                    and (ov.window is self.root) != self.per_monitor)
+        
+        stale = list(self.overlays)
+        kept = []
+        for monitor in targets:
+            ov = next((ov for ov in stale if reusable(ov, monitor)), None)
+            if ov is not None:
+                stale.remove(ov)
+            kept.append(ov)
+        for ov in stale:
+            ov.destroy()
+        
+        self.overlays = []
+        for monitor, ov in zip(targets, kept):
+            if ov is None:
+                window = tk.Toplevel(self.root) if self.per_monitor else self.root
+                window.title("Screen Capture Tool")
+                ov = overlay.MonitorOverlay(window, monitor, self.virtual_monitor, self.settings, self.large_desktop)
+                self.bind_overlay_window(ov)
+            self.overlays.append(ov)
+        if self.per_monitor:
+            self.overlays[0].window.focus_force()
+        self.canvas = self.overlays[0].canvas
+        self.selection_renderer = overlay.SelectionRendererGroup(ov.renderer for ov in self.overlays)
+
+    def bind_overlay_window(self, ov):
+        """Bind keyboard shortcuts and selection events for one overlay window"""
+        ov.window.bind("<Escape>", lambda e: self.cancel_capture())
+        ov.window.bind("<Control-s>", lambda e: self.save_with_dialog())
+        ov.window.bind("<Control-c>", lambda e: self.copy_to_clipboard())
+        ov.window.bind("<Control-m>", lambda e: self.toggle_magnifier())
+        ov.window.bind("<Control-comma>", lambda e: self.show_settings())
+        ov.window.protocol("WM_DELETE_WINDOW", self.cancel_capture)
+        self.bind_selection_events(ov.canvas)
+        ov.canvas.bind("<Motion>", self.on_mouse_move)
+
+    def bind_selection_events(self, canvas):
+        canvas.bind("<ButtonPress-1>", self.on_button_press)
+        canvas.bind("<B1-Motion>", self.on_move_press)
+        canvas.bind("<ButtonRelease-1>", self.on_button_release)
+
+    def overlay_canvases(self):
+        return [ov.canvas for ov in self.overlays]
+
+    def hide_overlay_windows(self):
+        for ov in self.overlays:
+            ov.window.withdraw()
+
+    def show_overlay_windows(self):
+        for ov in self.overlays:
+            ov.window.deiconify()
+            ov.window.lift()
+            ov.window.attributes("-topmost", True)
+        self.overlays[0].window.focus_force()
+
+    def create_screen_border(self):
+        """Draw the dashed border shown around each monitor before selecting"""
+        for ov in self.overlays:
+            ov.canvas.delete("screen_border")
+            ox, oy = ov.origin
+            ov.canvas.create_rectangle(
+                ox + 1, oy + 1, ox + ov.width - 2, oy + ov.height - 2,
+                outline="#FFD600", width=5, dash=(12, 6), tags="screen_border"
+            )
+
+    def estimate_overlay_bytes(self, large=False):
+        """Rough steady-state memory of the normal (or with large, the tiled) overlay background"""
+        if self.per_monitor:
+            pixels = sum(m['width'] * m['height'] for m in self.monitors[1:])
+        else:
+            pixels = self.total_width * self.total_height
+        if large:
+            # Raw BGRA frame (4 B/px) plus Tk's tile photos (4 B/px)
+            return pixels * (4 + 4)
+        # PIL RGB frame (3 B/px) plus Tk's bright and dimmed photos (4 B/px each)
+        return pixels * (3 + 4 + 4)
+
+    def use_large_desktop_mode(self):
+        """Decide whether the overlay must use the low-memory tiled background"""
+        mode = self.settings.get('large_desktop_mode', 'auto')
+        if mode in ('on', 'off'):
+            return mode == 'on'
+        budget = self.settings.get('memory_budget_mb', 1024) * 1024 * 1024
+        return self.estimate_overlay_bytes() > budget
+
+    def use_mapped_frames(self):
+        """Decide whether large-desktop frames are memory-mapped instead of kept in memory"""
+        storage = self.settings.get('large_desktop_storage', 'auto')
+        if storage in ('memory', 'mmap'):
+            return storage == 'mmap'
+        # Still over the budget when tiled: the frame goes to reclaimable page cache
+        budget = self.settings.get('memory_budget_mb', 1024) * 1024 * 1024
+        return self.estimate_overlay_bytes(large=True) > budget
+
+    def refresh_background(self, progressive=False, overlays=None):
+        """Take a screenshot of every overlay's monitor for the overlay background.
+
+        overlays limits the grab to some monitor overlays, e.g. the ones a
+        layout change rebuilt; the others keep their frames. With progressive
+        the on-screen copy is built from the Tk event loop afterwards, so the
+        overlay takes input as soon as the grab is done.
+        """
+        if overlays is None or not self.per_monitor:
+            overlays = self.overlays
+            self.release_background()
+        else:
+            self.hide_background()
+            for ov in overlays:
+                ov.release()
+        if self.per_monitor:
+            shots = self.desktop_grabber.grab_monitors([ov.monitor for ov in overlays])
+        else:
+            shots = [self.desktop_grabber.grab(self.monitors)]
+        for ov, shot in zip(overlays, shots):
+            ov.load(self.frame_from_grab(shot, keep_raw=progressive))
+        del shots
+        self.update_full_frame()
+        if progressive:
+            self.start_background_upload()
+        else:
+            self.show_background()
+            self.report_memory()
+
+    def frame_from_grab(self, sct_img, keep_raw=False):
+        """Convert a grab into the form the overlay keeps it in"""
+        if self.large_desktop or keep_raw:
+            # Keep only the raw frame; regions are decoded when needed
+            use_mmap = self.large_desktop and self.use_mapped_frames()
+            return frame.FrameStore(sct_img, use_mmap=use_mmap)
+        return frame.frame_to_image(sct_img)
+
+    def update_full_frame(self):
+        """Point full_bg_img at the overlays' current frames"""
+        if self.per_monitor:
+            parts = [(ov.origin, ov.image) for ov in self.overlays]
+            self.full_bg_img = frame.StitchedFrame(parts, (self.total_width, self.total_height))
+        else:
+            self.full_bg_img = self.overlays[0].image
+
+    def start_background_upload(self):
+        """Build the on-screen copy of the frame in slices between input events"""
+        self.cancel_background_upload()
+        self.upload_steps = [ov.upload_background() for ov in self.overlays]
+        self.upload_started = time.perf_counter()
+        self.full_bg_tk = None
+        self.background_shown = True
+        self.upload_job = self.root.after_idle(self.continue_background_upload)
+
+    def continue_background_upload(self):
+        """Run upload steps for one time slice, then yield to the event loop"""
+        deadline = time.perf_counter() + self.settings.get('upload_slice_ms', 8) / 1000
+        while self.upload_steps and time.perf_counter() < deadline:
+            try:
+                next(self.upload_steps[0])
+            except StopIteration:
+                self.upload_steps.pop(0)
+        if self.upload_steps:
+            self.upload_job = self.root.after(1, self.continue_background_upload)
+            return
+        self.upload_job = None
+        # Standard-mode overlays now hold decoded images instead of the raw buffers
+        self.update_full_frame()
+        self.full_bg_tk = None if self.per_monitor else self.overlays[0].photo
+        if self.magnifier_instance:
+            self.magnifier_instance.set_source(self.full_bg_tk, self.full_bg_img)
+        startup_profile.record_phase("upload background (deferred)", (time.perf_counter() - self.upload_started) * 1000)
+        self.report_memory()
+
+    def cancel_background_upload(self):
+        if self.upload_job is not None:
+            self.root.after_cancel(self.upload_job)
+            self.upload_job = None
+        self.upload_steps = []
+
+    def show_background(self):
+        """Build the on-screen copy of the frozen frame"""
+        self.cancel_background_upload()
+        for ov in self.overlays:
+            ov.show_background()
+        self.update_full_frame()
+        # The magnifier copies from a single photo only when one covers the whole desktop
+        self.full_bg_tk = None if self.per_monitor else self.overlays[0].photo
+        if self.magnifier_instance:
+            self.magnifier_instance.set_source(self.full_bg_tk, self.full_bg_img)
+        self.background_shown = True
+
+    def hide_background(self):
+        """Drop the on-screen copy of the frame but keep the frame itself"""
+        self.cancel_background_upload()
+        for ov in self.overlays:
+            ov.hide_background()
+        if self.magnifier_instance:
+            self.magnifier_instance.set_source(None, None)
+        self.full_bg_tk = None
+        self.background_shown = False
+
+    def release_background(self):
+        """Drop all background buffers"""
+        self.hide_background()
+        for ov in self.overlays:
+            ov.release()
+        self.full_bg_img = None
+
+    def report_memory(self):
+        """Print peak RSS against the configured memory budget"""
+        peak = peak_rss_mb()
+        if peak is None:
+            return
+        budget = self.settings.get('memory_budget_mb', 1024)
+        mode = "tiled large-desktop" if self.large_desktop else "standard"
+        print(f"🧠 Overlay: {mode} mode, peak RSS {peak:.0f} MB (budget {budget} MB)")
+        if peak > budget:
+            print("⚠️  Peak memory exceeded the budget; set large_desktop_mode to 'on', "
+                  "large_desktop_storage to 'mmap', or raise memory_budget_mb")
+
+    def reset_overlay(self):
+        """Clear selection and annotations and go back to selection mode"""
+        self.redraw_scheduler.cancel()
+        if self.text_entry:
+            self.cancel_text_entry()
+        for canvas in self.overlay_canvases():
+            canvas.delete("selection", "annotation", "instructions")
+        for ov in self.overlays:
+            ov.hide_mirror()
+        self.selection_renderer.end()
+        self.canvas = self.overlays[0].canvas
+        self.rect = None
+        self.selection_text = None
+        self.is_dragging = False
+        self.annotation_objects = []
+        self.annotation_redo_stack = []
+        self.drawing_object = None
+        if self.annotation_toolbar:
+            self.annotation_toolbar.destroy()
+            self.annotation_toolbar = None
+        # Recreate instruction overlay and border
+        self.create_instruction_overlay()
+        self.create_screen_border()
+        # Re-enable selection mode
+        for canvas in self.overlay_canvases():
+            canvas.config(cursor="crosshair")
+            self.bind_selection_events(canvas)
+
+    def activate(self):
+        """Show the overlay over a freshly grabbed background (resident mode)"""
+        if self.active:
+            self.show_overlay_windows()
+            return
+        # Show the overlay for the known layout and re-query it in the background;
+        # overlay windows are only rebuilt if it changed while hidden
+        self.topology.invalidate()
+        try:
+            self.refresh_background(progressive=self.settings.get('progressive_background', True))
+        except Exception:
+            # A monitor unplugged while hidden can leave the layout pointing outside the screen
+            if not self.topology.verify():
+                raise
+            self.refresh_background(progressive=self.settings.get('progressive_background', True))
+        self.reset_overlay()
+        self.active = True
+        self.show_overlay_windows()
+        self.root.after_idle(self.check_topology)
         if self.settings.get('show_magnifier', False):
             self.create_magnifier()
+        self.note_activity()
+        self.schedule_idle_check()
+
+    def dismiss(self):
+        """Hide the overlay and its windows but keep the tool running (resident mode)"""
+        if self.magnifier_instance:
+            self.magnifier_instance.destroy()
+            self.magnifier_instance = None
+        if self.preview_window:
+            self.preview_window.destroy()
+            self.preview_window = None
+        if self.settings_dialog:
+            if self.settings_dialog.dialog:
+                self.settings_dialog.dialog.destroy()
+            self.settings_dialog = None
+        if self.annotation_toolbar:
+            self.annotation_toolbar.destroy()
+            self.annotation_toolbar = None
+        self.forget_captured_image()
+        self.hide_overlay_windows()
+        self.release_background()
+        self.active = False
+        if self.idle_check_id:
+            self.root.after_cancel(self.idle_check_id)
+            self.idle_check_id = None
+
+    def note_activity(self, event=None):
+        """Record user input for the idle policy"""
+        self.last_activity = time.monotonic()
+
+    def schedule_idle_check(self):
+        """Close the overlay once it has been idle for the configured timeout"""
+        if self.idle_check_id:
+            self.root.after_cancel(self.idle_check_id)
+        self.idle_check_id = None
+        timeout = self.settings.get('idle_timeout', 300)
+        if not timeout or not self.active:
+            return
+        idle = time.monotonic() - self.last_activity
+        if idle >= timeout:
+            print("⏰ Idle timeout reached, closing overlay...")
+            self.cancel_capture()
+            return
+        self.idle_check_id = self.root.after(int((timeout - idle) * 1000) + 50, self.schedule_idle_check)
 
     def create_instruction_overlay(self):
         """Create instruction text overlay"""
@@ -162,10 +549,12 @@ class ScreenCaptureTool:
             "⌨️  Ctrl+, to open settings"
         ]
         
-        y_offset = 20
+        # Shown on the first monitor's overlay
+        primary = self.overlays[0]
+        x_offset, y_offset = primary.origin[0] + 20, primary.origin[1] + 20
         for instruction in instructions:
-            text_id = self.canvas.create_text(
-                20, y_offset,
+            text_id = primary.canvas.create_text(
+                x_offset, y_offset,
                 text=instruction,
                 fill=self.settings['text_color'],
                 anchor="nw",
@@ -177,6 +566,7 @@ class ScreenCaptureTool:
     def show_settings(self):
         """Show settings dialog"""
         if not self.settings_dialog:
+            import settings
             self.settings_dialog = settings.SettingsDialog(self.root, self.settings, self.save_settings)
         self.settings_dialog.show()
 
@@ -185,9 +575,10 @@ class ScreenCaptureTool:
         self.settings = new_settings
         
         # Update UI elements
-        self.root.attributes("-alpha", self.settings['overlay_alpha'])
-        self.root.configure(bg=self.settings['background_color'])
-        self.canvas.configure(bg=self.settings['background_color'])
+        for ov in self.overlays:
+            ov.window.attributes("-alpha", self.settings['overlay_alpha'])
+            ov.window.configure(bg=self.settings['background_color'])
+            ov.canvas.configure(bg=self.settings['background_color'])
         
         # Update magnifier
         if self.settings['show_magnifier'] and not self.magnifier_instance:
@@ -210,10 +601,15 @@ class ScreenCaptureTool:
             self.magnifier_instance.destroy()
         
         try:
+            import magnifier
             self.magnifier_instance = magnifier.Magnifier(
                 self.root, self.settings, 
                 self.total_left, self.total_top, 
-                self.total_width, self.total_height
+                self.total_width, self.total_height,
+                self.capture_session,
+                monitors=self.monitors,
+                source_photo=self.full_bg_tk,
+                source_image=self.full_bg_img
             )
         except Exception as e:
             print(f"Error creating magnifier: {e}")
@@ -234,16 +630,19 @@ class ScreenCaptureTool:
 
     def on_button_press(self, event):
         """Handle mouse button press"""
+        # The pressed monitor's canvas owns the selection; Tk's implicit grab
+        # keeps sending it motion events when the pointer crosses to another monitor
+        self.canvas = event.widget
         self.start_x = self.canvas.canvasx(event.x)
         self.start_y = self.canvas.canvasy(event.y)
         self.is_dragging = True
         
-        # Clear previous selection and overlays
+        # Clear previous selection and dim the background
         self.clear_selection()
-        self.canvas.delete("overlay_clip")
-        self.canvas.delete("selection_bg")
+        self.selection_renderer.begin()
         # Remove the screen border when starting selection
-        self.canvas.delete("screen_border")
+        for canvas in self.overlay_canvases():
+            canvas.delete("screen_border")
         
         # Create new selection rectangle
         self.rect = self.canvas.create_rectangle(
@@ -269,8 +668,15 @@ class ScreenCaptureTool:
         if not self.is_dragging or not self.rect:
             return
         
+        # Coalesce motion events; the drag is redrawn at most once per frame
         cur_x = self.canvas.canvasx(event.x)
         cur_y = self.canvas.canvasy(event.y)
+        self.redraw_scheduler.post(self.render_drag, cur_x, cur_y)
+
+    def render_drag(self, cur_x, cur_y):
+        """Redraw the selection for the current drag position"""
+        if not self.is_dragging or not self.rect:
+            return
         
         # Update rectangle
         self.canvas.coords(self.rect, self.start_x, self.start_y, cur_x, cur_y)
@@ -279,45 +685,32 @@ class ScreenCaptureTool:
         self.update_selection_info(cur_x, cur_y)
         
         # Update overlay: darken only outside the selection area
-        self.canvas.delete("overlay_clip")
-        self.canvas.delete("selection_bg")
         x1, y1 = min(self.start_x, cur_x), min(self.start_y, cur_y)
         x2, y2 = max(self.start_x, cur_x), max(self.start_y, cur_y)
-        overlay_color = self.settings.get('overlay_color', '#222222')
-        overlay_stipple = self.settings.get('overlay_stipple', 'gray50')
-        # Top
-        self.canvas.create_rectangle(0, 0, self.total_width, y1, fill=overlay_color, stipple=overlay_stipple, outline="", tags="overlay_clip")
-        # Bottom
-        self.canvas.create_rectangle(0, y2, self.total_width, self.total_height, fill=overlay_color, stipple=overlay_stipple, outline="", tags="overlay_clip")
-        # Left
-        self.canvas.create_rectangle(0, y1, x1, y2, fill=overlay_color, stipple=overlay_stipple, outline="", tags="overlay_clip")
-        # Right
-        self.canvas.create_rectangle(x2, y1, self.total_width, y2, fill=overlay_color, stipple=overlay_stipple, outline="", tags="overlay_clip")
-        
-        # Paste the selected region of the screenshot image into the selection area
-        if x2 > x1 and y2 > y1:
-            region = self.full_bg_img.crop((int(x1), int(y1), int(x2), int(y2)))
-            region_tk = ImageTk.PhotoImage(region)
-            self.selection_bg_img = region_tk  # Keep reference
-            self.canvas.create_image(x1, y1, image=region_tk, anchor="nw", tags="selection_bg")
-        
-        # Bring selection rectangle and info text to front
-        self.canvas.tag_raise(self.rect)
-        if self.selection_text:
-            self.canvas.tag_raise(self.selection_text)
+        self.selection_renderer.update(x1, y1, x2, y2)
+        self.update_selection_mirrors(x1, y1, x2, y2)
         
         # Update magnifier
         if self.magnifier_instance:
             self.magnifier_instance.update_magnifier(cur_x, cur_y)
 
+    def update_selection_mirrors(self, x1, y1, x2, y2):
+        """Outline the selection on the monitors other than the one it was started on"""
+        for ov in self.overlays:
+            if ov.canvas is not self.canvas:
+                ov.show_mirror(x1, y1, x2, y2)
+
     def on_button_release(self, event):
         """Handle mouse button release"""
         if not self.is_dragging:
             return
         
-        self.is_dragging = False
+        # Draw the exact release position instead of any coalesced one
         end_x = self.canvas.canvasx(event.x)
         end_y = self.canvas.canvasy(event.y)
+        self.redraw_scheduler.cancel()
+        self.render_drag(end_x, end_y)
+        self.is_dragging = False
         
         # Calculate selection area
         x1 = int(min(self.start_x, end_x))
@@ -325,13 +718,12 @@ class ScreenCaptureTool:
         x2 = int(max(self.start_x, end_x))
         y2 = int(max(self.start_y, end_y))
         
-        # Remove overlay clips
-        self.canvas.delete("overlay_clip")
+        # Remove the dimming
+        self.selection_renderer.end()
         
         # Check if selection is too small
         if abs(x2 - x1) < 5 or abs(y2 - y1) < 5:
             self.clear_selection()
-            self.canvas.delete("overlay")
             return
         
         # Update final selection info
@@ -347,6 +739,7 @@ class ScreenCaptureTool:
             self.annotation_toolbar = None
         
         # Create toolbar window using ui_elements
+        import ui_elements
         self.annotation_toolbar = ui_elements.AnnotationToolbar(
             self.root, 
             self.confirm_capture, 
@@ -359,27 +752,20 @@ class ScreenCaptureTool:
         # Center toolbar horizontally to the selection rectangle, at the bottom
         toolbar_width = 460
         toolbar_height = 40
-        root_x = self.root.winfo_x()
-        root_y = self.root.winfo_y()
-        sel_left = min(x1, x2) - self.total_left
-        sel_right = max(x1, x2) - self.total_left
+        # Canvas coordinates are relative to the virtual desktop's top-left corner
+        sel_left = min(x1, x2) + self.total_left
+        sel_right = max(x1, x2) + self.total_left
         sel_center_x = sel_left + ((sel_right - sel_left) // 2)
-        sel_bottom_y = max(y1, y2) - self.total_top
-        sel_top_y = min(y1, y2) - self.total_top
-        pos_x = root_x + sel_center_x - (toolbar_width // 2)
-        pos_y = root_y + sel_bottom_y + 10  # Default: below selection
-        screen_w = self.root.winfo_screenwidth()
-        screen_h = self.root.winfo_screenheight()
-        # Clamp horizontally
-        if pos_x < 0:
-            pos_x = 0
-        if pos_x + toolbar_width > screen_w:
-            pos_x = screen_w - toolbar_width
+        sel_bottom_y = max(y1, y2) + self.total_top
+        sel_top_y = min(y1, y2) + self.total_top
+        pos_x = sel_center_x - (toolbar_width // 2)
+        pos_y = sel_bottom_y + 10  # Default: below selection
+        # Keep the toolbar on the monitor holding the selection's bottom edge
+        monitor = self.topology.monitor_at(sel_center_x, sel_bottom_y - 1)
         # If not enough space below, show above selection
-        if pos_y + toolbar_height > screen_h:
-            pos_y = root_y + sel_top_y - toolbar_height - 10
-            if pos_y < 0:
-                pos_y = 0  # Clamp to top
+        if pos_y + toolbar_height > monitor['top'] + monitor['height']:
+            pos_y = sel_top_y - toolbar_height - 10
+        pos_x, pos_y = topology.clamp_to_monitor(pos_x, pos_y, toolbar_width, toolbar_height, monitor)
         self.annotation_toolbar.geometry(f"{toolbar_width}x{toolbar_height}+{pos_x}+{pos_y}")
         
         # Store selection for annotation tools
@@ -395,6 +781,11 @@ class ScreenCaptureTool:
         self.canvas.bind("<ButtonPress-1>", self.on_annotate_press)
         self.canvas.bind("<B1-Motion>", self.on_annotate_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_annotate_release)
+        # Annotations are drawn on the selecting monitor; other overlays stop taking new selections
+        for canvas in self.overlay_canvases():
+            if canvas is not self.canvas:
+                for sequence in ("<ButtonPress-1>", "<B1-Motion>", "<ButtonRelease-1>"):
+                    canvas.unbind(sequence)
 
     def on_annotate_press(self, event):
         tool = self.current_tool.get()
@@ -476,15 +867,19 @@ class ScreenCaptureTool:
 
     def on_mouse_move(self, event):
         """Handle mouse movement for real-time feedback"""
+        if self.magnifier_instance or (not self.is_dragging and self.rect):
+            canvas = event.widget
+            self.redraw_scheduler.post(self.render_hover, canvas.canvasx(event.x), canvas.canvasy(event.y))
+
+    def render_hover(self, x, y):
+        """Redraw pointer feedback for the current hover position (canvas coordinates)"""
         try:
             if not self.is_dragging and self.rect:
-                cur_x = self.canvas.canvasx(event.x)
-                cur_y = self.canvas.canvasy(event.y)
-                self.update_selection_info(cur_x, cur_y)
+                self.update_selection_info(x, y)
             
             # Update magnifier only if it's enabled
             if self.magnifier_instance:
-                self.magnifier_instance.update_magnifier(event.x, event.y)
+                self.magnifier_instance.update_magnifier(x, y)
         except Exception as e:
             # Silently handle mouse move errors to prevent crashes
             pass
@@ -510,7 +905,10 @@ class ScreenCaptureTool:
 
     def clear_selection(self):
         """Clear current selection"""
-        self.canvas.delete("selection")
+        for canvas in self.overlay_canvases():
+            canvas.delete("selection")
+        for ov in self.overlays:
+            ov.hide_mirror()
         self.rect = None
         self.selection_text = None
 
@@ -533,45 +931,153 @@ class ScreenCaptureTool:
         
         return screen_x1, screen_y1, screen_x2, screen_y2
 
-    def capture_region(self, x, y, width, height):
-        """Capture the specified region with threading support"""
+    def capture_from_background(self, x, y, width, height):
+        """Crop the specified region out of the frozen background frame"""
         try:
-            with mss.mss() as sct:
-                monitor = {"top": y, "left": x, "width": width, "height": height}
-                img = sct.grab(monitor)
-                
-                # Convert to PIL Image for processing
-                pil_img = Image.frombytes("RGB", img.size, img.rgb)
-                
-                # Add cursor if enabled and available
-                if self.settings['include_cursor']:
-                    pil_img = clipboard.add_cursor_to_image(pil_img, x, y, width, height)
-                
-                return pil_img
-                
+            left = x - self.total_left
+            top = y - self.total_top
+            pil_img = self.full_bg_img.crop((left, top, left + width, top + height))
+            
+            # Add cursor if enabled and available
+            if self.settings['include_cursor']:
+                pil_img = capture.add_cursor(pil_img, x, y, width, height)
+            
+            return pil_img
+            
         except Exception as e:
             messagebox.showerror("Capture Error", f"Failed to capture screen: {str(e)}")
             return None
 
-    def save_screenshot(self, img, filename=None):
-        """Save screenshot to file with threading"""
-        if filename is None:
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{self.settings['default_filename']}_{timestamp}.png"
-        
+    def grab_selection(self, x, y, width, height):
+        """Capture a region using the configured capture mode"""
+        if self.settings.get('capture_mode', 'frozen') == 'live':
+            return self.capture_region(x, y, width, height)
+        return self.capture_from_background(x, y, width, height)
+
+    def capture_region(self, x, y, width, height):
+        """Capture the specified region live from the screen"""
         try:
-            # Ensure filename has .png extension
-            if not filename.lower().endswith('.png'):
-                filename += '.png'
-            
-            # Save the image
-            img.save(filename, "PNG")
-            print(f"✅ Screenshot saved to {filename}")
-            return filename
-            
+            return capture.capture_region(
+                self.capture_session, x, y, width, height,
+                include_cursor=self.settings['include_cursor']
+            )
         except Exception as e:
+            messagebox.showerror("Capture Error", f"Failed to capture screen: {str(e)}")
+            return None
+
+    def index_capture(self, img, source, x, y, grab_ms, **fields):
+        """Record a capture in the capture index; returns its uid, or None without an index"""
+        if img is None or not self.settings.get('capture_index', True):
+            return None
+        if self.capture_index is None:
+            import capture_index
+            self.capture_index = capture_index.from_settings(self.settings)
+        monitor = self.topology.monitor_at(x + img.size[0] // 2, y + img.size[1] // 2)
+        try:
+            return self.capture_index.record(
+                img, source, x=x, y=y, monitor=monitor['id'], grab_ms=round(grab_ms, 3), **fields
+            )
+        except RuntimeError:
+            return None
+
+    def update_index(self, uid, **fields):
+        if self.capture_index is not None and uid is not None:
+            try:
+                self.capture_index.update(uid, **fields)
+            except RuntimeError:
+                pass
+
+    def submit_save(self, img, filename, uid, block):
+        """Hand a screenshot to the save pipeline; raises queue.Full unless block"""
+        image_format = self.settings.get('output_format', 'auto').upper()
+        if filename is not None:
+            image_format = capture.format_from_filename(filename, image_format)
+        # Without a filename the pipeline's writer picks a unique name once the format is known
+        return self.save_pipeline.submit(
+            img, filename, image_format, on_done=self.on_save_done, block=block,
+            policy=self.settings.get('quality_policy', 'lossless'),
+            record=self.capture_index.describe(uid) if self.capture_index is not None and uid else None
+        )
+
+    def save_screenshot(self, img, filename=None, waiting=False, uid=None):
+        """Queue a screenshot to be encoded and saved in the background; returns the SaveJob"""
+        try:
+            job = self.submit_save(img, filename, uid, block=False)
+        except queue.Full:
+            # Backpressure without blocking the Tk thread: try again once a save finishes
+            if not waiting:
+                print("⏳ Save queue full, waiting for earlier saves to finish")
+                self.set_save_status("⏳ Waiting for earlier saves...")
+            entry = (img, filename, uid)
+            self.deferred_saves.append(entry)
+            self.root.after(100, self.retry_save, entry)
+            return None
+        except RuntimeError as e:
             messagebox.showerror("Save Error", f"Failed to save screenshot: {str(e)}")
             return None
+        
+        self.set_save_status(f"💾 Saving... ({self.save_pipeline.pending} pending)")
+        if self.save_poll_job is None:
+            self.save_poll_job = self.root.after(50, self.poll_saves)
+        return job
+
+    def retry_save(self, entry):
+        """Submit a deferred save again, unless flush_saves() already took it"""
+        if not any(waiting is entry for waiting in self.deferred_saves):
+            return
+        self.deferred_saves = [waiting for waiting in self.deferred_saves if waiting is not entry]
+        self.save_screenshot(*entry[:2], waiting=True, uid=entry[2])
+
+    def poll_saves(self):
+        """Run completion callbacks of finished saves on the Tk thread"""
+        self.save_poll_job = None
+        self.save_pipeline.run_callbacks()
+        if self.save_pipeline.pending:
+            self.save_poll_job = self.root.after(50, self.poll_saves)
+
+    def on_save_done(self, job):
+        """Report a finished save; called on the Tk thread"""
+        if job.img is not self.captured_image:
+            # Saved from the overlay, or the preview has moved on: nobody will reuse the encoding
+            self.encode_cache.evict(job.img)
+        if job.ok:
+            detail = "same pixels as an earlier capture" if job.duplicate else job.plan.label if job.plan else "stored"
+            print(f"✅ Screenshot saved to {job.path} ({detail}, {job.elapsed_ms:.0f} ms)")
+            if job.record is not None:
+                self.update_index(
+                    job.record['uid'], path=job.path, encode_ms=round(job.elapsed_ms, 3),
+                    format=capture.format_from_filename(job.path, None)
+                )
+            self.set_save_status(f"✅ Saved {os.path.basename(job.path)}")
+        else:
+            print(f"❌ Failed to save screenshot: {job.error}")
+            self.set_save_status("❌ Save failed")
+            if self.root:
+                messagebox.showerror("Save Error", f"Failed to save screenshot: {str(job.error)}")
+
+    def set_save_status(self, text):
+        if self.preview_window:
+            self.preview_window.set_status(text)
+
+    def flush_saves(self):
+        """Finish every queued save before the tool exits"""
+        if self.save_poll_job is not None:
+            self.root.after_cancel(self.save_poll_job)
+            self.save_poll_job = None
+        deferred, self.deferred_saves = self.deferred_saves, []
+        pending = self.save_pipeline.pending + len(deferred)
+        if pending:
+            print(f"⏳ Finishing {pending} pending save(s)...")
+        for img, filename, uid in deferred:
+            # Nothing else will retry these once the tool exits
+            try:
+                self.submit_save(img, filename, uid, block=True)
+            except RuntimeError as e:
+                print(f"❌ Failed to save screenshot: {e}")
+        self.save_pipeline.close()
+        # Saves update their index records, so the index closes after them
+        if self.capture_index is not None:
+            self.capture_index.close()
 
     def copy_to_clipboard(self):
         """Copy screenshot to clipboard with threading"""
@@ -583,9 +1089,15 @@ class ScreenCaptureTool:
         x1, y1, x2, y2 = coords
         width, height = x2 - x1, y2 - y1
         
-        img = self.capture_region(x1, y1, width, height)
+        started = time.perf_counter()
+        img = self.grab_selection(x1, y1, width, height)
+        grab_ms = (time.perf_counter() - started) * 1000
         if img:
-            success = clipboard.copy_image_to_clipboard(img, self.root)
+            import clipboard
+            success = clipboard.copy_image_to_clipboard(
+                img, self.root, use_x11=self.settings.get('x11_clipboard', True)
+            )
+            self.index_capture(img, 'copy', x1, y1, grab_ms, clipboard=success)
             if not success:
                 messagebox.showerror("Clipboard Error", "Failed to copy to clipboard")
 
@@ -599,7 +1111,9 @@ class ScreenCaptureTool:
         x1, y1, x2, y2 = coords
         width, height = x2 - x1, y2 - y1
         
-        img = self.capture_region(x1, y1, width, height)
+        started = time.perf_counter()
+        img = self.grab_selection(x1, y1, width, height)
+        grab_ms = (time.perf_counter() - started) * 1000
         if img:
             # Show save dialog
             filename = filedialog.asksaveasfilename(
@@ -609,7 +1123,7 @@ class ScreenCaptureTool:
             )
             
             if filename:
-                self.save_screenshot(img, filename)
+                self.save_screenshot(img, filename, uid=self.index_capture(img, 'save', x1, y1, grab_ms))
 
     def confirm_capture(self):
         """Confirm and capture the current selection with annotations"""
@@ -629,16 +1143,29 @@ class ScreenCaptureTool:
         canvas_x1 = int(min(canvas_coords[0], canvas_coords[2]))
         canvas_y1 = int(min(canvas_coords[1], canvas_coords[3]))
         
-        # Hide the capture window
-        self.root.withdraw()
-        self.root.update()
+        if self.settings.get('capture_mode', 'frozen') == 'live':
+            # Hide the capture window and wait for it to unmap before re-grabbing
+            self.hide_overlay_windows()
+            self.root.update()
+            started = time.perf_counter()
+            img = self.capture_region(x1, y1, width, height)
+        else:
+            # Crop from the frozen frame; no need to wait for the overlay to go away
+            started = time.perf_counter()
+            img = self.capture_from_background(x1, y1, width, height)
+            self.hide_overlay_windows()
+        grab_ms = (time.perf_counter() - started) * 1000
+        
+        # The overlay is closed; free its display buffers (retry rebuilds them)
+        self.hide_background()
         
-        # Capture the region
-        img = self.capture_region(x1, y1, width, height)
         if img:
             # Composite annotations onto the image using canvas offsets
             self.render_annotations_on_image(img, canvas_x1, canvas_y1)
             self.show_preview_window(img)
+            self.captured_uid = self.index_capture(
+                img, 'overlay', x1, y1, grab_ms, annotations=len(self.annotation_objects)
+            )
         else:
             self.show_capture_error()
 
@@ -689,7 +1216,12 @@ class ScreenCaptureTool:
         """Show preview window with retry/redo options"""
         if self.preview_window:
             self.preview_window.destroy()
+        self.forget_captured_image()
+        
+        # Save and Copy both want PNG; start encoding while the user looks at the preview
+        self.encode_cache.prefetch(img, 'PNG')
         
+        import ui_elements
         self.preview_window = ui_elements.PreviewWindow(
             self.root, img,
             self.save_from_preview,
@@ -701,6 +1233,13 @@ class ScreenCaptureTool:
         # Store the captured image
         self.captured_image = img
 
+    def forget_captured_image(self):
+        """Drop the previewed capture and its cached encodings"""
+        if self.captured_image is not None:
+            self.encode_cache.evict(self.captured_image)
+        self.captured_image = None
+        self.captured_uid = None
+
     def save_from_preview(self):
         """Save screenshot from preview window"""
         if self.captured_image:
@@ -711,13 +1250,26 @@ class ScreenCaptureTool:
             )
             
             if filename:
-                self.save_screenshot(self.captured_image, filename)
+                self.save_screenshot(self.captured_image, filename, uid=self.captured_uid)
+
+    def release_clipboard(self):
+        """Keep a copied capture pasteable after exit (X11 selections die with their owner)"""
+        # Nothing to release unless something was copied
+        clipboard = sys.modules.get('clipboard')
+        if clipboard is not None:
+            clipboard.release_clipboard()
 
     def copy_from_preview(self):
         """Copy screenshot from preview window"""
         if self.captured_image:
-            success = clipboard.copy_image_to_clipboard(self.captured_image, self.root)
-            if not success:
+            import clipboard
+            success = clipboard.copy_image_to_clipboard(
+                self.captured_image, self.root, self.encode_cache.get,
+                use_x11=self.settings.get('x11_clipboard', True), on_release=self.encode_cache.evict
+            )
+            if success:
+                self.update_index(self.captured_uid, clipboard=True)
+            else:
                 messagebox.showerror("Clipboard Error", "Failed to copy to clipboard")
 
     def retry_capture(self):
@@ -725,33 +1277,25 @@ class ScreenCaptureTool:
         if self.preview_window:
             self.preview_window.destroy()
             self.preview_window = None
-        self.captured_image = None
+        self.forget_captured_image()
         # Restore main window and reset state for new selection
         if self.root:
-            self.root.deiconify()
-            self.root.lift()
-            self.canvas.delete("all")
-            self.rect = None
-            self.selection_text = None
-            self.is_dragging = False
-            self.annotation_objects = []
-            self.annotation_redo_stack = []
-            self.drawing_object = None
-            self.text_entry = None
-            if self.annotation_toolbar:
-                self.annotation_toolbar.destroy()
-                self.annotation_toolbar = None
-            # Recreate instruction overlay
-            self.create_instruction_overlay()
-            # Re-enable selection mode
-            self.canvas.config(cursor="crosshair")
-            self.canvas.bind("<ButtonPress-1>", self.on_button_press)
-            self.canvas.bind("<B1-Motion>", self.on_move_press)
-            self.canvas.bind("<ButtonRelease-1>", self.on_button_release)
+            if self.full_bg_img is not None and not self.background_shown:
+                self.show_background()
+            self.show_overlay_windows()
+            self.reset_overlay()
 
     def close_preview(self):
         """Close preview window and exit"""
+        if self.resident:
+            self.dismiss()
+            return
         try:
+            # Queued saves must reach the disk before the process exits
+            self.flush_saves()
+            self.encode_cache.close()
+            self.release_clipboard()
+            
             if self.preview_window:
                 self.preview_window.destroy()
                 self.preview_window = None
@@ -763,6 +1307,9 @@ class ScreenCaptureTool:
             if self.root:
                 self.root.quit()
                 self.root.destroy()
+            
+            self.desktop_grabber.close()
+            self.capture_session.close()
                 
         except Exception as e:
             print(f"Error during preview cleanup: {e}")
@@ -773,11 +1320,21 @@ class ScreenCaptureTool:
     def show_capture_error(self):
         """Show capture error and restore window"""
         messagebox.showerror("Capture Error", "Failed to capture screenshot")
-        self.root.deiconify()
+        if self.full_bg_img is not None and not self.background_shown:
+            self.show_background()
+        self.show_overlay_windows()
 
     def cancel_capture(self):
         """Cancel the capture operation"""
+        if self.resident:
+            self.dismiss()
+            return
         try:
+            # Queued saves must reach the disk before the process exits
+            self.flush_saves()
+            self.encode_cache.close()
+            self.release_clipboard()
+            
             # Clean up magnifier
             if self.magnifier_instance:
                 self.magnifier_instance.destroy()
@@ -797,6 +1354,10 @@ class ScreenCaptureTool:
             if self.root:
                 self.root.quit()
                 self.root.destroy()
+            
+            # Release the grab workers and the display connection
+            self.desktop_grabber.close()
+            self.capture_session.close()
                 
         except Exception as e:
             print(f"Error during cleanup: {e}")
@@ -846,35 +1407,46 @@ class ScreenCaptureTool:
             if obj_id:
                 self.annotation_objects.append(obj_id)
 
-    def run(self):
-        """Run the application"""
+    def run(self, exit_when_ready=False):
+        """Run the application; exit_when_ready closes it as soon as the overlay is interactive"""
         try:
             print("🚀 Starting Screen Capture Tool...")
             print("💡 Tips: Click and drag to select, ESC to cancel, Enter to capture")
             print(f"🔍 Magnifier: {'Enabled' if self.settings['show_magnifier'] else 'Disabled'}")
-            print(f"🖱️  Cursor capture: {'Available' if clipboard.CURSOR_CAPTURE_AVAILABLE else 'Not available'}")
-            print(f"📋 Advanced clipboard: {'Available' if clipboard.WINDOWS_CLIPBOARD_AVAILABLE else 'Not available'}")
+            # Checking availability imports pyautogui, so only do it when the cursor is wanted
+            if self.settings['include_cursor']:
+                import clipboard
+                print(f"🖱️  Cursor capture: {'Available' if clipboard.cursor_capture_available() else 'Not available'}")
             print(f"⚙️  Settings: Press Ctrl+, to open settings")
             
-            # Add a timeout to prevent endless loops (5 minutes)
-            def timeout_handler():
-                print("⏰ Timeout reached, closing application...")
-                self.cancel_capture()
-            
-            # Schedule timeout after 5 minutes
-            self.root.after(300000, timeout_handler)  # 5 minutes = 300000 ms
+            # Close the overlay if it is left idle (5 minutes by default)
+            self.note_activity()
+            self.schedule_idle_check()
             
+            # The first idle callback runs once the overlay windows are mapped
+            self.root.after_idle(startup_profile.mark_ready)
+            if exit_when_ready:
+                self.root.after_idle(self.cancel_capture)
             self.root.mainloop()
+            
+            if self.settings.get('show_render_stats', False):
+                self.print_render_stats()
         except Exception as e:
             print(f"❌ Application error: {str(e)}")
             self.cancel_capture()
 
 
-def run_capture_tool():
+    def print_render_stats(self):
+        """Print overlay redraw counters collected during this session"""
+        print(f"📊 Pointer redraws: {self.redraw_scheduler.get_stats()}")
+        print(f"📊 Selection renderer: {self.selection_renderer.stats}")
+
+
+def run_capture_tool(exit_when_ready=False):
     """Main entry point for the application"""
     try:
         app = ScreenCaptureTool()
-        app.run()
+        app.run(exit_when_ready)
     except Exception as e:
         print(f"❌ Failed to start application: {str(e)}")
         input("Press Enter to exit...") 
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Headless command-line capture for scripts and automation.
+
+    screenshot-tool capture --region 0,0,800,600 -o shot.png
+    screenshot-tool capture --monitor 1 --format jpeg -o -
+    screenshot-tool capture --all -o captures/
+    screenshot-tool capture --regions-file regions.txt -o captures/
+    screenshot-tool capture --all --format auto --quality small -o captures/
+
+Every capture is recorded in the capture index (see capture_index), and
+PNG files carry their record.
+
+This path never imports tkinter or builds the overlay window.
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+
+import backends
+import capture
+import capture_index
+import capture_session
+import config
+import export
+import output_writer
+
+
+def parse_region(value):
+    """Parse an 'x,y,w,h' string into a tuple of ints"""
+    try:
+        x, y, width, height = (int(part) for part in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid region '{value}', expected x,y,w,h")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid region '{value}', width and height must be positive")
+    return x, y, width, height
+
+
+def read_regions_file(path):
+    """Read a regions file: one 'x,y,w,h [output]' per line, '#' starts a comment"""
+    entries = []
+    with open(path, 'r') as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.split('#', 1)[0].strip()
+            if not line:
+                continue
+            parts = line.split(None, 1)
+            try:
+                region = parse_region(parts[0])
+            except argparse.ArgumentTypeError as e:
+                raise ValueError(f"{path}:{line_no}: {e}")
+            entries.append((region, parts[1].strip() if len(parts) > 1 else None))
+    return entries
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="screenshot-tool capture",
+        description="Capture the screen without opening the selection overlay",
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--region", type=parse_region, metavar="X,Y,W,H", help="capture a screen region")
+    target.add_argument("--monitor", type=int, metavar="N", help="capture monitor N (1-based)")
+    target.add_argument("--all", action="store_true", help="capture the whole virtual desktop")
+    target.add_argument("--regions-file", metavar="FILE",
+                        help="capture every 'x,y,w,h [output]' line of FILE from a single grab")
+    parser.add_argument("-o", "--output", metavar="PATH",
+                        help="output file, directory, or '-' for stdout (default: timestamped file)")
+    parser.add_argument("--format", choices=[f.lower() for f in export.EXPORT_FORMATS],
+                        help="image format; 'auto' picks one by content (default: from the output extension, else png)")
+    parser.add_argument("--quality", choices=list(export.QUALITY_POLICIES),
+                        help="quality policy for auto, webp and jpeg (default: quality_policy setting)")
+    parser.add_argument("--cursor", action="store_true", default=None, help="draw the cursor into the capture")
+    parser.add_argument("--no-cursor", action="store_const", const=False, dest="cursor",
+                        help="leave the cursor out even if include_cursor is set")
+    parser.add_argument("--backend", choices=list(backends.BACKENDS),
+                        help="capture backend (default: capture_backend setting)")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    return parser
+
+
+def auto_writer(output, settings):
+    """OutputWriter naming captures when output is unset or a directory, else None"""
+    if output is None or os.path.isdir(output) or output.endswith(os.sep):
+        return output_writer.from_settings(settings, output)
+    return None
+
+
+def indexed_output(output, index):
+    """output with '_<index>' before its extension, for several captures to one name"""
+    stem, ext = os.path.splitext(output)
+    return f"{stem}_{index}{ext}"
+
+
+def write_image(img, output, image_format, policy='lossless', writer=None, suffix="", record=None):
+    """Write one capture to a file, stdout ('-') or a new name from writer; returns the path written.
+
+    record, a capture_index record, is embedded when the capture becomes a PNG file.
+    """
+    if output == '-':
+        data, _ = export.encode(img, image_format, policy)
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return '-'
+    if writer is None and record is None:
+        return export.save(img, output, image_format, policy)[0]
+    data, plan = export.encode(img, image_format, policy)
+    if record is not None and plan.image_format == 'PNG':
+        data = capture_index.tag_png(data, record)
+    if writer is not None:
+        return writer.write(data, capture.FORMAT_EXTENSIONS[plan.image_format][0], suffix)
+    return capture.write_encoded(data, export.output_filename(output, image_format), plan.image_format)
+
+
+def run_capture(args, settings, session, index=None):
+    """Perform the captures described by parsed args; returns the paths written.
+
+    With a capture_index.CaptureIndex every capture is recorded in it.
+    """
+    include_cursor = settings['include_cursor'] if args.cursor is None else args.cursor
+    image_format = args.format.upper() if args.format else None
+    policy = args.quality or settings.get('quality_policy', 'lossless')
+
+    writer = None if args.output == '-' else auto_writer(args.output, settings)
+
+    def write_indexed(img, region, grab_ms, output, image_format, suffix=""):
+        """write_image(), recording the capture of region (x, y, w, h) in the index"""
+        if index is None:
+            return write_image(img, output, image_format, policy, writer if output is None else None, suffix)
+        x, y = region[:2]
+        uid = index.record(img, 'cli', x=x, y=y, monitor=capture_index.monitor_id_at(session.monitors, *region),
+                           grab_ms=round(grab_ms, 3))
+        started = time.perf_counter()
+        path = write_image(img, output, image_format, policy, writer if output is None else None, suffix,
+                           index.describe(uid))
+        if path != '-':
+            index.update(uid, path=path, format=capture.format_from_filename(path, None),
+                         encode_ms=round((time.perf_counter() - started) * 1000, 3))
+        return path
+
+    started = time.perf_counter()
+    if args.regions_file:
+        entries = read_regions_file(args.regions_file)
+        if args.output == '-':
+            raise ValueError("cannot write several captures to stdout")
+        images = capture.capture_regions(session, [region for region, _ in entries], include_cursor)
+        grab_ms = (time.perf_counter() - started) * 1000 / max(1, len(entries))
+        written = []
+        for number, ((region, output), img) in enumerate(zip(entries, images), 1):
+            if output:
+                written.append(write_indexed(img, region, grab_ms, output,
+                                             image_format or capture.format_from_filename(output)))
+            elif writer is not None:
+                written.append(write_indexed(img, region, grab_ms, None, image_format or 'PNG', f"_{number}"))
+            else:
+                output = indexed_output(args.output, number)
+                written.append(write_indexed(img, region, grab_ms, output,
+                                             image_format or capture.format_from_filename(output)))
+        return written
+
+    if args.all:
+        img = capture.capture_desktop(session, include_cursor, settings.get('desktop_grab_mode', 'auto'))
+        desktop = session.monitors[0]
+        region = (desktop['left'], desktop['top'], desktop['width'], desktop['height'])
+    else:
+        if args.region:
+            region = args.region
+        else:
+            monitors = session.monitors
+            if args.monitor < 1 or args.monitor >= len(monitors):
+                raise ValueError(f"no monitor {args.monitor}; {len(monitors) - 1} monitor(s) available")
+            monitor = monitors[args.monitor]
+            region = (monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+        img = capture.capture_region(session, *region, include_cursor)
+    grab_ms = (time.perf_counter() - started) * 1000
+
+    if writer is not None:
+        return [write_indexed(img, region, grab_ms, None, image_format or 'PNG')]
+    output = args.output
+    return [write_indexed(img, region, grab_ms, output,
+                          image_format or ('PNG' if output == '-' else capture.format_from_filename(output)))]
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool capture'"""
+    args = build_parser().parse_args(argv)
+
+    # Keep stdout clean for image data and output paths
+    with contextlib.redirect_stdout(sys.stderr):
+        settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+
+    if args.backend:
+        settings['capture_backend'] = args.backend
+
+    with contextlib.redirect_stdout(sys.stderr):
+        index = capture_index.from_settings(settings)
+    try:
+        with capture_session.CaptureSession(settings['capture_backend'], **backends.backend_options(settings)) as session:
+            written = run_capture(args, settings, session, index)
+    except Exception as e:
+        print(f"❌ Capture failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if index is not None:
+            index.close()
+
+    for path in written:
+        if path != '-':
+            print(path)
+    return 0
@@ -1,36 +1,79 @@
 import sys
-from io import BytesIO
 from PIL import Image, ImageDraw
 
-try:
-    import win32clipboard
-    import win32con
-    WINDOWS_CLIPBOARD_AVAILABLE = True
-except ImportError:
-    WINDOWS_CLIPBOARD_AVAILABLE = False
-    print("⚠️  Windows clipboard support not available. Install pywin32 for better clipboard functionality.")
-
-try:
-    import pyperclip
-except ImportError:
-    pyperclip = None
-
-try:
-    import pyautogui
-    CURSOR_CAPTURE_AVAILABLE = True
-except ImportError:
-    CURSOR_CAPTURE_AVAILABLE = False
-    print("⚠️  Cursor capture not available. Install pyautogui for cursor support.")
-
-
-def copy_image_to_clipboard(img, root=None):
-    """Copy PIL image to clipboard, using Windows API if available, else fallback."""
-    if WINDOWS_CLIPBOARD_AVAILABLE:
+import capture
+
+# Optional dependencies are imported on first use: pyautogui alone pulls in a
+# large dependency tree and needs a display, and none of them are needed
+# unless a capture is copied or the cursor is drawn.
+_modules = {}
+
+
+def _load(name, warning=None):
+    """Import an optional module once, returning None (and warning once) if it is missing"""
+    if name not in _modules:
         try:
-            output = BytesIO()
-            img.convert('RGB').save(output, 'BMP')
-            data = output.getvalue()[14:]
-            output.close()
+            _modules[name] = __import__(name)
+        except Exception:
+            # pyautogui raises more than ImportError without a usable display
+            _modules[name] = None
+            if warning:
+                print(warning)
+    return _modules[name]
+
+
+def _win32():
+    """(win32clipboard, win32con), or None without pywin32"""
+    if sys.platform != "win32":
+        return None
+    warning = "⚠️  Windows clipboard support not available. Install pywin32 for better clipboard functionality."
+    clipboard_module = _load("win32clipboard", warning)
+    con = _load("win32con")
+    return (clipboard_module, con) if clipboard_module and con else None
+
+
+_x11_owner = None
+
+
+def _x11():
+    """The process-wide X11 clipboard owner, or None without X11/python-xlib"""
+    global _x11_owner
+    if _x11_owner is None:
+        import x11_clipboard
+        _x11_owner = False
+        if x11_clipboard.available():
+            try:
+                _x11_owner = x11_clipboard.X11ClipboardOwner()
+            except Exception as e:
+                print(f"⚠️  X11 clipboard not available: {e}")
+    return _x11_owner or None
+
+
+def windows_clipboard_available():
+    """True if captures can be copied through the Windows clipboard API"""
+    return _win32() is not None
+
+
+def cursor_capture_available():
+    """True if pyautogui can report the cursor position"""
+    return _load("pyautogui", "⚠️  Cursor capture not available. Install pyautogui for cursor support.") is not None
+
+
+def copy_image_to_clipboard(img, root=None, encode=capture.encode_image, use_x11=True, on_release=None):
+    """Copy PIL image to clipboard, using Windows API or an X11 owner if available, else fallback.
+
+    encode(img, image_format) returns the encoded bytes; pass an EncodeCache's
+    get() to reuse encodings. The X11 owner encodes only the format a paste
+    asks for and calls on_release(img) once img leaves the clipboard.
+    """
+    win32 = _win32()
+    x11 = None if win32 or not use_x11 else _x11()
+    pyperclip = None if win32 or x11 or root is not None else _load("pyperclip")
+    if win32:
+        win32clipboard, win32con = win32
+        try:
+            # CF_DIB is a BMP file without its 14-byte file header
+            data = encode(img, 'BMP')[14:]
             win32clipboard.OpenClipboard()
             win32clipboard.EmptyClipboard()
             win32clipboard.SetClipboardData(win32con.CF_DIB, data)
@@ -40,13 +83,19 @@ def copy_image_to_clipboard(img, root=None):
         except Exception as e:
             print(f"Clipboard error (Windows): {e}")
             return False
+    elif x11:
+        try:
+            if not x11.offer(img, encode, on_release):
+                raise RuntimeError("another client kept the selection")
+            print("📋 Screenshot copied to clipboard (X11, PNG/BMP/JPEG on demand)")
+            return True
+        except Exception as e:
+            print(f"Clipboard error (X11): {e}")
+            return False
     elif root is not None:
         try:
-            output = BytesIO()
-            img.save(output, format='PNG')
-            output.seek(0)
             root.clipboard_clear()
-            root.clipboard_append(output.getvalue())
+            root.clipboard_append(encode(img, 'PNG'))
             print("📋 Screenshot copied to clipboard (Tkinter)")
             return True
         except Exception as e:
@@ -54,9 +103,7 @@ def copy_image_to_clipboard(img, root=None):
             return False
     elif pyperclip:
         try:
-            output = BytesIO()
-            img.save(output, format='PNG')
-            pyperclip.copy(output.getvalue())
+            pyperclip.copy(encode(img, 'PNG'))
             print("📋 Screenshot copied to clipboard (pyperclip)")
             return True
         except Exception as e:
@@ -67,14 +114,26 @@ def copy_image_to_clipboard(img, root=None):
         return False
 
 
+def release_clipboard(persist=True):
+    """Before exiting: hand an owned X11 clipboard image to a background server, or drop it"""
+    if not _x11_owner:
+        return
+    try:
+        if persist and _x11_owner.owns:
+            _x11_owner.persist()
+    except Exception as e:
+        print(f"⚠️  Could not keep the clipboard after exit: {e}")
+    _x11_owner.close()
+
+
 def add_cursor_to_image(img, capture_x, capture_y, capture_width, capture_height):
     """Add cursor to the captured image"""
-    if not CURSOR_CAPTURE_AVAILABLE:
+    if not cursor_capture_available():
         return img
         
     try:
         # Get cursor position
-        cursor_x, cursor_y = pyautogui.position()
+        cursor_x, cursor_y = _load("pyautogui").position()
         
         # Check if cursor is within capture area
         if (capture_x <= cursor_x <= capture_x + capture_width and 
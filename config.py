@@ -0,0 +1,82 @@
+import os
+import json
+
+# Default settings; values from the configuration file override these
+DEFAULT_SETTINGS = {
+    'overlay_alpha': 0.2,
+    'selection_color': '#ff4444',
+    'selection_width': 2,
+    'background_color': '#2c2c2c',
+    'text_color': '#ffffff',
+    'auto_save': True,
+    'copy_to_clipboard': False,
+    'default_filename': 'screenshot',
+    'show_cursor': False,
+    'include_cursor': False,
+    'show_magnifier': False,
+    'magnifier_size': 150,
+    'magnifier_zoom': 3,
+    'overlay_color': '#222222',
+    'overlay_stipple': 'gray50',
+    'overlay_dim': 0.5,  # how strongly the area outside the selection is darkened (0-1)
+    'capture_mode': 'frozen',  # 'frozen' crops the overlay background, 'live' re-grabs the screen
+    'overlay_fps': 60,  # upper bound on pointer-driven overlay redraws per second
+    'show_render_stats': False,  # print redraw statistics on exit
+    'large_desktop_mode': 'auto',  # 'auto' switches to the tiled low-memory overlay above the budget, or 'on'/'off'
+    'large_desktop_storage': 'auto',  # 'memory', 'mmap', or 'auto' to mmap the frame when tiles alone exceed the budget
+    'memory_budget_mb': 1024,  # overlay memory budget used by large_desktop_mode 'auto'
+    'desktop_grab_mode': 'auto',  # full-desktop grabs: 'parallel' per-monitor, 'single' bounding box, or 'auto'
+    'overlay_layout': 'auto',  # 'per_monitor' windows, one 'virtual' desktop window, or 'auto' (per-monitor when monitors leave gaps)
+    'capture_backend': 'mss',  # 'mss', 'xshm' (direct X11 MIT-SHM), 'pillow' (PIL.ImageGrab) or 'synthetic' (no display)
+    'synthetic_layout': '1920x1080+0+0,1920x1080+1920+0',  # monitors of the synthetic backend, WxH+X+Y separated by commas
+    'progressive_background': True,  # take input right after the grab and upload the overlay background in slices
+    'upload_slice_ms': 8,  # time per background upload slice between input events
+    'save_workers': 2,  # background threads encoding and writing saved captures
+    'save_queue_size': 4,  # saves that may wait for an encoder before Save backs off
+    'output_format': 'auto',  # 'auto' picks by content, or 'png', 'png8', 'webp', 'jpeg', 'qoi' (Pillow 11+)
+    'quality_policy': 'lossless',  # for 'auto' and webp/jpeg: 'lossless', 'balanced' or 'small'
+    'output_directory': '',  # where auto-named captures go ('' is the working directory)
+    'output_sharding': 'day',  # sub-directories per 'day', 'hour', 'month', or 'none'
+    'output_fsync': 'file',  # 'none', 'file' (fsync before the atomic rename) or 'full' (also the directory)
+    'capture_store': False,  # save each distinct capture once and hard-link duplicates to it
+    'capture_store_dir': '',  # store location ('' is .capture_store in output_directory)
+    'capture_store_links': 'hardlink',  # expose captures as 'hardlink's or only in the 'manifest'
+    'history_directory': 'history',  # where 'serve' keeps output "history" captures as keyframes and tile deltas
+    'history_keyframe_interval': 16,  # longest delta chain left by history compaction
+    'capture_index': True,  # record every capture (geometry, monitor, timings, file, hash) in a SQLite index
+    'capture_index_path': '',  # index database ('' is ~/.local/share/screenshot-tool/captures.db)
+    'x11_clipboard': True,  # own the X11 CLIPBOARD and encode PNG/BMP/JPEG only when pasted
+    'idle_timeout': 300,  # seconds without input before the overlay closes (0 disables)
+}
+
+
+class ConfigManager:
+    """Manages configuration file operations"""
+    
+    def __init__(self, config_file="screenshot_config.json"):
+        self.config_file = config_file
+        
+    def load_config(self, default_settings):
+        """Load configuration from file"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r') as f:
+                    loaded_settings = json.load(f)
+                    # Merge with defaults to ensure all keys exist
+                    default_settings.update(loaded_settings)
+                    print(f"✅ Loaded configuration from {self.config_file}")
+            else:
+                print("📝 No configuration file found, using defaults")
+        except Exception as e:
+            print(f"⚠️  Failed to load configuration: {e}")
+        
+        return default_settings
+    
+    def save_config(self, settings):
+        """Save configuration to file"""
+        try:
+            with open(self.config_file, 'w') as f:
+                json.dump(settings, f, indent=2)
+            print(f"✅ Configuration saved to {self.config_file}")
+        except Exception as e:
+            print(f"⚠️  Failed to save configuration: {e}")
@@ -0,0 +1,211 @@
+"""
+Resident capture daemon.
+
+    screenshot-tool daemon            # start the daemon (keeps running)
+    screenshot-tool trigger           # show the overlay from the running daemon
+    screenshot-tool trigger --quit    # stop the daemon
+
+The daemon builds ScreenCaptureTool once in resident mode and keeps its Tk
+root, canvas and capture session alive but hidden. A trigger only has to
+grab a fresh background and map the window. Bind 'screenshot-tool trigger'
+to a hotkey in your desktop environment to use it as a global shortcut.
+
+Triggers arrive on a Unix-domain socket as one JSON object per line and
+are answered with one JSON line.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+
+# How often the Tk loop checks for queued commands (ms)
+POLL_INTERVAL = 25
+
+
+def default_socket_path(name="screenshot-tool.sock"):
+    """Per-user socket location, preferring XDG_RUNTIME_DIR"""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, name)
+    uid = os.getuid() if hasattr(os, "getuid") else "user"
+    return os.path.join(tempfile.gettempdir(), f"{os.path.splitext(name)[0]}-{uid}.sock")
+
+
+def send_command(socket_path, message, timeout=5.0):
+    """Send one JSON message to a local socket server and return its JSON reply"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            line = reader.readline()
+    if not line:
+        raise ConnectionError("no reply from daemon")
+    return json.loads(line)
+
+
+def prepare_socket_path(socket_path):
+    """Remove a stale socket file, refusing if a live server still owns it"""
+    if not os.path.exists(socket_path):
+        return
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            sock.connect(socket_path)
+    except OSError:
+        os.unlink(socket_path)
+        return
+    raise RuntimeError(f"another server is already listening on {socket_path}")
+
+
+def bind_private(sock, socket_path):
+    """Bind a Unix socket at socket_path that only its owner can connect to.
+
+    The socket is bound and chmod'ed in a fresh 0700 directory and then
+    renamed into place, so there is no moment where others can connect.
+    """
+    directory = tempfile.mkdtemp(prefix=".bind-", dir=os.path.dirname(socket_path) or None)
+    private = os.path.join(directory, "socket")
+    try:
+        sock.bind(private)
+        os.chmod(private, 0o600)
+        os.rename(private, socket_path)
+    finally:
+        with contextlib.suppress(OSError):
+            os.unlink(private)
+        os.rmdir(directory)
+
+
+class _CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                message = json.loads(line)
+                reply = self.server.capture_daemon.submit(message.get("cmd"))
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+
+
+class _CommandServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        bind_private(self.socket, self.server_address)
+
+
+class CaptureDaemon:
+    """Keeps a hidden ScreenCaptureTool ready and shows it on request"""
+
+    COMMANDS = ("show", "hide", "quit", "ping")
+
+    def __init__(self, socket_path=None):
+        self.socket_path = socket_path or default_socket_path()
+        self.commands = queue.Queue()
+        self.server = None
+        self.tool = None
+
+    def submit(self, cmd):
+        """Called from socket threads; Tk work is queued for the main loop"""
+        if cmd not in self.COMMANDS:
+            return {"ok": False, "error": f"unknown command '{cmd}'"}
+        if cmd != "ping":
+            self.commands.put(cmd)
+        return {"ok": True}
+
+    def poll_commands(self):
+        """Run queued commands on the Tk thread"""
+        try:
+            while True:
+                cmd = self.commands.get_nowait()
+                if cmd == "show":
+                    self.tool.activate()
+                elif cmd == "hide":
+                    self.tool.dismiss()
+                elif cmd == "quit":
+                    self.stop()
+                    return
+        except queue.Empty:
+            pass
+        except Exception as e:
+            print(f"⚠️  Daemon command failed: {e}")
+        self.tool.root.after(POLL_INTERVAL, self.poll_commands)
+
+    def start_listener(self):
+        prepare_socket_path(self.socket_path)
+        self.server = _CommandServer(self.socket_path, _CommandHandler)
+        self.server.capture_daemon = self
+        threading.Thread(target=self.server.serve_forever, name="daemon-listener", daemon=True).start()
+
+    def stop(self):
+        """Shut down the listener and the Tk root"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        if self.tool:
+            self.tool.resident = False
+            self.tool.cancel_capture()
+
+    def run(self):
+        from capture_tool import ScreenCaptureTool
+
+        self.tool = ScreenCaptureTool(resident=True)
+        self.start_listener()
+        print(f"🚀 Capture daemon ready on {self.socket_path}")
+        self.tool.root.after(POLL_INTERVAL, self.poll_commands)
+        try:
+            self.tool.root.mainloop()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.server:
+                self.stop()
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool daemon'"""
+    parser = argparse.ArgumentParser(prog="screenshot-tool daemon", description="Run the resident capture daemon")
+    parser.add_argument("--socket", default=None, help="socket path (default: %s)" % default_socket_path())
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("❌ The capture daemon needs Unix-domain sockets, which this platform lacks", file=sys.stderr)
+        return 1
+    try:
+        CaptureDaemon(args.socket).run()
+    except Exception as e:
+        print(f"❌ Daemon failed: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def trigger_main(argv=None):
+    """Entry point for 'screenshot-tool trigger'"""
+    parser = argparse.ArgumentParser(prog="screenshot-tool trigger", description="Send a command to the capture daemon")
+    parser.add_argument("--socket", default=None, help="socket path (default: %s)" % default_socket_path())
+    action = parser.add_mutually_exclusive_group()
+    action.add_argument("--hide", dest="cmd", action="store_const", const="hide", help="hide the overlay")
+    action.add_argument("--quit", dest="cmd", action="store_const", const="quit", help="stop the daemon")
+    action.add_argument("--ping", dest="cmd", action="store_const", const="ping", help="check the daemon is running")
+    parser.set_defaults(cmd="show")
+    args = parser.parse_args(argv)
+
+    try:
+        reply = send_command(args.socket or default_socket_path(), {"cmd": args.cmd})
+    except OSError as e:
+        print(f"❌ Capture daemon not reachable: {e}", file=sys.stderr)
+        return 1
+    if not reply.get("ok"):
+        print(f"❌ {reply.get('error', 'command failed')}", file=sys.stderr)
+        return 1
+    return 0
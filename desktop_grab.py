@@ -0,0 +1,191 @@
+"""
+Full-desktop grabs assembled from concurrent per-monitor grabs.
+
+A single grab of monitors[0] reads the whole bounding box of all monitors
+in one request. On multi-monitor setups it can be faster to grab each
+physical monitor on its own worker thread and copy the results into one
+preallocated desktop buffer. DesktopGrabber does the latter and times both
+methods, falling back to the single grab whenever that proves faster.
+
+Nothing in here imports tkinter.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+import backends
+import frame
+
+METHODS = ('parallel', 'single')
+
+
+class DesktopFrame:
+    """Virtual-desktop frame in mss's BGRA layout.
+
+    Looks enough like an mss ScreenShot (raw, size, width, height) to be
+    passed to frame.frame_to_image and frame.FrameStore. Areas no monitor
+    covers stay black. timestamps maps each monitor's index to the
+    time.perf_counter() value when its pixels were grabbed.
+    """
+
+    def __init__(self, monitor, raw=None):
+        self.left, self.top = monitor['left'], monitor['top']
+        self.width, self.height = monitor['width'], monitor['height']
+        self.size = (self.width, self.height)
+        self.stride = self.width * frame.RAW_BYTES_PER_PIXEL
+        self.raw = raw if raw is not None else bytearray(self.stride * self.height)
+        self.timestamps = {}
+        self.method = None
+
+    @property
+    def skew_ms(self):
+        """Spread between the first and last monitor grab"""
+        if not self.timestamps:
+            return 0.0
+        return (max(self.timestamps.values()) - min(self.timestamps.values())) * 1000
+
+    def blit(self, shot, monitor):
+        """Copy a grabbed monitor into place; monitor is the region it was grabbed from"""
+        row = monitor['width'] * frame.RAW_BYTES_PER_PIXEL
+        x = (monitor['left'] - self.left) * frame.RAW_BYTES_PER_PIXEL
+        start = (monitor['top'] - self.top) * self.stride + x
+        src = memoryview(shot.raw)
+        dst = memoryview(self.raw)
+        if row == self.stride:
+            # Full-width monitor (stacked layouts): one contiguous copy
+            dst[start:start + len(src)] = src
+            return
+        for y in range(monitor['height']):
+            offset = start + y * self.stride
+            dst[offset:offset + row] = src[y * row:(y + 1) * row]
+
+
+def physical_monitors(monitors):
+    """(index, monitor) for every physical monitor, skipping mirrored outputs"""
+    seen = set()
+    result = []
+    for index, monitor in enumerate(monitors[1:], 1):
+        key = (monitor['left'], monitor['top'], monitor['width'], monitor['height'])
+        if key not in seen:
+            seen.add(key)
+            result.append((index, monitor))
+    return result
+
+
+class DesktopGrabber:
+    """Grabs the whole desktop with whichever method is currently faster.
+
+    Worker threads grab through the shared CaptureSession, which gives each
+    of them its own display connection. In 'auto' mode the first grab uses
+    the parallel method and the second the single grab; after that the
+    faster one is used and the other is re-timed every REPROBE_EVERY grabs.
+    """
+
+    MODES = ('auto',) + METHODS
+
+    # Re-time the slower method this often so a changed layout is noticed
+    REPROBE_EVERY = 20
+
+    # Weight of the newest sample in the cost moving averages
+    COST_SMOOTHING = 0.3
+
+    def __init__(self, session, mode='auto', workers=None):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown desktop grab mode '{mode}'")
+        self.session = session
+        self.mode = mode
+        self.workers = workers
+        self.pool = None
+        self.lock = threading.Lock()
+        self.grabs = 0
+        self.cost_ms = dict.fromkeys(METHODS)
+
+    def get_pool(self, size):
+        # Grabbers are shared by capture server threads: create one pool only
+        with self.lock:
+            if self.pool is None:
+                self.pool = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers or max(2, size), thread_name_prefix="desktop-grab"
+                )
+            return self.pool
+
+    def choose_method(self, monitor_count):
+        """Pick the grab method for the next desktop grab"""
+        if self.mode != 'auto':
+            return self.mode
+        if monitor_count < 2:
+            return 'single'
+        with self.lock:
+            if self.cost_ms['parallel'] is None:
+                return 'parallel'
+            if self.cost_ms['single'] is None:
+                return 'single'
+            faster, slower = sorted(METHODS, key=lambda m: self.cost_ms[m])
+            return slower if self.grabs % self.REPROBE_EVERY == 0 else faster
+
+    def record(self, method, cost_ms):
+        with self.lock:
+            self.grabs += 1
+            previous = self.cost_ms[method]
+            if previous is None:
+                self.cost_ms[method] = cost_ms
+            else:
+                self.cost_ms[method] = previous + (cost_ms - previous) * self.COST_SMOOTHING
+
+    def grab(self, monitors=None, method=None):
+        """Grab the whole desktop into a DesktopFrame.
+
+        monitors defaults to the session's monitor list (index 0 being the
+        virtual desktop). method forces 'parallel' or 'single'.
+        """
+        monitors = monitors or self.session.monitors
+        physical = physical_monitors(monitors)
+        method = method or self.choose_method(len(physical))
+        started = time.perf_counter()
+        if method == 'parallel':
+            desktop = DesktopFrame(monitors[0])
+            pool = self.get_pool(len(physical))
+            futures = [pool.submit(self._grab_into, desktop, index, monitor) for index, monitor in physical]
+            for future in futures:
+                future.result()
+        else:
+            shot = backends.convert_frame(self.session.grab(monitors[0]), 'BGRA')
+            grabbed = time.perf_counter()
+            desktop = DesktopFrame(monitors[0], shot.raw)
+            desktop.timestamps = {index: grabbed for index, _ in physical}
+        desktop.method = method
+        self.record(method, (time.perf_counter() - started) * 1000)
+        return desktop
+
+    def _grab_into(self, desktop, index, monitor):
+        shot = backends.convert_frame(self.session.grab(monitor), 'BGRA')
+        desktop.timestamps[index] = time.perf_counter()
+        desktop.blit(shot, monitor)
+
+    def grab_monitors(self, monitors):
+        """Grab several regions concurrently; returns the shots in order"""
+        if len(monitors) < 2 or self.mode == 'single':
+            return [self.session.grab(monitor) for monitor in monitors]
+        pool = self.get_pool(len(monitors))
+        return list(pool.map(self.session.grab, monitors))
+
+    def reset(self):
+        """Forget the timings, e.g. after the monitor layout changed"""
+        with self.lock:
+            self.grabs = 0
+            self.cost_ms = dict.fromkeys(METHODS)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'grabs': self.grabs,
+                'single_ms': None if self.cost_ms['single'] is None else round(self.cost_ms['single'], 2),
+                'parallel_ms': None if self.cost_ms['parallel'] is None else round(self.cost_ms['parallel'], 2),
+            }
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
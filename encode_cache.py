@@ -0,0 +1,99 @@
+"""
+Encode-once cache for captured images.
+
+A capture is often encoded several times: PNG for the clipboard, PNG again
+for Save, again for every further Copy click. EncodeCache keeps the encoded
+bytes per (image, format, options) so each encoding runs at most once.
+Concurrent requests for the same key share one encode, and prefetch()
+starts one speculatively in the background, e.g. as the preview opens.
+
+Entries are keyed by image identity and hold a reference to the image, so
+an id cannot be reused while its entry exists. Cached images must not be
+modified afterwards; evict() drops an image's entries when it is done with.
+
+Nothing in here imports tkinter.
+"""
+
+import concurrent.futures
+import threading
+
+import capture
+
+
+class EncodeCache:
+    """Encoded bytes per (image, format, options), each encoded at most once"""
+
+    def __init__(self, workers=1):
+        self.workers = workers
+        self.pool = None
+        self.lock = threading.Lock()
+        # key -> (image, Future of the encoded bytes)
+        self.entries = {}
+        self.stats = {'encodes': 0, 'hits': 0, 'evictions': 0}
+
+    @staticmethod
+    def key(img, image_format, options):
+        return id(img), image_format.upper(), tuple(sorted(options.items()))
+
+    def _claim(self, img, image_format, options):
+        """(future, is_new) for a key; a new future must be completed by the caller"""
+        key = self.key(img, image_format, options)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.stats['hits'] += 1
+                return entry[1], False
+            future = concurrent.futures.Future()
+            self.entries[key] = (img, future)
+            self.stats['encodes'] += 1
+            return future, True
+
+    def _encode_into(self, future, img, image_format, options):
+        try:
+            future.set_result(capture.encode_image(img, image_format, **options))
+        except Exception as e:
+            future.set_exception(e)
+            # Let a later request try again
+            with self.lock:
+                self.entries.pop(self.key(img, image_format, options), None)
+
+    def get(self, img, image_format='PNG', **options):
+        """Encoded bytes of img, encoding on the calling thread unless cached or in progress"""
+        future, is_new = self._claim(img, image_format, options)
+        if is_new:
+            self._encode_into(future, img, image_format, options)
+        return future.result()
+
+    def prefetch(self, img, image_format='PNG', **options):
+        """Start encoding img in the background; returns the Future of the bytes"""
+        future, is_new = self._claim(img, image_format, options)
+        if is_new:
+            with self.lock:
+                if self.pool is None:
+                    self.pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="encode")
+                pool = self.pool
+            pool.submit(self._encode_into, future, img, image_format, options)
+        return future
+
+    def evict(self, img):
+        """Drop every encoding of img; encodes still running finish for their waiters only"""
+        with self.lock:
+            stale = [key for key, (cached, _) in self.entries.items() if cached is img]
+            for key in stale:
+                del self.entries[key]
+            self.stats['evictions'] += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.stats['evictions'] += len(self.entries)
+            self.entries.clear()
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries))
+
+    def close(self):
+        self.clear()
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
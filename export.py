@@ -0,0 +1,218 @@
+"""
+Content-aware choice of output format.
+
+Screenshots differ a lot in what compresses them best. Flat UI captures
+with a few hundred colors shrink several times as palettized PNG8, while
+photos, video frames and gradients are far smaller as WebP or JPEG.
+analyze() looks at a small nearest-neighbour sample of a capture: how many
+colors it has, how many neighbouring pixels are identical and how many
+hard edges there are. plan_export() turns that into a format and encoder
+options within a quality policy:
+
+    lossless   never changes a pixel: exact PNG8, else lossless WebP
+    balanced   quantizes UI captures to 256 colors; photos as JPEG q90
+    small      smallest files: quantized UI, JPEG q80 with 4:2:0 chroma
+
+PNG8 files are deflated harder under the small policy. Explicit formats
+(PNG, PNG8, WEBP, JPEG, and QOI where Pillow can write it) skip the
+analysis. An ExportPlan's options go straight to capture.encode_image(),
+so plans work with the encode cache and the save pipeline.
+
+Nothing in here imports tkinter.
+"""
+
+import os
+
+from PIL import Image, ImageChops
+
+import capture
+
+# Formats plan_export() accepts; PNG8 is PNG with a 256-color palette
+EXPORT_FORMATS = ('AUTO', 'PNG8', *capture.FORMAT_EXTENSIONS)
+
+# Encoder settings per policy: whether UI captures may lose colors to a
+# palette, and what non-palette content is written as (None: lossless WebP)
+QUALITY_POLICIES = {
+    'lossless': {'quantize': False, 'photo': None},
+    'balanced': {'quantize': True, 'photo': ('JPEG', {'quality': 90, 'subsampling': 0, 'optimize': True})},
+    'small': {'quantize': True, 'photo': ('JPEG', {'quality': 80, 'subsampling': 2, 'optimize': True})},
+}
+
+# Explicit WebP/JPEG quality per policy
+EXPLICIT_QUALITY = {'lossless': 95, 'balanced': 90, 'small': 80}
+
+# zlib level of PNG8 files per policy; 6 is Pillow's default
+PNG_COMPRESS_LEVEL = {'lossless': 6, 'balanced': 6, 'small': 9}
+
+# analyze() looks at no more than this many pixels
+SAMPLE_PIXELS = 256 * 1024
+
+# Neighbour differences above this count as hard edges
+EDGE_THRESHOLD = 48
+
+# Above this many pixels lossless WebP trades some size for encode speed
+LARGE_IMAGE_PIXELS = 4 * 1024 * 1024
+
+
+class ImageStats:
+    """What analyze() found out about a capture"""
+
+    def __init__(self, colors, flat_ratio, edge_density, sample_size):
+        # Exact color count of the whole image, or None if above 256
+        self.colors = colors
+        # Share of sampled pixels identical to their right neighbour
+        self.flat_ratio = flat_ratio
+        # Share of sampled pixels on a hard edge
+        self.edge_density = edge_density
+        self.sample_size = sample_size
+
+    @property
+    def kind(self):
+        """'palette' (256 colors or fewer), 'ui' (flat areas and hard edges) or 'photo'"""
+        if self.colors is not None:
+            return 'palette'
+        # Antialiased UI is mostly flat, and what is not flat is mostly hard edges
+        busy = 1.0 - self.flat_ratio
+        if self.flat_ratio >= 0.5 or (busy and self.edge_density / busy >= 0.3):
+            return 'ui'
+        return 'photo'
+
+    def __repr__(self):
+        return (f"ImageStats(kind={self.kind!r}, colors={self.colors}, "
+                f"flat={self.flat_ratio:.2f}, edges={self.edge_density:.3f})")
+
+
+class ExportPlan:
+    """Format and capture.encode_image() options chosen for one capture"""
+
+    def __init__(self, image_format, options=None, kind=None, stats=None):
+        self.image_format = image_format
+        self.options = options or {}
+        self.kind = kind
+        self.stats = stats
+
+    @property
+    def label(self):
+        """Short description such as 'PNG8' or 'JPEG q90'"""
+        if self.options.get('colors'):
+            return 'PNG8'
+        if self.options.get('lossless'):
+            return f"{self.image_format} lossless"
+        if 'quality' in self.options:
+            return f"{self.image_format} q{self.options['quality']}"
+        return self.image_format
+
+    def __repr__(self):
+        return f"ExportPlan({self.label!r}, {self.options!r}, kind={self.kind!r})"
+
+
+def _sample(img):
+    """img reduced to about SAMPLE_PIXELS by nearest neighbour, which keeps colors exact"""
+    width, height = img.size
+    step = max(1, int((width * height / SAMPLE_PIXELS) ** 0.5))
+    if step > 1:
+        img = img.resize((max(1, width // step), max(1, height // step)), Image.NEAREST)
+    return img if img.mode == 'RGB' else img.convert('RGB')
+
+
+def analyze(img):
+    """Cheap content statistics of a capture"""
+    sample = _sample(img)
+    colors = None
+    if sample.getcolors(256) is not None:
+        # The sample may miss colors; only the full image decides whether a palette is exact
+        full = img if img.mode == 'RGB' else img.convert('RGB')
+        found = full.getcolors(256)
+        colors = len(found) if found is not None else None
+
+    gray = sample.convert('L')
+    width, height = gray.size
+    if width < 2:
+        return ImageStats(colors, 1.0, 0.0, sample.size)
+    left = gray.crop((0, 0, width - 1, height))
+    right = gray.crop((1, 0, width, height))
+    histogram = ImageChops.difference(left, right).histogram()
+    total = (width - 1) * height
+    flat_ratio = histogram[0] / total
+    edge_density = sum(histogram[EDGE_THRESHOLD + 1:]) / total
+    return ImageStats(colors, flat_ratio, edge_density, sample.size)
+
+
+def _lossless_webp(img):
+    if img.size[0] * img.size[1] > LARGE_IMAGE_PIXELS:
+        # The fastest effort is still well below PNG size and several times faster
+        return {'lossless': True, 'method': 0, 'quality': 0}
+    return {'lossless': True}
+
+
+def plan_export(img, image_format='AUTO', policy='lossless', stats=None):
+    """Choose the format and encoder options for img"""
+    image_format = image_format.upper()
+    if image_format not in EXPORT_FORMATS:
+        raise ValueError(f"unknown export format '{image_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    if policy not in QUALITY_POLICIES:
+        raise ValueError(f"unknown quality policy '{policy}', expected one of {', '.join(QUALITY_POLICIES)}")
+
+    # Explicit PNG keeps Pillow's defaults so it shares encodings with the clipboard
+    if image_format == 'PNG':
+        return ExportPlan('PNG')
+    if image_format == 'PNG8':
+        return ExportPlan('PNG', {'colors': 256, 'compress_level': PNG_COMPRESS_LEVEL[policy]})
+    if image_format == 'WEBP':
+        if policy == 'lossless':
+            return ExportPlan('WEBP', _lossless_webp(img))
+        return ExportPlan('WEBP', {'quality': EXPLICIT_QUALITY[policy]})
+    if image_format == 'JPEG':
+        return ExportPlan('JPEG', {'quality': EXPLICIT_QUALITY[policy]})
+    if image_format != 'AUTO':
+        return ExportPlan(image_format)
+
+    stats = stats or analyze(img)
+    kind = stats.kind
+    settings = QUALITY_POLICIES[policy]
+    if kind == 'palette' or (kind == 'ui' and settings['quantize']):
+        return ExportPlan('PNG', {'colors': 256, 'compress_level': PNG_COMPRESS_LEVEL[policy]}, kind, stats)
+    if kind == 'ui' or settings['photo'] is None:
+        # Lossless WebP is several times smaller than PNG on antialiased UI and photos alike
+        return ExportPlan('WEBP', _lossless_webp(img), kind, stats)
+    photo_format, options = settings['photo']
+    return ExportPlan(photo_format, dict(options), kind, stats)
+
+
+def palettize(img, colors=256):
+    """img as a palette image: exact if it has at most `colors` colors, else quantized"""
+    if img.mode == 'P':
+        return img
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGB')
+    found = img.getcolors(colors) if img.mode == 'RGB' else None
+    if found is None:
+        return img.quantize(colors, method=Image.FASTOCTREE, dither=Image.NONE)
+    # Octree is exact when it gives every color its own entry; a fixed palette
+    # would go through Pillow's approximate color cache
+    quantized = img.quantize(len(found), method=Image.FASTOCTREE, dither=Image.NONE)
+    palette = quantized.getpalette()[:3 * len(found)]
+    if set(zip(palette[0::3], palette[1::3], palette[2::3])) == {rgb for _, rgb in found}:
+        return quantized
+    # Slower, but median cut with one box per color keeps every color
+    return img.quantize(len(found), method=Image.MEDIANCUT, dither=Image.NONE)
+
+
+def encode(img, image_format='AUTO', policy='lossless'):
+    """(bytes, ExportPlan) of img exported under a policy"""
+    plan = plan_export(img, image_format, policy)
+    return capture.encode_image(img, plan.image_format, **plan.options), plan
+
+
+def output_filename(filename, image_format='AUTO'):
+    """filename to save under; format 'AUTO' drops a known extension for the chosen one"""
+    if image_format.upper() == 'AUTO' and capture.format_from_filename(filename, None):
+        # 'shot.png' picked as WebP becomes 'shot.webp', not 'shot.png.webp'
+        return os.path.splitext(filename)[0]
+    return filename
+
+
+def save(img, filename, image_format='AUTO', policy='lossless'):
+    """Export img to filename, adding the chosen format's extension; returns (path, ExportPlan)"""
+    plan = plan_export(img, image_format, policy)
+    return capture.save_image(img, output_filename(filename, image_format), plan.image_format, **plan.options), plan
@@ -0,0 +1,147 @@
+from PIL import Image
+
+# Pixel layout of the raw buffers returned by mss: B, G, R and one padding byte
+RAW_MODE = "BGRX"
+RAW_BYTES_PER_PIXEL = 4
+
+# Raw decoder mode and bytes per pixel for each frame pixel_format (see backends.py)
+PIXEL_FORMATS = {'BGRA': (RAW_MODE, RAW_BYTES_PER_PIXEL), 'RGB': ("RGB", 3)}
+
+
+def raw_layout(sct_img):
+    """(raw mode, bytes per pixel) of a grabbed frame; mss frames carry no pixel_format"""
+    return PIXEL_FORMATS[getattr(sct_img, 'pixel_format', 'BGRA')]
+
+
+def frame_to_image(sct_img):
+    """Decode a grabbed frame into an RGB PIL image in a single pass.
+
+    Pillow's raw BGRX decoder reads the BGRA buffer directly, so the frame
+    is copied once into the image. Going through ``sct_img.rgb`` instead runs
+    mss's slice-based conversion, which allocates several full-size
+    temporaries before Image.frombytes copies the result yet again.
+    Frames from backends that already decoded an image are returned as is.
+    """
+    image = getattr(sct_img, 'image', None)
+    if image is not None:
+        return image
+    return Image.frombuffer("RGB", tuple(sct_img.size), sct_img.raw, "raw", raw_layout(sct_img)[0], 0, 1)
+
+
+def make_thumbnail(img, max_size):
+    """Return a downscaled copy of img that fits within max_size.
+
+    Unlike ``img.copy().thumbnail(...)`` this never duplicates the full
+    image; only the small result is allocated. Images that already fit are
+    returned as-is.
+    """
+    max_width, max_height = max_size
+    scale = min(max_width / img.width, max_height / img.height)
+    if scale >= 1:
+        return img
+    size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+
+class FrameStore:
+    """Full-resolution frame kept as its raw BGRA (or RGB) buffer.
+
+    Used instead of a decoded PIL image on very large virtual desktops.
+    Regions are decoded on demand straight from the buffer via the raw
+    decoder's stride argument, so only the requested pixels are ever
+    materialized. With use_mmap the buffer is moved into an anonymous
+    temporary file and memory-mapped, which lets the OS page it out.
+    crop() and getpixel() mirror the PIL methods of the same name.
+    """
+
+    def __init__(self, sct_img, use_mmap=False):
+        self.width, self.height = sct_img.size
+        self.size = (self.width, self.height)
+        self.mode, self.bytes_per_pixel = raw_layout(sct_img)
+        self.stride = self.width * self.bytes_per_pixel
+        self._file = None
+        self._mmap = None
+        if use_mmap:
+            import mmap
+            import tempfile
+            self._file = tempfile.TemporaryFile(prefix="screenshot-frame-")
+            self._file.write(sct_img.raw)
+            self._file.flush()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.buffer = memoryview(self._mmap)
+        else:
+            self.buffer = memoryview(sct_img.raw)
+
+    @property
+    def nbytes(self):
+        return self.stride * self.height
+
+    def crop(self, box):
+        """Decode the (left, top, right, bottom) region into an RGB image"""
+        left, top, right, bottom = (int(v) for v in box)
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(self.width, right), min(self.height, bottom)
+        width, height = max(0, right - left), max(0, bottom - top)
+        if not width or not height:
+            return Image.new("RGB", (width, height))
+        start = top * self.stride + left * self.bytes_per_pixel
+        end = start + (height - 1) * self.stride + width * self.bytes_per_pixel
+        return Image.frombuffer("RGB", (width, height), self.buffer[start:end], "raw", self.mode, self.stride, 1)
+
+    def getpixel(self, xy):
+        """RGB tuple of one pixel"""
+        x, y = xy
+        offset = y * self.stride + x * self.bytes_per_pixel
+        pixel = tuple(self.buffer[offset:offset + 3])
+        return pixel if self.mode == "RGB" else pixel[::-1]
+
+    def release(self):
+        """Free the buffer and any backing file"""
+        self.buffer.release()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class StitchedFrame:
+    """Per-monitor frames presented as one virtual-desktop image.
+
+    parts is a list of ((left, top), image) pairs, the offsets being relative
+    to the virtual desktop and the images PIL images or FrameStores. Areas
+    that no monitor covers read as black. crop() and getpixel() mirror the
+    PIL methods of the same name.
+    """
+
+    def __init__(self, parts, size):
+        self.parts = list(parts)
+        self.width, self.height = size
+        self.size = (self.width, self.height)
+
+    def crop(self, box):
+        """Decode the (left, top, right, bottom) region, stitching across monitors"""
+        left, top, right, bottom = (int(v) for v in box)
+        pieces = []
+        for (ox, oy), image in self.parts:
+            x1, y1 = max(left, ox), max(top, oy)
+            x2, y2 = min(right, ox + image.size[0]), min(bottom, oy + image.size[1])
+            if x2 > x1 and y2 > y1:
+                pieces.append(((x1, y1), image.crop((x1 - ox, y1 - oy, x2 - ox, y2 - oy))))
+        size = (max(0, right - left), max(0, bottom - top))
+        if len(pieces) == 1 and pieces[0][1].size == size:
+            # Region lies on a single monitor; no stitching needed
+            return pieces[0][1]
+        img = Image.new("RGB", size)
+        for (x, y), piece in pieces:
+            img.paste(piece, (x - left, y - top))
+        return img
+
+    def getpixel(self, xy):
+        """RGB tuple of one pixel; black outside every monitor"""
+        x, y = xy
+        for (ox, oy), image in self.parts:
+            if ox <= x < ox + image.size[0] and oy <= y < oy + image.size[1]:
+                return image.getpixel((x - ox, y - oy))[:3]
+        return (0, 0, 0)
@@ -0,0 +1,442 @@
+"""
+Delta-compressed history of repeated captures.
+
+Capturing the same region over and over (monitoring, timelapse, serve
+clients polling a window) produces images that differ in a few tiles, yet
+each one used to be stored as a full PNG. A HistoryStore keeps, per region:
+
+- keyframes: the whole capture as a PNG, and
+- deltas: only the tiles that changed since the previous capture of the
+  same region, stacked into a small PNG.
+
+Every frame file is an ordinary PNG with a 'screenshot-history' text chunk
+describing it (region, id, kind, base frame, changed tiles), so a store can
+be inspected with any image tool. history.jsonl indexes the frames.
+
+get() rebuilds any frame from its keyframe and the deltas after it, so
+decoding costs one keyframe plus at most the chain length in deltas.
+Writes start a new keyframe when the size changes, when more than half of
+the tiles changed, or when a chain reaches max_chain. A compaction pass
+(compact(), or start_compaction() on a background thread) re-keyframes
+chains longer than keyframe_interval, bounding random access to that many
+deltas. Deltas after a re-keyframed frame stay valid, since they only
+refer to its pixels.
+
+    screenshot-tool history [--dir DIR] stats|compact|export ID -o FILE
+
+One process writes a store at a time; any number of threads may share it.
+
+Nothing in here imports tkinter.
+"""
+
+import argparse
+import collections
+import io
+import json
+import os
+import re
+import threading
+import time
+
+from PIL import Image, ImageChops, PngImagePlugin
+
+import config
+import output_writer
+
+# Square tile edge in pixels; the unit of change between captures
+TILE_SIZE = 64
+
+# Longest delta chain left by compaction
+KEYFRAME_INTERVAL = 16
+
+# Longest delta chain written before compaction has caught up
+MAX_CHAIN = 64
+
+# A capture with more than this fraction of tiles changed becomes a keyframe
+KEYFRAME_RATIO = 0.5
+
+# PNG text chunk describing a frame
+META_KEY = 'screenshot-history'
+
+# Modes stored as-is; others are converted to RGB(A)
+MODES = ('L', 'RGB', 'RGBA')
+
+# Regions whose last written and last read frames stay decoded in memory
+CACHED_REGIONS = 16
+
+
+def region_key(region, img):
+    """Index key for a capture region: 'x,y,w,h', a given string, or 'WxH'"""
+    if region is None:
+        return f"{img.size[0]}x{img.size[1]}"
+    if isinstance(region, str):
+        return region
+    return ",".join(str(int(v)) for v in region)
+
+
+def changed_tiles(old, new, tile=TILE_SIZE):
+    """Indices (row-major) of the tiles that differ between two images of one size and mode"""
+    diff = ImageChops.difference(old, new)
+    bands = diff.split()
+    # Largest difference over all bands, so a change in alpha or one color counts
+    diff = bands[0]
+    for band in bands[1:]:
+        diff = ImageChops.lighter(diff, band)
+    bbox = diff.getbbox()
+    if bbox is None:
+        return []
+    width, height = new.size
+    columns = -(-width // tile)
+    tiles = []
+    for ty in range(bbox[1] // tile, -(-bbox[3] // tile)):
+        for tx in range(bbox[0] // tile, -(-bbox[2] // tile)):
+            box = (tx * tile, ty * tile, min(width, (tx + 1) * tile), min(height, (ty + 1) * tile))
+            if diff.crop(box).getbbox() is not None:
+                tiles.append(ty * columns + tx)
+    return tiles
+
+
+def _tile_box(index, size, tile):
+    columns = -(-size[0] // tile)
+    x, y = index % columns * tile, index // columns * tile
+    return x, y, min(size[0], x + tile), min(size[1], y + tile)
+
+
+def _region_directory(region):
+    return re.sub(r'[^A-Za-z0-9.-]+', '_', region)
+
+
+def _read_log(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            # A torn last line from a crash
+            continue
+    return entries
+
+
+class HistoryStore:
+    """Per-region keyframes and tile deltas of repeated captures"""
+
+    def __init__(self, directory='history', tile_size=TILE_SIZE, keyframe_interval=KEYFRAME_INTERVAL,
+                 max_chain=MAX_CHAIN, fsync='file', compress_level=6):
+        if not 0 < keyframe_interval <= max_chain:
+            raise ValueError("keyframe_interval must be between 1 and max_chain")
+        self.directory = directory
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.max_chain = max_chain
+        self.fsync = fsync
+        self.compress_level = compress_level
+        self.index = os.path.join(directory, 'history.jsonl')
+        self.lock = threading.Lock()
+        # Writes to one region are serialized; different regions proceed in parallel
+        self.region_locks = {}
+        # id -> index entry (the latest one per id wins); region -> ids in capture order
+        self.frames = None
+        self.regions = None
+        self.next_id = 1
+        # region -> (id, image) of the last frame written and the last frame read,
+        # least recently used region first
+        self.latest = collections.OrderedDict()
+        self.recent = collections.OrderedDict()
+        self.compact_wanted = threading.Event()
+        self.closing = False
+        self.compactor = None
+
+    def _load(self):
+        """Read the index once; callers hold the lock"""
+        if self.frames is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self.frames, self.regions = {}, {}
+        for entry in _read_log(self.index):
+            if entry['id'] not in self.frames:
+                self.regions.setdefault(entry['region'], []).append(entry['id'])
+            self.frames[entry['id']] = entry
+            self.next_id = max(self.next_id, entry['id'] + 1)
+
+    def _record(self, entry):
+        with self.lock:
+            if entry['id'] not in self.frames:
+                self.regions.setdefault(entry['region'], []).append(entry['id'])
+            self.frames[entry['id']] = entry
+            with open(self.index, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, separators=(',', ':')) + "\n")
+
+    def _region_lock(self, region):
+        with self.lock:
+            return self.region_locks.setdefault(region, threading.Lock())
+
+    def frame_path(self, region, frame_id):
+        return os.path.join(self.directory, 'frames', _region_directory(region), f"{frame_id:08d}.png")
+
+    def depth(self, frame_id):
+        """Number of deltas between frame_id and its keyframe"""
+        depth = 0
+        with self.lock:
+            self._load()
+            entry = self.frames[frame_id]
+            while entry['kind'] == 'delta':
+                depth += 1
+                entry = self.frames[entry['base']]
+        return depth
+
+    def _encode(self, img, meta):
+        info = PngImagePlugin.PngInfo()
+        info.add_text(META_KEY, json.dumps(meta, separators=(',', ':')))
+        buffer = io.BytesIO()
+        img.save(buffer, 'PNG', pnginfo=info, compress_level=self.compress_level)
+        return buffer.getvalue()
+
+    def _encode_delta(self, img, tiles, meta):
+        """The changed tiles of img stacked top to bottom in one tile-wide PNG"""
+        tile = self.tile_size
+        # An unchanged capture still gets a (one-pixel) image
+        mosaic = Image.new(img.mode, (tile, max(1, tile * len(tiles))))
+        for slot, index in enumerate(tiles):
+            mosaic.paste(img.crop(_tile_box(index, img.size, tile)), (0, slot * tile))
+        return self._encode(mosaic, meta)
+
+    def _cached(self, cache, region):
+        """(id, image) cached for region in latest or recent, or None"""
+        with self.lock:
+            cached = cache.get(region)
+            if cached is not None:
+                cache.move_to_end(region)
+            return cached
+
+    def _cache(self, cache, region, frame_id, img):
+        with self.lock:
+            cache[region] = (frame_id, img)
+            cache.move_to_end(region)
+            while len(cache) > CACHED_REGIONS:
+                cache.popitem(last=False)
+
+    def _base_for(self, region, last):
+        """Pixels of frame `last` to diff the next capture against, or None"""
+        cached = self._cached(self.latest, region)
+        if cached is not None and cached[0] == last:
+            return cached[1]
+        try:
+            return self.get(last)
+        except (OSError, ValueError, KeyError):
+            # Lost or damaged: the next capture starts a new chain
+            return None
+
+    def add(self, img, region=None, timestamp=None):
+        """Store a capture of region (x, y, w, h or any string); returns its frame id"""
+        if img.mode not in MODES:
+            img = img.convert('RGBA' if img.mode in ('LA', 'PA') or 'transparency' in img.info else 'RGB')
+        region = region_key(region, img)
+        with self._region_lock(region):
+            with self.lock:
+                self._load()
+                ids = self.regions.get(region)
+                last = ids[-1] if ids else None
+                frame_id = self.next_id
+                self.next_id += 1
+
+            tiles = None
+            if last is not None and self.depth(last) < self.max_chain:
+                base = self._base_for(region, last)
+                if base is not None and base.size == img.size and base.mode == img.mode:
+                    tiles = changed_tiles(base, img, self.tile_size)
+                    tile_count = -(-img.size[0] // self.tile_size) * -(-img.size[1] // self.tile_size)
+                    if len(tiles) > KEYFRAME_RATIO * tile_count:
+                        tiles = None
+
+            meta = {
+                'v': 1, 'region': region, 'id': frame_id,
+                'time': round(time.time() if timestamp is None else timestamp, 3),
+                'size': list(img.size), 'mode': img.mode,
+            }
+            if tiles is None:
+                meta['kind'] = 'keyframe'
+                data = self._encode(img, meta)
+            else:
+                meta.update(kind='delta', base=last, tile=self.tile_size, tiles=tiles)
+                data = self._encode_delta(img, tiles, meta)
+            path = self.frame_path(region, frame_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            output_writer.atomic_write(path, data, self.fsync)
+
+            self._record({
+                'id': frame_id, 'region': region, 'kind': meta['kind'], 'base': meta.get('base'),
+                'time': meta['time'], 'bytes': len(data), 'tiles': len(tiles) if tiles is not None else None,
+            })
+            self._cache(self.latest, region, frame_id, img.copy())
+        if tiles is not None and self.depth(frame_id) > self.keyframe_interval:
+            self.compact_wanted.set()
+        return frame_id
+
+    def get(self, frame_id):
+        """The capture stored as frame_id, rebuilt from its keyframe and deltas"""
+        with self.lock:
+            self._load()
+            entry = self.frames.get(frame_id)
+        if entry is None:
+            raise KeyError(f"no frame {frame_id}")
+        region = entry['region']
+        known = [cached for cached in (self._cached(self.latest, region), self._cached(self.recent, region))
+                 if cached is not None]
+
+        # Walk back to a keyframe (or a frame decoded before), newest delta first
+        deltas = []
+        current = frame_id
+        while True:
+            cached = next((c for c in known if c[0] == current), None)
+            if cached is not None:
+                img = cached[1].copy()
+                break
+            with Image.open(self.frame_path(region, current)) as f:
+                # The file, not the index, says what it is: compaction may have just rewritten it
+                meta = json.loads(f.info[META_KEY])
+                f.load()
+                if meta['kind'] == 'keyframe':
+                    img = f.copy()
+                    break
+                deltas.append((meta, f.copy()))
+            current = meta['base']
+
+        for meta, mosaic in reversed(deltas):
+            tile = meta['tile']
+            for slot, index in enumerate(meta['tiles']):
+                box = _tile_box(index, img.size, tile)
+                img.paste(mosaic.crop((0, slot * tile, box[2] - box[0], slot * tile + box[3] - box[1])), box[:2])
+        self._cache(self.recent, region, frame_id, img)
+        return img.copy()
+
+    def _rekey(self, region, frame_id):
+        img = self.get(frame_id)
+        with Image.open(self.frame_path(region, frame_id)) as f:
+            meta = json.loads(f.info[META_KEY])
+        for key in ('base', 'tile', 'tiles'):
+            meta.pop(key, None)
+        meta['kind'] = 'keyframe'
+        data = self._encode(img, meta)
+        output_writer.atomic_write(self.frame_path(region, frame_id), data, self.fsync)
+        with self.lock:
+            entry = dict(self.frames[frame_id], kind='keyframe', base=None, bytes=len(data), rekeyed=True)
+        self._record(entry)
+
+    def compact(self, interval=None):
+        """Re-keyframe every frame more than interval deltas from its keyframe; returns frames rewritten"""
+        interval = interval or self.keyframe_interval
+        with self.lock:
+            self._load()
+            regions = {region: list(ids) for region, ids in self.regions.items()}
+        rewritten = 0
+        for region, ids in regions.items():
+            depth = 0
+            for frame_id in ids:
+                with self.lock:
+                    kind = self.frames[frame_id]['kind']
+                depth = 0 if kind == 'keyframe' else depth + 1
+                if depth > interval:
+                    self._rekey(region, frame_id)
+                    rewritten += 1
+                    depth = 0
+        return rewritten
+
+    def start_compaction(self, poll=60.0):
+        """Compact on a background thread whenever a chain outgrows keyframe_interval"""
+        if self.compactor is not None:
+            return
+
+        def run():
+            while not self.closing:
+                self.compact_wanted.wait(poll)
+                if self.closing:
+                    break
+                if self.compact_wanted.is_set():
+                    self.compact_wanted.clear()
+                    try:
+                        rewritten = self.compact()
+                    except Exception as e:
+                        print(f"⚠️ History compaction failed: {e}")
+                    else:
+                        print(f"🗜️ History compaction re-keyframed {rewritten} frame(s)")
+
+        self.compactor = threading.Thread(target=run, name="history-compactor", daemon=True)
+        self.compactor.start()
+
+    def close(self):
+        """Stop background compaction"""
+        self.closing = True
+        self.compact_wanted.set()
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+
+    def get_stats(self):
+        with self.lock:
+            self._load()
+            entries = list(self.frames.values())
+        stats = {
+            'frames': len(entries), 'regions': len(self.regions),
+            'keyframes': sum(entry['kind'] == 'keyframe' for entry in entries),
+            'bytes': sum(entry['bytes'] for entry in entries),
+        }
+        stats['deltas'] = stats['frames'] - stats['keyframes']
+        stats['longest_chain'] = max((self.depth(entry['id']) for entry in entries), default=0)
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def from_settings(settings):
+    """HistoryStore configured by the history_* settings"""
+    return HistoryStore(
+        settings.get('history_directory', 'history'),
+        keyframe_interval=settings.get('history_keyframe_interval', KEYFRAME_INTERVAL),
+        fsync=settings.get('output_fsync', 'file'),
+    )
+
+
+def main(argv=None):
+    """Entry point for 'screenshot-tool history'"""
+    parser = argparse.ArgumentParser(prog="screenshot-tool history", description="Inspect the capture history store")
+    parser.add_argument("--config", default="screenshot_config.json", metavar="FILE",
+                        help="configuration file (default: %(default)s)")
+    parser.add_argument("--dir", metavar="DIR", help="history directory (default: history_directory setting)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="show frame counts, chain lengths and disk usage")
+    commands.add_parser("compact", help="re-keyframe delta chains longer than history_keyframe_interval")
+    export_parser = commands.add_parser("export", help="write one frame as an image file")
+    export_parser.add_argument("frame", type=int, help="frame id")
+    export_parser.add_argument("-o", "--output", required=True, metavar="FILE", help="image file to write")
+    args = parser.parse_args(argv)
+
+    settings = config.ConfigManager(args.config).load_config(dict(config.DEFAULT_SETTINGS))
+    if args.dir:
+        settings['history_directory'] = args.dir
+    store = from_settings(settings)
+    if args.command == "compact":
+        print(f"🗜️ Re-keyframed {store.compact()} frame(s)")
+    elif args.command == "export":
+        try:
+            img = store.get(args.frame)
+        except KeyError as e:
+            print(f"❌ {e.args[0]}")
+            return 1
+        img.save(args.output)
+        print(args.output)
+    else:
+        stats = store.get_stats()
+        print(f"🗂️ Capture history: {os.path.abspath(store.directory)}")
+        print(f"   {stats['frames']} frames in {stats['regions']} region(s): "
+              f"{stats['keyframes']} keyframes, {stats['deltas']} deltas")
+        print(f"   {stats['bytes'] / 1e6:.1f} MB, longest delta chain {stats['longest_chain']}")
+    return 0
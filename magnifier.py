@@ -1,80 +1,154 @@
 import tkinter as tk
 from PIL import Image, ImageTk
-import mss
+import frame
+import topology
+
 
 class Magnifier:
-    def __init__(self, parent, settings, total_left, total_top, total_width, total_height):
+    """Zoomed view around the pointer.
+
+    Pixels are sampled from the overlay's frozen background rather than
+    grabbed from the screen. A live grab would be slower and would also
+    capture the topmost overlay itself. Tk copies and zooms the sampled
+    region into one persistent photo image. The crosshair, pixel grid and
+    readout are canvas items created once and updated in place.
+    """
+
+    # Zoom level from which the pixel grid is drawn
+    GRID_MIN_ZOOM = 4
+
+    def __init__(self, parent, settings, total_left, total_top, total_width, total_height, capture_session,
+                 source_photo=None, source_image=None, monitors=None):
         self.parent = parent
+        self.capture_session = capture_session
         self.settings = settings
         self.total_left = total_left
         self.total_top = total_top
         self.total_width = total_width
         self.total_height = total_height
+        self.source_photo = source_photo
+        self.source_image = source_image
+        # Placement follows the monitor under the pointer; without a list the virtual desktop is used
+        self.monitors = monitors or [{
+            'left': total_left, 'top': total_top, 'width': total_width, 'height': total_height,
+        }]
         self.window = None
         self.canvas = None
+        self.live_photo = None
         self.create_magnifier()
 
     def create_magnifier(self):
         if self.window:
             self.window.destroy()
+        size = self.settings['magnifier_size']
+        zoom = self.settings['magnifier_zoom']
         self.window = tk.Toplevel(self.parent)
         self.window.title("Magnifier")
-        self.window.geometry(f"{self.settings['magnifier_size']}x{self.settings['magnifier_size']}")
+        self.window.geometry(f"{size}x{size}")
         self.window.overrideredirect(True)
         self.window.attributes("-topmost", True)
         self.window.configure(bg='black')
         self.canvas = tk.Canvas(
             self.window,
-            width=self.settings['magnifier_size'],
-            height=self.settings['magnifier_size'],
+            width=size,
+            height=size,
             bg='black',
             highlightthickness=2,
             highlightbackground='white'
         )
         self.canvas.pack(fill=tk.BOTH, expand=True)
-        self.window.geometry(f"+{self.total_left + 100}+{self.total_top + 100}")
+
+        # Persistent items, updated in place on every pointer move
+        self.zoom_photo = tk.PhotoImage(master=self.window, width=size, height=size)
+        self.image_id = self.canvas.create_image(0, 0, image=self.zoom_photo, anchor="nw")
+        if zoom >= self.GRID_MIN_ZOOM:
+            for offset in range(zoom, size, zoom):
+                self.canvas.create_line(offset, 0, offset, size, fill='#808080', stipple='gray25')
+                self.canvas.create_line(0, offset, size, offset, fill='#808080', stipple='gray25')
+        center = size // 2
+        self.canvas.create_line(center, 0, center, size, fill='red', width=1)
+        self.canvas.create_line(0, center, size, center, fill='red', width=1)
+        self.readout_bg_id = self.canvas.create_rectangle(0, size - 16, size, size, fill='black', outline='')
+        self.readout_id = self.canvas.create_text(
+            4, size - 8, text="", fill='white', anchor="w", font=("Arial", 8)
+        )
+        first = topology.monitor_at(self.monitors, self.total_left, self.total_top)
+        self.window.geometry(f"+{first['left'] + 100}+{first['top'] + 100}")
+
+    def set_source(self, source_photo, source_image):
+        """Sample from a new frozen background"""
+        self.source_photo = source_photo
+        self.source_image = source_image
+        if source_photo is not None and self.canvas:
+            self.canvas.itemconfig(self.image_id, image=self.zoom_photo)
 
     def update_magnifier(self, x, y):
         if not self.window or not self.canvas:
             return
         try:
-            with mss.mss() as sct:
-                zoom = self.settings['magnifier_zoom']
-                size = self.settings['magnifier_size']
-                capture_size = size // zoom
-                screen_x = int(x) + self.total_left
-                screen_y = int(y) + self.total_top
-                left = max(0, screen_x - capture_size // 2)
-                top = max(0, screen_y - capture_size // 2)
-                right = min(self.total_width, left + capture_size)
-                bottom = min(self.total_height, top + capture_size)
-                if right - left < capture_size:
-                    left = max(0, right - capture_size)
-                if bottom - top < capture_size:
-                    top = max(0, bottom - capture_size)
-                monitor = {"top": top, "left": left, "width": right - left, "height": bottom - top}
-                img = sct.grab(monitor)
-                pil_img = Image.frombytes("RGB", img.size, img.rgb)
-                pil_img = pil_img.resize((size, size), Image.Resampling.NEAREST)
-                photo = ImageTk.PhotoImage(pil_img)
-                self.canvas.delete("all")
-                self.canvas.create_image(0, 0, image=photo, anchor="nw")
-                self.canvas.image = photo
-                center = size // 2
-                self.canvas.create_line(center, 0, center, size, fill='red', width=1)
-                self.canvas.create_line(0, center, size, center, fill='red', width=1)
-                mag_x = screen_x + 20
-                mag_y = screen_y + 20
-                if mag_x + size > self.total_width:
-                    mag_x = screen_x - size - 20
-                if mag_y + size > self.total_height:
-                    mag_y = screen_y - size - 20
-                self.window.geometry(f"+{mag_x}+{mag_y}")
+            zoom = self.settings['magnifier_zoom']
+            size = self.settings['magnifier_size']
+            capture_size = size // zoom
+            # x, y are canvas coordinates, which index the background directly
+            px = min(max(int(x), 0), self.total_width - 1)
+            py = min(max(int(y), 0), self.total_height - 1)
+            left = min(max(0, px - capture_size // 2), max(0, self.total_width - capture_size))
+            top = min(max(0, py - capture_size // 2), max(0, self.total_height - capture_size))
+            right = min(self.total_width, left + capture_size)
+            bottom = min(self.total_height, top + capture_size)
+
+            if self.source_photo is not None:
+                self.canvas.tk.call(
+                    str(self.zoom_photo), "copy", str(self.source_photo),
+                    "-from", left, top, right, bottom, "-to", 0, 0, "-zoom", zoom
+                )
+            else:
+                self.paste_sample(left, top, right, bottom, size)
+
+            if self.source_image is not None:
+                r, g, b = self.source_image.getpixel((px, py))[:3]
+                readout = f"{px + self.total_left}, {py + self.total_top}  #{r:02x}{g:02x}{b:02x}"
+            else:
+                readout = f"{px + self.total_left}, {py + self.total_top}"
+            self.canvas.itemconfig(self.readout_id, text=readout)
+
+            screen_x = px + self.total_left
+            screen_y = py + self.total_top
+            mag_x = screen_x + 20
+            mag_y = screen_y + 20
+            monitor = topology.monitor_at(self.monitors, screen_x, screen_y)
+            if mag_x + size > monitor['left'] + monitor['width']:
+                mag_x = screen_x - size - 20
+            if mag_y + size > monitor['top'] + monitor['height']:
+                mag_y = screen_y - size - 20
+            mag_x, mag_y = topology.clamp_to_monitor(mag_x, mag_y, size, size, monitor)
+            self.window.geometry(f"+{mag_x}+{mag_y}")
         except Exception:
             pass
 
+    def paste_sample(self, left, top, right, bottom, size):
+        """Slower path when there is no background photo to copy from.
+
+        Crops the frozen frame when one is available (e.g. the tiled
+        large-desktop mode), otherwise grabs the screen.
+        """
+        if self.source_image is not None:
+            pil_img = self.source_image.crop((left, top, right, bottom))
+        else:
+            monitor = {
+                "top": top + self.total_top, "left": left + self.total_left,
+                "width": right - left, "height": bottom - top,
+            }
+            pil_img = frame.frame_to_image(self.capture_session.grab(monitor))
+        pil_img = pil_img.resize((size, size), Image.Resampling.NEAREST)
+        if self.live_photo is None:
+            self.live_photo = ImageTk.PhotoImage(pil_img)
+            self.canvas.itemconfig(self.image_id, image=self.live_photo)
+        else:
+            self.live_photo.paste(pil_img)
+
     def destroy(self):
         if self.window:
             self.window.destroy()
             self.window = None
-            self.canvas = None 
\ No newline at end of file
+            self.canvas = None
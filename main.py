@@ -3,7 +3,47 @@
 Advanced Screen Capture Tool - Main Entry Point
 """
 
-from capture_tool import run_capture_tool
+import sys
+
+
+def main(argv=None):
+    """Dispatch to a headless subcommand or start the interactive tool"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "capture":
+        # Headless capture never imports tkinter
+        import cli
+        return cli.main(argv[1:])
+    if argv and argv[0] == "daemon":
+        import daemon
+        return daemon.main(argv[1:])
+    if argv and argv[0] == "serve":
+        import capture_server
+        return capture_server.main(argv[1:])
+    if argv and argv[0] == "backends":
+        import backends
+        return backends.main(argv[1:])
+    if argv and argv[0] == "store":
+        import capture_store
+        return capture_store.main(argv[1:])
+    if argv and argv[0] == "history":
+        import history_store
+        return history_store.main(argv[1:])
+    if argv and argv[0] == "index":
+        import capture_index
+        return capture_index.main(argv[1:])
+    if argv and argv[0] == "trigger":
+        import daemon
+        return daemon.trigger_main(argv[1:])
+
+    if "--profile-startup" in argv:
+        # Installed before capture_tool is imported so its imports are timed too
+        import startup_profile
+        startup_profile.enable()
+
+    from capture_tool import run_capture_tool
+    run_capture_tool(exit_when_ready="--exit-when-ready" in argv)
+    return 0
+
 
 if __name__ == "__main__":
-    run_capture_tool() 
\ No newline at end of file
+    sys.exit(main())
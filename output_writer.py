@@ -0,0 +1,235 @@
+"""
+Atomic, collision-free output files.
+
+Timestamped names with one-second resolution make two captures in the same
+second overwrite each other, and writing a file in place leaves a truncated
+image behind if the process dies mid-write. OutputWriter fixes both:
+
+- Names carry milliseconds and, within one millisecond, a sequence number:
+  screenshot_20261017_101530_123.png, then ..._123_001.png. Names never go
+  backwards, even when the clock does.
+- Every file is written to a hidden temporary file in the target directory
+  and then linked into place, which fails instead of overwriting. A name
+  taken by another process just moves on to the next sequence number.
+- Files go into date-sharded directories (directory/2026/10/17/, or per
+  hour), so no directory grows without bound. Shard directories are created
+  once per writer, and nothing ever lists a directory, so the write rate
+  does not drop as the output grows.
+
+The fsync policy decides what survives a power loss:
+
+    none   rename only; the OS writes the data back when it likes
+    file   fsync the file before it is renamed into place (default)
+    full   also fsync the directory after the rename
+
+atomic_file() and atomic_write() give the same guarantees for explicit
+filenames, replacing an existing file atomically.
+
+Nothing in here imports tkinter.
+"""
+
+import contextlib
+import os
+import threading
+import time
+
+FSYNC_POLICIES = ('none', 'file', 'full')
+
+# Sub-directory layout per sharding mode
+SHARDING = {
+    'none': None,
+    'month': ('%Y', '%m'),
+    'day': ('%Y', '%m', '%d'),
+    'hour': ('%Y', '%m', '%d', '%H'),
+}
+
+
+# Exclusive creation of new files only; binary mode matters on Windows
+_CREATE_FLAGS = os.O_CREAT | os.O_EXCL | os.O_WRONLY | getattr(os, 'O_BINARY', 0)
+
+
+def _fsync_directory(directory):
+    if os.name == 'nt':
+        # Windows cannot open directories for fsync; renames there are journaled
+        return
+    fd = os.open(directory or '.', os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _publish_new(tmp, path):
+    """Move tmp to path; raises FileExistsError instead of replacing an existing file"""
+    if os.name == 'nt':
+        # os.rename never replaces on Windows
+        os.rename(tmp, path)
+        return
+    try:
+        os.link(tmp, path)
+    except OSError:
+        # The name is taken, or this filesystem has no hard links
+        if os.path.lexists(path):
+            raise FileExistsError(path)
+        os.rename(tmp, path)
+        return
+    os.unlink(tmp)
+
+
+@contextlib.contextmanager
+def _temporary(directory, name, fsync):
+    """Binary file object of a hidden temp file next to name; yields (file, temp path)"""
+    while True:
+        tmp = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        try:
+            # Mode 0o666 less the umask, like any other file the user saves
+            fd = os.open(tmp, _CREATE_FLAGS, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            yield f, tmp
+            if fsync != 'none':
+                f.flush()
+                os.fsync(f.fileno())
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+
+
+@contextlib.contextmanager
+def atomic_file(path, fsync='file'):
+    """Write path through a temporary file that replaces it only once complete"""
+    if fsync not in FSYNC_POLICIES:
+        raise ValueError(f"unknown fsync policy '{fsync}', expected one of {', '.join(FSYNC_POLICIES)}")
+    directory, name = os.path.split(path)
+    with _temporary(directory, name, fsync) as (f, tmp):
+        yield f
+    try:
+        os.replace(tmp, path)
+    except OSError:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp)
+        raise
+    if fsync == 'full':
+        _fsync_directory(directory)
+
+
+def atomic_write(path, data, fsync='file'):
+    """Write bytes to path atomically; returns path"""
+    with atomic_file(path, fsync) as f:
+        f.write(data)
+    return path
+
+
+class OutputWriter:
+    """Writes auto-named captures atomically under unique, ordered names"""
+
+    def __init__(self, directory='', prefix='screenshot', sharding='day', fsync='file'):
+        if sharding not in SHARDING:
+            raise ValueError(f"unknown sharding '{sharding}', expected one of {', '.join(SHARDING)}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy '{fsync}', expected one of {', '.join(FSYNC_POLICIES)}")
+        self.directory = directory
+        self.prefix = prefix
+        self.sharding = sharding
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.last_ms = 0
+        self.sequence = 0
+        # Shard directories known to exist, so each is created (and stat'ed) once
+        self.created = set()
+        self.stats = {'written': 0, 'collisions': 0}
+
+    def _next_stamp(self):
+        """(milliseconds, sequence), strictly increasing across calls"""
+        now_ms = time.time_ns() // 1000000
+        with self.lock:
+            if now_ms > self.last_ms:
+                self.last_ms, self.sequence = now_ms, 0
+            else:
+                # Same millisecond, or the clock stepped back: stay on the last stamp
+                self.sequence += 1
+            return self.last_ms, self.sequence
+
+    def _shard(self, moment):
+        layout = SHARDING[self.sharding]
+        if layout is None:
+            return self.directory
+        directory = os.path.join(self.directory, *(time.strftime(part, moment) for part in layout))
+        if directory not in self.created:
+            os.makedirs(directory, exist_ok=True)
+            with self.lock:
+                self.created.add(directory)
+        return directory
+
+    def next_path(self, extension, suffix=""):
+        """A fresh path for a capture taken now; the file is not created"""
+        ms, sequence = self._next_stamp()
+        moment = time.localtime(ms // 1000)
+        name = f"{self.prefix}_{time.strftime('%Y%m%d_%H%M%S', moment)}_{ms % 1000:03d}"
+        if sequence:
+            name += f"_{sequence:03d}"
+        return os.path.join(self._shard(moment), name + suffix + extension)
+
+    def write_with(self, write, extension, suffix=""):
+        """Call write(file) on a temp file and publish it under a new name; returns the path"""
+        path = self.next_path(extension, suffix)
+        directory, name = os.path.split(path)
+        with _temporary(directory, name, self.fsync) as (f, tmp):
+            write(f)
+        try:
+            while True:
+                try:
+                    _publish_new(tmp, path)
+                    break
+                except FileExistsError:
+                    # Taken by another writer: move on to the next name
+                    with self.lock:
+                        self.stats['collisions'] += 1
+                    path = self.next_path(extension, suffix)
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+            raise
+        if self.fsync == 'full':
+            _fsync_directory(os.path.dirname(path))
+        with self.lock:
+            self.stats['written'] += 1
+        return path
+
+    def link(self, source, extension, suffix=""):
+        """Hard-link an existing file under a new name; returns the path (OSError without hard links)"""
+        while True:
+            path = self.next_path(extension, suffix)
+            try:
+                os.link(source, path)
+            except FileExistsError:
+                with self.lock:
+                    self.stats['collisions'] += 1
+                continue
+            if self.fsync == 'full':
+                _fsync_directory(os.path.dirname(path))
+            with self.lock:
+                self.stats['written'] += 1
+            return path
+
+    def write(self, data, extension, suffix=""):
+        """Write bytes under a new name; returns the path"""
+        return self.write_with(lambda f: f.write(data), extension, suffix)
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.stats)
+
+
+def from_settings(settings, directory=None):
+    """OutputWriter configured by the output_* settings"""
+    return OutputWriter(
+        settings.get('output_directory', '') if directory is None else directory,
+        settings.get('default_filename', 'screenshot'),
+        settings.get('output_sharding', 'day'),
+        settings.get('output_fsync', 'file'),
+    )
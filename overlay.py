@@ -0,0 +1,460 @@
+import time
+import tkinter as tk
+from PIL import Image, ImageTk
+import frame
+
+
+def dim_image(image, settings):
+    """Copy of image darkened the way the area around a selection is shown"""
+    overlay = Image.new("RGB", image.size, settings.get('overlay_color', '#222222'))
+    return Image.blend(image, overlay, settings.get('overlay_dim', 0.5))
+
+
+class SelectionRenderer:
+    """Draws the dimmed surround and the bright selection on the overlay canvas.
+
+    The dimmed copy of the background is computed once per background. While
+    dragging, the canvas background shows the dimmed copy and a single image
+    item shows the selected part of the undimmed background. Each motion
+    event only moves that item and has Tk copy the selected pixels into one
+    reusable photo image, so no canvas items or Python images are created per
+    event. origin is the canvas position of the background's top-left pixel.
+    """
+
+    def __init__(self, canvas, bg_item_id, settings, origin=(0, 0)):
+        self.canvas = canvas
+        self.bg_item_id = bg_item_id
+        self.settings = settings
+        self.origin = origin
+        self.bright_photo = None
+        self.dim_photo = None
+        self.active = False
+        self.cutout_photo = tk.PhotoImage(master=canvas)
+        self.cutout_id = canvas.create_image(
+            0, 0, image=self.cutout_photo, anchor="nw", state="hidden", tags="selection_cutout"
+        )
+        self.stats = {
+            'updates': 0,
+            'items_created': 1,
+            'photo_allocations': 1,
+            'last_update_ms': 0.0,
+            'max_update_ms': 0.0,
+        }
+
+    def set_background(self, image, bright_photo, dim_photo=None):
+        """Use a new background; precomputes its dimmed copy unless dim_photo is given"""
+        self.bright_photo = bright_photo
+        if dim_photo is None:
+            dim_photo = ImageTk.PhotoImage(dim_image(image, self.settings))
+        self.dim_photo = dim_photo
+        self.stats['photo_allocations'] += 1
+
+    def release(self):
+        """Forget the background photos"""
+        self.end()
+        self.bright_photo = None
+        self.dim_photo = None
+        self.cutout_photo.blank()
+
+    def begin(self):
+        """Start a drag: dim the whole background"""
+        if not self.dim_photo:
+            return
+        self.active = True
+        self.canvas.itemconfig(self.bg_item_id, image=self.dim_photo)
+
+    def update(self, x1, y1, x2, y2):
+        """Show the undimmed background inside the selection (canvas coordinates)"""
+        if not self.active:
+            return
+        started = time.perf_counter()
+        ox, oy = self.origin
+        x1, y1 = max(0, int(x1) - ox), max(0, int(y1) - oy)
+        x2 = min(self.bright_photo.width(), int(x2) - ox)
+        y2 = min(self.bright_photo.height(), int(y2) - oy)
+        if x2 > x1 and y2 > y1:
+            self.canvas.tk.call(
+                str(self.cutout_photo), "copy", str(self.bright_photo),
+                "-from", x1, y1, x2, y2, "-to", 0, 0, "-shrink"
+            )
+            self.canvas.coords(self.cutout_id, x1 + ox, y1 + oy)
+            self.canvas.itemconfig(self.cutout_id, state="normal")
+        else:
+            self.canvas.itemconfig(self.cutout_id, state="hidden")
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats['updates'] += 1
+        self.stats['last_update_ms'] = elapsed
+        self.stats['max_update_ms'] = max(self.stats['max_update_ms'], elapsed)
+
+    def end(self):
+        """Finish a drag: restore the undimmed background"""
+        self.active = False
+        self.canvas.itemconfig(self.cutout_id, state="hidden")
+        if self.bright_photo:
+            self.canvas.itemconfig(self.bg_item_id, image=self.bright_photo)
+
+    def get_stats(self):
+        """Counters for profiling; canvas_items should stay constant while dragging"""
+        stats = dict(self.stats)
+        stats['canvas_items'] = len(self.canvas.find_all())
+        return stats
+
+
+class StippleSelectionRenderer:
+    """Selection renderer for large desktops that needs no extra image memory.
+
+    Instead of a dimmed copy of the background, four persistent stippled
+    rectangles darken the area around the selection. Dragging only moves
+    them. The interface matches SelectionRenderer.
+    """
+
+    def __init__(self, canvas, bg_item_id, settings, origin=(0, 0)):
+        self.canvas = canvas
+        self.settings = settings
+        self.origin = origin
+        self.active = False
+        self.width = self.height = 0
+        self.shade_ids = [
+            canvas.create_rectangle(
+                0, 0, 0, 0, fill=settings.get('overlay_color', '#222222'),
+                stipple=settings.get('overlay_stipple', 'gray50'), outline="",
+                state="hidden", tags="selection_cutout"
+            )
+            for _ in range(4)
+        ]
+        self.stats = {
+            'updates': 0,
+            'items_created': len(self.shade_ids),
+            'photo_allocations': 0,
+            'last_update_ms': 0.0,
+            'max_update_ms': 0.0,
+        }
+
+    def set_background(self, image, bright_photo=None, dim_photo=None):
+        self.width, self.height = image.size
+
+    def release(self):
+        self.end()
+
+    def begin(self):
+        self.active = True
+        self.update(*self.origin, *self.origin)
+
+    def update(self, x1, y1, x2, y2):
+        if not self.active:
+            return
+        started = time.perf_counter()
+        ox, oy = self.origin
+        right_edge, bottom_edge = ox + self.width, oy + self.height
+        x1, x2 = (min(max(v, ox), right_edge) for v in (x1, x2))
+        y1, y2 = (min(max(v, oy), bottom_edge) for v in (y1, y2))
+        top, bottom, left, right = self.shade_ids
+        self.canvas.coords(top, ox, oy, right_edge, y1)
+        self.canvas.coords(bottom, ox, y2, right_edge, bottom_edge)
+        self.canvas.coords(left, ox, y1, x1, y2)
+        self.canvas.coords(right, x2, y1, right_edge, y2)
+        for item in self.shade_ids:
+            self.canvas.itemconfig(item, state="normal")
+        elapsed = (time.perf_counter() - started) * 1000
+        self.stats['updates'] += 1
+        self.stats['last_update_ms'] = elapsed
+        self.stats['max_update_ms'] = max(self.stats['max_update_ms'], elapsed)
+
+    def end(self):
+        self.active = False
+        for item in self.shade_ids:
+            self.canvas.itemconfig(item, state="hidden")
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['canvas_items'] = len(self.canvas.find_all())
+        return stats
+
+
+class TiledBackground:
+    """Shows a frame as a grid of tile PhotoImages.
+
+    Used on large desktops. No single full-size PIL image is ever built:
+    each tile is decoded from the source on its own, uploaded, and then
+    dropped on the Python side.
+    """
+
+    def __init__(self, canvas, width, height, tile_size=512, origin=(0, 0)):
+        self.canvas = canvas
+        self.tile_size = tile_size
+        self.photos = []
+        self.item_ids = []
+        ox, oy = origin
+        for top in range(0, height, tile_size):
+            for left in range(0, width, tile_size):
+                box = (left, top, min(left + tile_size, width), min(top + tile_size, height))
+                item = canvas.create_image(ox + left, oy + top, anchor="nw", tags="bg_tile")
+                self.item_ids.append((item, box))
+        canvas.tag_lower("bg_tile")
+
+    def load(self, source):
+        """Upload every tile of source (anything with a PIL-style crop())"""
+        for _ in self.upload(source):
+            pass
+
+    def upload(self, source):
+        """Generator uploading one tile per step"""
+        self.photos = []
+        for item, box in self.item_ids:
+            photo = ImageTk.PhotoImage(source.crop(box))
+            self.canvas.itemconfig(item, image=photo)
+            self.photos.append(photo)
+            yield
+
+    def release(self):
+        for item, box in self.item_ids:
+            self.canvas.itemconfig(item, image="")
+        self.photos = []
+
+
+class MonitorOverlay:
+    """Overlay window, canvas and background for a single monitor.
+
+    Every overlay canvas works in virtual-desktop coordinates: its scroll
+    region starts at the monitor's offset inside the virtual desktop, so a
+    selection has the same coordinates on every monitor and can cross
+    monitor boundaries. The background holds only this monitor's pixels.
+    An overlay for monitors[0] is the classic single-window overlay.
+
+    upload_background() builds the on-screen copy a strip of rows at a time
+    so it can be spread over idle time: the frame can stay a FrameStore over
+    the grabbed buffer until then, and captures read from it meanwhile.
+    """
+
+    # Rows decoded and uploaded per upload_background() step
+    STRIP_ROWS = 128
+
+    def __init__(self, window, monitor, virtual_monitor, settings, large=False):
+        self.window = window
+        self.monitor = dict(monitor)
+        self.settings = settings
+        self.large = large
+        self.width, self.height = monitor['width'], monitor['height']
+        self.origin = (monitor['left'] - virtual_monitor['left'], monitor['top'] - virtual_monitor['top'])
+        ox, oy = self.origin
+
+        window.overrideredirect(True)
+        window.geometry(f"{self.width}x{self.height}+{monitor['left']}+{monitor['top']}")
+        window.lift()
+        window.attributes("-topmost", True)
+        window.configure(bg=settings['background_color'])
+
+        self.canvas = tk.Canvas(
+            window,
+            cursor="crosshair",
+            bg=settings['background_color'],
+            highlightthickness=0,
+            width=self.width,
+            height=self.height,
+            scrollregion=(ox, oy, ox + self.width, oy + self.height)
+        )
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.canvas.xview_moveto(0)
+        self.canvas.yview_moveto(0)
+
+        # Canvas item for the screenshot background; filled in by show_background()
+        self.bg_img_id = self.canvas.create_image(ox, oy, anchor="nw")
+        self.image = None
+        self.photo = None
+        if large:
+            self.tiles = TiledBackground(self.canvas, self.width, self.height, origin=self.origin)
+            self.renderer = StippleSelectionRenderer(self.canvas, self.bg_img_id, settings, origin=self.origin)
+        else:
+            self.tiles = None
+            self.renderer = SelectionRenderer(self.canvas, self.bg_img_id, settings, origin=self.origin)
+
+        # Outline of a selection being made on another monitor
+        self.mirror_id = self.canvas.create_rectangle(
+            0, 0, 0, 0, outline="#1976d2", width=3, dash=(5, 5), state="hidden", tags="selection_mirror"
+        )
+
+    def matches(self, monitor, virtual_monitor):
+        """True if this overlay already covers monitor at the same virtual-desktop offset"""
+        origin = (monitor['left'] - virtual_monitor['left'], monitor['top'] - virtual_monitor['top'])
+        return all(self.monitor[k] == monitor[k] for k in ('left', 'top', 'width', 'height')) and origin == self.origin
+
+    def load(self, image):
+        """Use a new frame of this monitor (PIL image or FrameStore)"""
+        self.release()
+        self.image = image
+
+    def show_background(self):
+        if self.tiles or not isinstance(self.image, Image.Image):
+            # Tiles, or a raw frame whose upload was interrupted: decode it piecewise
+            for _ in self.upload_background():
+                pass
+            return
+        self.photo = ImageTk.PhotoImage(self.image)
+        self.canvas.itemconfig(self.bg_img_id, image=self.photo)
+        self.renderer.set_background(self.image, self.photo)
+
+    def upload_background(self):
+        """Generator doing show_background() in steps of one strip or tile.
+
+        In standard mode a FrameStore frame is replaced by the decoded PIL
+        image once the last strip is done. The dimmed copy is built strip by
+        strip too, so until the upload finishes a drag shows no dimming.
+        """
+        source = self.image
+        if self.tiles:
+            yield from self.tiles.upload(source)
+            self.renderer.set_background(source, None)
+            return
+        self.photo = tk.PhotoImage(master=self.canvas, width=self.width, height=self.height)
+        dim_photo = tk.PhotoImage(master=self.canvas, width=self.width, height=self.height)
+        self.canvas.itemconfig(self.bg_img_id, image=self.photo)
+        decoded = source if isinstance(source, Image.Image) else Image.new("RGB", (self.width, self.height))
+        for top in range(0, self.height, self.STRIP_ROWS):
+            box = (0, top, self.width, min(top + self.STRIP_ROWS, self.height))
+            strip = source.crop(box)
+            if decoded is not source:
+                decoded.paste(strip, (0, top))
+            for photo, image in ((self.photo, strip), (dim_photo, dim_image(strip, self.settings))):
+                strip_photo = ImageTk.PhotoImage(image)
+                self.canvas.tk.call(str(photo), "copy", str(strip_photo), "-to", 0, top)
+            yield
+        # The FrameStore is left to the garbage collector: a stitched frame may still read from it
+        self.image = decoded
+        self.renderer.set_background(decoded, self.photo, dim_photo)
+
+    def hide_background(self):
+        """Drop the on-screen copy of the frame but keep the frame itself"""
+        self.renderer.release()
+        if self.tiles:
+            self.tiles.release()
+        self.canvas.itemconfig(self.bg_img_id, image="")
+        self.photo = None
+
+    def release(self):
+        """Drop all background buffers"""
+        self.hide_background()
+        if isinstance(self.image, frame.FrameStore):
+            self.image.release()
+        self.image = None
+
+    def show_mirror(self, x1, y1, x2, y2):
+        self.canvas.coords(self.mirror_id, x1, y1, x2, y2)
+        self.canvas.itemconfig(self.mirror_id, state="normal")
+        self.canvas.tag_raise(self.mirror_id)
+
+    def hide_mirror(self):
+        self.canvas.itemconfig(self.mirror_id, state="hidden")
+
+    def destroy(self):
+        self.release()
+        if isinstance(self.window, tk.Tk):
+            # The root outlives its overlays; only drop what this overlay put in it
+            self.canvas.destroy()
+        else:
+            self.window.destroy()
+
+
+class SelectionRendererGroup:
+    """Forwards selection updates to the renderers of every monitor overlay"""
+
+    def __init__(self, renderers):
+        self.renderers = list(renderers)
+
+    def release(self):
+        for renderer in self.renderers:
+            renderer.release()
+
+    def begin(self):
+        for renderer in self.renderers:
+            renderer.begin()
+
+    def update(self, x1, y1, x2, y2):
+        for renderer in self.renderers:
+            renderer.update(x1, y1, x2, y2)
+
+    def end(self):
+        for renderer in self.renderers:
+            renderer.end()
+
+    @property
+    def stats(self):
+        """Counters summed over all renderers (timings are the worst renderer's)"""
+        stats = {}
+        for renderer in self.renderers:
+            for key, value in renderer.stats.items():
+                if key.endswith('_ms'):
+                    stats[key] = max(stats.get(key, 0.0), value)
+                else:
+                    stats[key] = stats.get(key, 0) + value
+        return stats
+
+
+class RedrawScheduler:
+    """Coalesces pointer events and renders at most once per frame.
+
+    Motion handlers post the latest pointer position instead of redrawing.
+    Positions posted before the next frame replace each other, and the
+    render callback runs from the Tk loop via after/after_idle. The frame
+    interval grows when rendering is slower than the target frame rate, so
+    slow machines and remote X sessions drop frames instead of falling behind.
+    """
+
+    # Weight of the newest sample in the render cost moving average
+    COST_SMOOTHING = 0.2
+
+    def __init__(self, widget, target_fps=60):
+        self.widget = widget
+        self.min_interval_ms = 1000.0 / target_fps
+        self.interval_ms = self.min_interval_ms
+        self.cost_ms = 0.0
+        self.pending = None
+        self.after_id = None
+        self.last_render = 0.0
+        self.stats = {'events': 0, 'frames': 0, 'dropped': 0}
+
+    def post(self, render, *args):
+        """Queue render(*args) for the next frame, replacing anything pending"""
+        self.stats['events'] += 1
+        if self.pending is not None:
+            self.stats['dropped'] += 1
+        self.pending = (render, args)
+        if self.after_id is not None:
+            return
+        wait_ms = self.interval_ms - (time.perf_counter() - self.last_render) * 1000
+        if wait_ms > 1:
+            self.after_id = self.widget.after(int(wait_ms), self.run_pending)
+        else:
+            self.after_id = self.widget.after_idle(self.run_pending)
+
+    def run_pending(self):
+        """Render the most recent posted position"""
+        self.after_id = None
+        if self.pending is None:
+            return
+        render, args = self.pending
+        self.pending = None
+        started = time.perf_counter()
+        try:
+            render(*args)
+        finally:
+            self.last_render = time.perf_counter()
+            cost = (self.last_render - started) * 1000
+            self.cost_ms += (cost - self.cost_ms) * self.COST_SMOOTHING
+            # Leave the event loop some headroom when rendering is expensive
+            self.interval_ms = max(self.min_interval_ms, self.cost_ms * 1.5)
+            self.stats['frames'] += 1
+
+    def cancel(self):
+        """Drop any pending render"""
+        if self.after_id is not None:
+            self.widget.after_cancel(self.after_id)
+            self.after_id = None
+        if self.pending is not None:
+            self.stats['dropped'] += 1
+        self.pending = None
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['interval_ms'] = round(self.interval_ms, 2)
+        stats['render_cost_ms'] = round(self.cost_ms, 2)
+        return stats
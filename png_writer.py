@@ -0,0 +1,174 @@
+"""
+Parallel PNG writer for very large captures.
+
+Pillow filters and deflates a PNG on one thread, which takes seconds for
+the 30-100 MP images of full-desktop and scrolling captures. write_png()
+splits the image into strips of scanlines and compresses them on a thread
+pool, the way pigz does: each strip is deflated as a raw stream that ends
+with a full flush, primed with the last 32 KB of the strip before it, and
+the pieces are joined into one zlib stream whose Adler-32 is combined from
+the per-strip checksums. The result is an ordinary PNG, within a fraction
+of a percent of Pillow's size (same filters, same Z_FILTERED strategy).
+
+Scanline filtering is left to Pillow: each worker encodes its strip (plus
+the rows just above it, so the first row filters against its real
+neighbour) as an uncompressed PNG and takes the filtered rows out of it.
+Both Pillow's encoder and zlib release the GIL, so strips run in parallel.
+
+Nothing in here imports tkinter.
+"""
+
+import concurrent.futures
+import io
+import os
+import struct
+import zlib
+
+# Below this many pixels Pillow's own encoder is as fast
+PARALLEL_MIN_PIXELS = 4 * 1024 * 1024
+
+# Filtered bytes per strip; larger strips cost less in flushes, smaller ones balance better
+STRIP_BYTES = 2 * 1024 * 1024
+
+# Deflate window, primed from the previous strip
+WINDOW = 32 * 1024
+
+# PNG color type per supported image mode
+COLOR_TYPES = {'L': 0, 'RGB': 2, 'P': 3, 'LA': 4, 'RGBA': 6}
+
+# img.info keys Pillow would turn into extra chunks; such images stay with Pillow
+_PILLOW_ONLY_INFO = ('icc_profile', 'exif', 'dpi')
+
+_ADLER_BASE = 65521
+
+
+def supported(img):
+    """True if write_png() can write img exactly as Pillow would"""
+    if img.mode not in COLOR_TYPES or any(key in img.info for key in _PILLOW_ONLY_INFO):
+        return False
+    if img.mode == 'P':
+        return img.palette is not None and img.palette.mode == 'RGB' and 'transparency' not in img.info
+    return 'transparency' not in img.info
+
+
+def adler32_combine(adler1, adler2, len2):
+    """Adler-32 of A+B from those of A and B and the length of B (zlib's adler32_combine)"""
+    rem = len2 % _ADLER_BASE
+    sum1 = adler1 & 0xffff
+    sum2 = rem * sum1 % _ADLER_BASE
+    sum1 += (adler2 & 0xffff) + _ADLER_BASE - 1
+    sum2 += (adler1 >> 16) + (adler2 >> 16) + _ADLER_BASE - rem
+    return (sum1 % _ADLER_BASE) | (sum2 % _ADLER_BASE) << 16
+
+
+def _chunk(fp, tag, data):
+    fp.write(struct.pack(">I", len(data)) + tag + data)
+    fp.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+
+def _filtered_rows(img, top, bottom):
+    """PNG-filtered scanlines of rows [top, bottom) with the filter byte of each row"""
+    # One row more so the first wanted row is filtered against its real neighbour
+    start = max(0, top - 1)
+    buffer = io.BytesIO()
+    # Pillow packs small palettes below 8 bits unless told otherwise
+    options = {'bits': 8} if img.mode == 'P' else {}
+    img.crop((0, start, img.size[0], bottom)).save(buffer, 'PNG', compress_level=0, **options)
+    data = buffer.getvalue()
+    idat = []
+    pos = 8
+    while pos < len(data):
+        length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+        if tag == b'IDAT':
+            idat.append(data[pos + 8:pos + 8 + length])
+        pos += length + 12
+    raw = zlib.decompress(b"".join(idat))
+    if start < top:
+        raw = raw[len(raw) // (bottom - start):]
+    return raw
+
+
+def _deflate_strip(img, top, bottom, dict_rows, level, last):
+    """(deflated bytes, adler32, length) of one strip; dict_rows above it prime the window"""
+    raw = _filtered_rows(img, top - dict_rows, bottom)
+    row_bytes = len(raw) // (bottom - top + dict_rows)
+    split = dict_rows * row_bytes
+    strip = memoryview(raw)[split:]
+    if split:
+        window = raw[max(0, split - WINDOW):split]
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_FILTERED, window)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 9, zlib.Z_FILTERED)
+    # A full flush ends the strip on a byte boundary without the final-block bit
+    data = compressor.compress(strip) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_FULL_FLUSH)
+    return data, zlib.adler32(strip), len(strip)
+
+
+def _zlib_header(level):
+    flevel = 0 if level in (0, 1) else 1 if level < 6 else 2 if level == 6 else 3
+    header = 0x78 << 8 | flevel << 6
+    return struct.pack(">H", header + 31 - header % 31)
+
+
+def write_png(img, fp, compress_level=6, workers=None, strip_bytes=STRIP_BYTES):
+    """Write img to a binary file object as PNG, deflating strips on `workers` threads"""
+    if not supported(img):
+        raise ValueError(f"parallel PNG writer cannot write mode {img.mode} with {sorted(img.info)}")
+    if compress_level is None or compress_level < 0:
+        compress_level = 6
+    width, height = img.size
+    channels = len(img.getbands())
+    row_bytes = width * channels + 1
+    strip_rows = max(1, strip_bytes // row_bytes)
+    dict_rows = -(-WINDOW // row_bytes)
+    workers = workers or os.cpu_count() or 1
+
+    fp.write(b"\x89PNG\r\n\x1a\n")
+    _chunk(fp, b'IHDR', struct.pack(">IIBBBBB", width, height, 8, COLOR_TYPES[img.mode], 0, 0, 0))
+    if img.mode == 'P':
+        _chunk(fp, b'PLTE', bytes(img.getpalette()))
+
+    img.load()
+    strips = [(top, min(height, top + strip_rows)) for top in range(0, height, strip_rows)]
+    adler, pending = 1, []
+    with concurrent.futures.ThreadPoolExecutor(workers, thread_name_prefix="png") as pool:
+        strips = iter(strips)
+
+        def submit_next():
+            strip = next(strips, None)
+            if strip is not None:
+                top, bottom = strip
+                pending.append(pool.submit(
+                    _deflate_strip, img, top, bottom, min(top, dict_rows), compress_level, bottom == height
+                ))
+
+        # A few strips in flight per worker keeps every core busy with bounded memory
+        for _ in range(2 * workers):
+            submit_next()
+        header = _zlib_header(compress_level)
+        while pending:
+            data, strip_adler, length = pending.pop(0).result()
+            submit_next()
+            adler = adler32_combine(adler, strip_adler, length)
+            if not pending:
+                data += struct.pack(">I", adler)
+            _chunk(fp, b'IDAT', header + data)
+            header = b""
+    _chunk(fp, b'IEND', b"")
+
+
+def encode_png(img, compress_level=6, workers=None, strip_bytes=STRIP_BYTES):
+    """PNG bytes of img, deflated in parallel"""
+    buffer = io.BytesIO()
+    write_png(img, buffer, compress_level, workers, strip_bytes)
+    return buffer.getvalue()
+
+
+def wanted(img, options):
+    """True if a PNG save of img with these save() options should use the parallel writer"""
+    return (
+        img.size[0] * img.size[1] >= PARALLEL_MIN_PIXELS and img.size[1] > 0
+        and (os.cpu_count() or 1) > 1
+        and set(options) <= {'compress_level'}
+        and supported(img)
+    )
@@ -0,0 +1,225 @@
+"""
+Asynchronous save pipeline.
+
+Saving a large capture as PNG takes hundreds of milliseconds, far too long
+for the Tk thread. SavePipeline encodes and writes images on a small pool
+of worker threads (Pillow releases the GIL while compressing, so threads
+encode in parallel). Jobs wait in a bounded queue: submit() blocks or, with
+block=False, raises queue.Full so the caller can back off.
+
+Worker threads never touch Tk. Finished jobs are collected and their
+on_done callbacks run on whichever thread calls run_callbacks(), which the
+overlay does from a root.after() poll. flush() waits for every queued job;
+close() flushes and stops the workers. With an encode_cache the workers
+reuse encodings made for the clipboard or prefetched for the preview.
+Format 'AUTO' (or PNG8) is resolved by export.plan_export() on the worker,
+so the content analysis never runs on the Tk thread either. Jobs without a
+filename are named by the pipeline's output_writer.OutputWriter, and every
+file is written atomically. With a capture_store.CaptureStore, captures whose
+pixels were saved before are linked to the earlier file instead of encoded.
+A job's capture_index record is embedded into the PNG it is saved as; a
+store duplicate links to a file carrying the record of the first capture.
+
+Nothing in here imports tkinter.
+"""
+
+import queue
+import threading
+import time
+
+import capture
+import export
+import output_writer
+
+
+class SaveJob:
+    """One image to encode and write; on_done(job) runs once it finished or failed"""
+
+    def __init__(self, img, filename, image_format='PNG', on_done=None, policy='lossless', record=None):
+        self.img = img
+        self.filename = filename
+        self.image_format = image_format
+        self.policy = policy
+        # The export.ExportPlan actually used, once encoding started (None for store duplicates)
+        self.plan = None
+        # True if a capture store already held these pixels
+        self.duplicate = False
+        # The capture's capture_index record, if it has one
+        self.record = record
+        self.on_done = on_done
+        self.state = 'queued'
+        self.path = None
+        self.error = None
+        self.submitted = time.perf_counter()
+        self.finished = None
+
+    @property
+    def ok(self):
+        return self.state == 'done'
+
+    @property
+    def elapsed_ms(self):
+        """Milliseconds from submit() until the file was written"""
+        end = self.finished if self.finished is not None else time.perf_counter()
+        return (end - self.submitted) * 1000
+
+
+class SavePipeline:
+    """Bounded queue of save jobs served by background encoder threads"""
+
+    def __init__(self, workers=2, max_pending=4, encode_cache=None, writer=None, store=None):
+        self.encode_cache = encode_cache
+        # Names and writes captures submitted without a filename
+        self.writer = writer or output_writer.OutputWriter()
+        self.store = store
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.completed = queue.Queue()
+        self.lock = threading.Lock()
+        self.counts = {'queued': 0, 'active': 0, 'done': 0, 'failed': 0}
+        self.closed = False
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"save-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, img, filename, image_format='PNG', on_done=None, block=True, timeout=None, policy='lossless',
+               record=None):
+        """Queue img for saving; raises queue.Full if the queue stays full (block=False or timeout).
+
+        image_format is any export format, including 'AUTO'; policy is an export quality policy.
+        With filename None the writer picks a new unique name. record is the
+        capture's capture_index record, embedded into PNG files.
+        """
+        if self.closed:
+            raise RuntimeError("Save pipeline is closed")
+        job = SaveJob(img, filename, image_format, on_done, policy, record)
+        # Counted before put() so a worker can never see the job uncounted
+        with self.lock:
+            self.counts['queued'] += 1
+        try:
+            self.jobs.put(job, block, timeout)
+        except queue.Full:
+            with self.lock:
+                self.counts['queued'] -= 1
+            raise
+        return job
+
+    def _worker(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            with self.lock:
+                self.counts['queued'] -= 1
+                self.counts['active'] += 1
+            job.state = 'encoding'
+            try:
+                if self.store is not None:
+                    # Duplicates share the stored object, and with it the record it was first saved with
+                    job.path, job.duplicate = self.store.save(
+                        job.img, job.filename, job.image_format, job.policy, self.writer, self._encoder(job.record)
+                    )
+                else:
+                    job.plan = plan = export.plan_export(job.img, job.image_format, job.policy)
+                    job.path = self._write(job, plan)
+                job.state = 'done'
+            except Exception as e:
+                job.error = e
+                job.state = 'failed'
+            job.finished = time.perf_counter()
+            with self.lock:
+                self.counts['active'] -= 1
+                self.counts['done' if job.ok else 'failed'] += 1
+            self.completed.put(job)
+            self.jobs.task_done()
+
+    def _encoder(self, record):
+        """encode(img, format, **options) through the encode cache, embedding record into PNGs"""
+        encode = self.encode_cache.get if self.encode_cache is not None else capture.encode_image
+        if record is None:
+            return encode
+
+        def encode_tagged(img, image_format, **options):
+            data = encode(img, image_format, **options)
+            if image_format == 'PNG':
+                # The record travels with the file, so a moved capture can be found again
+                import capture_index
+                data = capture_index.tag_png(data, record)
+            return data
+
+        return encode_tagged
+
+    def _write(self, job, plan):
+        """Encode job.img as planned and write it; returns the path"""
+        fsync = self.writer.fsync
+        if self.encode_cache is not None or (job.record is not None and plan.image_format == 'PNG'):
+            data = self._encoder(job.record)(job.img, plan.image_format, **plan.options)
+            if job.filename is None:
+                return self.writer.write(data, capture.FORMAT_EXTENSIONS[plan.image_format][0])
+            return capture.write_encoded(data, job.filename, plan.image_format, fsync)
+        if job.filename is None:
+            return self.writer.write_with(
+                lambda f: capture.write_image(job.img, f, plan.image_format, **plan.options),
+                capture.FORMAT_EXTENSIONS[plan.image_format][0]
+            )
+        return capture.save_image(job.img, job.filename, plan.image_format, fsync=fsync, **plan.options)
+
+    @property
+    def pending(self):
+        """Jobs queued or being encoded"""
+        with self.lock:
+            return self.counts['queued'] + self.counts['active']
+
+    def get_stats(self):
+        with self.lock:
+            return dict(self.counts)
+
+    def run_callbacks(self):
+        """Run on_done for finished jobs on the calling thread; returns how many finished"""
+        finished = 0
+        while True:
+            try:
+                job = self.completed.get_nowait()
+            except queue.Empty:
+                return finished
+            finished += 1
+            if job.on_done:
+                try:
+                    job.on_done(job)
+                except Exception as e:
+                    print(f"⚠️  Save callback failed: {e}")
+            # The pixels are no longer needed once the callback has seen the job
+            job.img = None
+
+    def flush(self, timeout=None):
+        """Wait until every queued job is written; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=None):
+        """Flush, run the remaining callbacks and stop the workers"""
+        if self.closed:
+            return True
+        flushed = self.flush(timeout)
+        self.closed = True
+        self.run_callbacks()
+        if flushed:
+            for _ in self.threads:
+                self.jobs.put(None)
+            for thread in self.threads:
+                thread.join()
+        # Otherwise the daemon worker threads are abandoned mid-write
+        return flushed
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
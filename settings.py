@@ -1,38 +1,8 @@
-import os
-import json
 import tkinter as tk
 from tkinter import ttk
 
-class ConfigManager:
-    """Manages configuration file operations"""
-    
-    def __init__(self, config_file="screenshot_config.json"):
-        self.config_file = config_file
-        
-    def load_config(self, default_settings):
-        """Load configuration from file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    loaded_settings = json.load(f)
-                    # Merge with defaults to ensure all keys exist
-                    default_settings.update(loaded_settings)
-                    print(f"✅ Loaded configuration from {self.config_file}")
-            else:
-                print("📝 No configuration file found, using defaults")
-        except Exception as e:
-            print(f"⚠️  Failed to load configuration: {e}")
-        
-        return default_settings
-    
-    def save_config(self, settings):
-        """Save configuration to file"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(settings, f, indent=2)
-            print(f"✅ Configuration saved to {self.config_file}")
-        except Exception as e:
-            print(f"⚠️  Failed to save configuration: {e}")
+# ConfigManager lives in the tkinter-free config module; re-exported for callers
+from config import ConfigManager  # noqa: F401
 
 
 class SettingsDialog:
@@ -146,6 +116,15 @@ class SettingsDialog:
         )
         show_magnifier_cb.pack(anchor=tk.W, pady=5)
         
+        # Live capture mode
+        live_capture_var = tk.BooleanVar(value=self.settings.get('capture_mode', 'frozen') == 'live')
+        live_capture_cb = tk.Checkbutton(
+            parent, text="Re-grab screen on capture (live mode)", 
+            variable=live_capture_var, bg='#2c2c2c', fg='white',
+            selectcolor='#4CAF50', font=("Arial", 10)
+        )
+        live_capture_cb.pack(anchor=tk.W, pady=5)
+        
         # Default filename
         filename_frame = tk.Frame(parent, bg='#2c2c2c')
         filename_frame.pack(fill=tk.X, pady=10)
@@ -168,6 +147,7 @@ class SettingsDialog:
         self.copy_clipboard_var = copy_clipboard_var
         self.include_cursor_var = include_cursor_var
         self.show_magnifier_var = show_magnifier_var
+        self.live_capture_var = live_capture_var
         self.filename_var = filename_var
         
     def create_appearance_settings(self, parent):
@@ -298,6 +278,7 @@ class SettingsDialog:
             'copy_to_clipboard': self.copy_clipboard_var.get(),
             'include_cursor': self.include_cursor_var.get(),
             'show_magnifier': self.show_magnifier_var.get(),
+            'capture_mode': 'live' if self.live_capture_var.get() else 'frozen',
             'default_filename': self.filename_var.get(),
             'overlay_alpha': self.alpha_var.get(),
             'selection_color': self.color_var.get(),
@@ -0,0 +1,130 @@
+"""
+Startup profiling for the interactive tool.
+
+    screenshot-tool --profile-startup [--exit-when-ready]
+
+enable() times every module imported from then on and phase() times the
+steps of building the overlay. report() prints both, together with the time
+from process start to the interactive overlay. Until enable() is called
+phase() is a no-op, so the hooks cost nothing in normal runs.
+
+Nothing in here imports tkinter.
+"""
+
+import builtins
+import contextlib
+import os
+import sys
+import time
+
+_profile = None
+
+
+class StartupProfile:
+    """Import and init-phase timings collected during one startup"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        # Time the interpreter had already spent before enable() was called
+        self.process_age_at_start = process_age()
+        self.imports = []
+        self.phases = []
+        self.ready = None
+        self._depth = 0
+        self._original_import = None
+
+    def install(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original_import(name, globals, locals, fromlist, level)
+        self._depth += 1
+        started = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist, level)
+        finally:
+            self._depth -= 1
+            self.imports.append((name, self._depth, (time.perf_counter() - started) * 1000))
+
+    def elapsed_ms(self):
+        """Milliseconds since process start, or since enable() if the start is unknown"""
+        since_enable = (time.perf_counter() - self.started) * 1000
+        return since_enable + (self.process_age_at_start or 0) * 1000
+
+    def report(self, top=15):
+        """Print the import and phase breakdown"""
+        print("⏱️  Startup profile")
+        if self.process_age_at_start is not None:
+            print(f"   interpreter start: {self.process_age_at_start * 1000:8.1f} ms")
+        top_level = sorted((i for i in self.imports if i[1] == 0), key=lambda i: -i[2])
+        print(f"   imports ({len(self.imports)} modules, {sum(i[2] for i in top_level):.1f} ms, slowest first):")
+        for name, _, ms in top_level[:top]:
+            print(f"     {ms:8.1f} ms  {name}")
+        print("   init phases:")
+        for name, ms in self.phases:
+            print(f"     {ms:8.1f} ms  {name}")
+        if self.ready is not None:
+            print(f"🏁 Interactive overlay after {self.ready:.1f} ms")
+
+
+def process_age():
+    """Seconds since this process started, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the parenthesised command name; starttime is field 22
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def enable():
+    """Start profiling; returns the active profile"""
+    global _profile
+    if _profile is None:
+        _profile = StartupProfile()
+        _profile.install()
+    return _profile
+
+
+def active():
+    return _profile
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time an init phase when profiling is enabled"""
+    if _profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profile.phases.append((name, (time.perf_counter() - started) * 1000))
+
+
+def record_phase(name, ms):
+    """Record a phase timed elsewhere, e.g. work deferred to the event loop"""
+    if _profile is not None:
+        _profile.phases.append((name, ms))
+        if _profile.ready is not None:
+            print(f"⏱️  {name}: {ms:.1f} ms")
+
+
+def mark_ready():
+    """Record that the overlay is interactive, stop timing imports and print the report"""
+    if _profile is None or _profile.ready is not None:
+        return
+    _profile.ready = _profile.elapsed_ms()
+    _profile.uninstall()
+    _profile.report()
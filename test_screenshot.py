@@ -3,6 +3,7 @@
 Basic tests for the Advanced Screen Capture Tool
 """
 
+import importlib.util
 import unittest
 import sys
 import os
@@ -139,5 +140,1070 @@ class TestScreenCaptureTool(unittest.TestCase):
             if os.path.exists(config_file):
                 os.unlink(config_file)
 
+
+class TestFrozenCapture(unittest.TestCase):
+    """Test cases for capturing from the frozen background frame"""
+    
+    def test_capture_from_background_uses_virtual_offset(self):
+        """Test that screen coordinates are mapped into the background frame"""
+        from PIL import Image
+        # pyautogui needs a display at import time; cursor support is not under test
+        with patch.dict(sys.modules, {'pyautogui': None}):
+            from capture_tool import ScreenCaptureTool
+        
+        tool = ScreenCaptureTool.__new__(ScreenCaptureTool)
+        tool.settings = {'include_cursor': False, 'capture_mode': 'frozen'}
+        tool.total_left = -100
+        tool.total_top = 50
+        tool.full_bg_img = Image.new("RGB", (400, 300), (0, 0, 0))
+        tool.full_bg_img.putpixel((110, 20), (255, 0, 0))
+        
+        img = tool.grab_selection(10, 70, 20, 10)
+        
+        self.assertEqual(img.size, (20, 10))
+        self.assertEqual(img.getpixel((0, 0)), (255, 0, 0))
+    
+    def test_large_desktop_mode_follows_memory_budget(self):
+        """Test that the tiled overlay is chosen when the estimate exceeds the budget"""
+        with patch.dict(sys.modules, {'pyautogui': None}):
+            from capture_tool import ScreenCaptureTool
+        
+        tool = ScreenCaptureTool.__new__(ScreenCaptureTool)
+        tool.total_width, tool.total_height = 7680, 4320
+        tool.per_monitor = False
+        tool.settings = {'large_desktop_mode': 'auto', 'memory_budget_mb': 1024}
+        self.assertFalse(tool.use_large_desktop_mode())
+        tool.settings['memory_budget_mb'] = 256
+        self.assertTrue(tool.use_large_desktop_mode())
+        self.assertFalse(tool.use_mapped_frames())
+        # Even tiled, 8K needs more than 200 MB: its frame is memory-mapped
+        tool.settings['memory_budget_mb'] = 200
+        self.assertTrue(tool.use_mapped_frames())
+        tool.settings['memory_budget_mb'] = 300
+        self.assertFalse(tool.use_mapped_frames())
+        tool.settings['large_desktop_mode'] = 'off'
+        self.assertFalse(tool.use_large_desktop_mode())
+    
+    def test_per_monitor_overlays_when_monitors_leave_gaps(self):
+        """Test that 'auto' picks per-monitor windows only when the bounding box has unused area"""
+        with patch.dict(sys.modules, {'pyautogui': None}):
+            from capture_tool import ScreenCaptureTool
+        
+        def monitor(left, top, width, height):
+            return {'left': left, 'top': top, 'width': width, 'height': height}
+        
+        tool = ScreenCaptureTool.__new__(ScreenCaptureTool)
+        tool.settings = {'overlay_layout': 'auto'}
+        # Side by side with equal heights: no gaps
+        tool.monitors = [monitor(0, 0, 3840, 1080), monitor(0, 0, 1920, 1080), monitor(1920, 0, 1920, 1080)]
+        tool.total_width, tool.total_height = 3840, 1080
+        self.assertFalse(tool.use_per_monitor_overlays())
+        # A 4K monitor next to a 1080p one leaves a gap below the smaller one
+        tool.monitors = [monitor(0, 0, 5760, 2160), monitor(0, 0, 3840, 2160), monitor(3840, 0, 1920, 1080)]
+        tool.total_width, tool.total_height = 5760, 2160
+        self.assertTrue(tool.use_per_monitor_overlays())
+        tool.per_monitor = True
+        self.assertEqual(tool.estimate_overlay_bytes(), (3840 * 2160 + 1920 * 1080) * 11)
+        tool.settings['overlay_layout'] = 'virtual'
+        self.assertFalse(tool.use_per_monitor_overlays())
+
+
+class TestCaptureSession(unittest.TestCase):
+    """Test cases for the shared capture session"""
+    
+    def test_instance_reused_per_thread_and_closed(self):
+        """Test that each thread gets one mss instance and close() releases all"""
+        import threading
+        from capture_session import CaptureSession
+        
+        with patch('backends.MssBackend.open', side_effect=lambda **options: MagicMock()) as mock_mss:
+            session = CaptureSession()
+            session.grab({'left': 0, 'top': 0, 'width': 1, 'height': 1})
+            session.grab({'left': 0, 'top': 0, 'width': 1, 'height': 1})
+            self.assertEqual(mock_mss.call_count, 1)
+            
+            worker = threading.Thread(target=lambda: session.monitors)
+            worker.start()
+            worker.join()
+            self.assertEqual(mock_mss.call_count, 2)
+            
+            # Re-querying the layout keeps the connection
+            session.refresh_monitors()
+            self.assertEqual(mock_mss.call_count, 2)
+            session._get_sct().requery_monitors.assert_called_once()
+            
+            instances = list(session._instances.values())
+            session.close()
+            for sct in instances:
+                sct.close.assert_called_once()
+            self.assertRaises(RuntimeError, session.grab, {})
+
+    def test_synthetic_backend_is_deterministic_in_every_format(self):
+        """Test that synthetic grabs agree across regions, pixel formats and frame stores"""
+        import frame
+        from capture_session import CaptureSession
+    
+        with CaptureSession('synthetic', layout="300x200+0+0,300x100+300+0") as session:
+            self.assertEqual(session.monitors[0], {'left': 0, 'top': 0, 'width': 600, 'height': 200})
+            full = frame.frame_to_image(session.grab_monitor(0))
+            region = {'left': 250, 'top': 50, 'width': 100, 'height': 80}
+            bgra = session.grab(region)
+            rgb = session.grab(region, 'RGB')
+            self.assertEqual(rgb.pixel_format, 'RGB')
+            expected = full.crop((250, 50, 350, 130)).tobytes()
+            self.assertEqual(frame.frame_to_image(bgra).tobytes(), expected)
+            self.assertEqual(frame.FrameStore(rgb).crop((0, 0, 100, 80)).tobytes(), expected)
+            self.assertEqual(frame.FrameStore(bgra).getpixel((60, 70)), frame.FrameStore(rgb).getpixel((60, 70)))
+            # Below the short second monitor nothing is covered
+            self.assertEqual(full.getpixel((450, 150)), (0, 0, 0))
+        self.assertRaises(ValueError, CaptureSession, 'no-such-backend')
+
+
+class TestFrameDecoding(unittest.TestCase):
+    """Test cases for decoding raw BGRA frames"""
+    
+    def test_frame_to_image_matches_rgb_conversion(self):
+        """Test that the BGRX decoder produces the same pixels as mss's rgb"""
+        from PIL import Image
+        from mss.screenshot import ScreenShot
+        import frame
+        
+        data = bytearray(range(256)) * 3  # 16 x 12 pixels of BGRA
+        shot = ScreenShot.from_size(data, 16, 12)
+        expected = Image.frombytes("RGB", shot.size, shot.rgb)
+        
+        self.assertEqual(frame.frame_to_image(shot).tobytes(), expected.tobytes())
+    
+    def test_make_thumbnail(self):
+        """Test that thumbnails shrink to fit and small images are left alone"""
+        from PIL import Image
+        import frame
+        
+        big = Image.new("RGB", (1200, 400))
+        small = Image.new("RGB", (100, 50))
+        
+        self.assertEqual(frame.make_thumbnail(big, (600, 400)).size, (600, 200))
+        self.assertIs(frame.make_thumbnail(small, (600, 400)), small)
+    
+    def test_frame_store_decodes_only_requested_region(self):
+        """Test that FrameStore crops match a fully decoded frame, in memory and mmapped"""
+        from mss.screenshot import ScreenShot
+        import frame
+        
+        shot = ScreenShot.from_size(bytearray(os.urandom(64 * 32 * 4)), 64, 32)
+        full = frame.frame_to_image(shot)
+        for use_mmap in (False, True):
+            store = frame.FrameStore(shot, use_mmap=use_mmap)
+            self.assertEqual(store.crop((5, 7, 40, 30)).tobytes(), full.crop((5, 7, 40, 30)).tobytes())
+            self.assertEqual(store.getpixel((10, 3)), full.getpixel((10, 3)))
+            self.assertEqual(store.crop((60, 30, 90, 50)).size, (4, 2))
+            store.release()
+
+    def test_stitched_frame_crosses_monitors(self):
+        """Test that per-monitor frames crop as one desktop with black gaps"""
+        from PIL import Image
+        import frame
+
+        # L-shaped layout: 40x30 at the origin and 20x10 below-right of it
+        left = Image.new("RGB", (40, 30), (255, 0, 0))
+        right = Image.new("RGB", (20, 10), (0, 0, 255))
+        stitched = frame.StitchedFrame([((0, 0), left), ((40, 20), right)], (60, 30))
+
+        img = stitched.crop((30, 15, 50, 30))
+        self.assertEqual(img.size, (20, 15))
+        self.assertEqual(img.getpixel((0, 0)), (255, 0, 0))
+        self.assertEqual(img.getpixel((15, 10)), (0, 0, 255))
+        self.assertEqual(img.getpixel((15, 0)), (0, 0, 0))
+        self.assertEqual(stitched.getpixel((45, 25)), (0, 0, 255))
+        self.assertEqual(stitched.getpixel((45, 5)), (0, 0, 0))
+
+    def test_progressive_upload_decodes_the_grabbed_buffer(self):
+        """Test that the strip-wise background upload ends with the same image as a direct decode"""
+        from mss.screenshot import ScreenShot
+        import frame
+        import overlay
+
+        monitor = {'left': 0, 'top': 0, 'width': 50, 'height': 300}
+        shot = ScreenShot(bytearray(os.urandom(50 * 300 * 4)), monitor)
+        ov = overlay.MonitorOverlay.__new__(overlay.MonitorOverlay)
+        ov.width, ov.height = 50, 300
+        ov.settings, ov.tiles, ov.bg_img_id = {}, None, 1
+        ov.canvas, ov.renderer = MagicMock(), MagicMock()
+        ov.image = frame.FrameStore(shot)
+
+        with patch('overlay.tk.PhotoImage'), patch('overlay.ImageTk.PhotoImage'):
+            steps = ov.upload_background()
+            next(steps)
+            # Mid-upload the raw buffer still serves captures
+            self.assertIsInstance(ov.image, frame.FrameStore)
+            remaining = sum(1 for _ in steps)
+
+        self.assertEqual(remaining + 1, -(-300 // overlay.MonitorOverlay.STRIP_ROWS))
+        self.assertEqual(ov.image.tobytes(), frame.frame_to_image(shot).tobytes())
+        ov.renderer.set_background.assert_called_once()
+
+
+def make_fake_session():
+    """Capture session stand-in that returns black frames for a 200x100 monitor"""
+    from mss.screenshot import ScreenShot
+    session = MagicMock()
+    session.monitors = [
+        {'left': 0, 'top': 0, 'width': 200, 'height': 100},
+        {'left': 0, 'top': 0, 'width': 200, 'height': 100},
+    ]
+    session.grab.side_effect = lambda m: ScreenShot(bytearray(m['width'] * m['height'] * 4), m)
+    return session
+
+
+class TestDesktopGrab(unittest.TestCase):
+    """Test cases for parallel per-monitor desktop grabs"""
+    
+    def test_parallel_grab_matches_single_grab(self):
+        """Test that stitched per-monitor grabs equal one bounding-box grab"""
+        from mss.screenshot import ScreenShot
+        import desktop_grab
+        
+        # L-shaped layout on a 60x30 desktop; the area right of monitor 1 and below monitor 2 is unused
+        screen = bytearray(os.urandom(60 * 30 * 4))
+        monitors = [
+            {'left': 0, 'top': 0, 'width': 60, 'height': 30},
+            {'left': 0, 'top': 0, 'width': 40, 'height': 30},
+            {'left': 40, 'top': 0, 'width': 20, 'height': 10},
+        ]
+        
+        def grab(m):
+            rows = [screen[((m['top'] + y) * 60 + m['left']) * 4:((m['top'] + y) * 60 + m['left'] + m['width']) * 4]
+                    for y in range(m['height'])]
+            return ScreenShot(bytearray(b"".join(rows)), m)
+        
+        session = MagicMock()
+        session.monitors = monitors
+        session.grab.side_effect = grab
+        grabber = desktop_grab.DesktopGrabber(session)
+        try:
+            parallel = grabber.grab()
+            single = grabber.grab()
+            self.assertEqual((parallel.method, single.method), ('parallel', 'single'))
+            self.assertEqual(set(parallel.timestamps), {1, 2})
+            for y in range(30):
+                for x in (0, 39, 40, 59):
+                    offset = (y * 60 + x) * 4
+                    expected = single.raw[offset:offset + 4] if x < 40 or y < 10 else b"\0\0\0\0"
+                    self.assertEqual(bytes(parallel.raw[offset:offset + 4]), bytes(expected))
+            self.assertIn(grabber.choose_method(2), ('parallel', 'single'))
+            self.assertEqual(grabber.choose_method(1), 'single')
+        finally:
+            grabber.close()
+
+
+class TestMonitorTopology(unittest.TestCase):
+    """Test cases for the cached monitor topology"""
+    
+    def test_listeners_only_run_when_the_layout_changes(self):
+        """Test change detection, the on-disk cache and per-monitor placement"""
+        import tempfile
+        import topology
+        
+        def monitor(left, top, width, height):
+            return {'left': left, 'top': top, 'width': width, 'height': height}
+        
+        two_heads = [monitor(0, 0, 3840, 1080), monitor(0, 0, 1920, 1080), monitor(1920, 0, 1920, 1080)]
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = os.path.join(tmp, "topology.json")
+            session = MagicMock()
+            session.monitors = two_heads
+            session.refresh_monitors.return_value = two_heads
+            
+            topo = topology.MonitorTopology(session, cache_path)
+            changes = []
+            topo.add_listener(changes.append)
+            self.assertFalse(topo.changed_since_last_run)
+            self.assertFalse(topo.refresh())
+            self.assertEqual(changes, [])
+            
+            # Second monitor switched to 4K
+            session.refresh_monitors.return_value = [
+                monitor(0, 0, 5760, 2160), monitor(0, 0, 1920, 1080), monitor(1920, 0, 3840, 2160),
+            ]
+            self.assertTrue(topo.refresh())
+            self.assertEqual(changes, [topo])
+            self.assertEqual(len(set(topo.ids)), 3)
+            
+            # The next launch still sees two heads: the cache shows the layout changed
+            self.assertTrue(topology.MonitorTopology(session, cache_path).changed_since_last_run)
+            
+            # A launch from the cache starts without asking the display, then verifies in the background
+            four_k = session.refresh_monitors.return_value
+            session.monitors = four_k
+            launched = topology.MonitorTopology(session, cache_path, use_cache=True)
+            self.assertEqual(launched.signature, topology.layout_signature(two_heads))
+            launched.add_listener(changes.append)
+            launched.start_check()
+            self.assertTrue(launched.verify())
+            self.assertEqual((changes[-1], launched.signature), (launched, topology.layout_signature(four_k)))
+            self.assertFalse(launched.verify())
+            
+            # A resident overlay re-checks the layout it was hidden with
+            launched.invalidate()
+            self.assertFalse(launched.verified)
+            self.assertFalse(launched.verify())
+            self.assertTrue(launched.verified)
+        
+        # A toolbar near the right edge of monitor 1 stays on monitor 1
+        self.assertEqual(topology.monitor_at(two_heads, 1900, 500), two_heads[1])
+        self.assertEqual(topology.clamp_to_monitor(1700, 1060, 460, 40, two_heads[1]), (1460, 1040))
+        self.assertEqual(topology.monitor_at(two_heads, 5000, -20), two_heads[2])
+
+
+class TestHeadlessCapture(unittest.TestCase):
+    """Test cases for the headless capture command"""
+    
+    def test_cli_does_not_import_tkinter(self):
+        """Test that the headless entry point never pulls in tkinter"""
+        import subprocess
+        code = "import sys, cli; sys.exit('tkinter' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0)
+    
+    def test_regions_file_uses_single_grab(self):
+        """Test that a regions file is captured from one grab"""
+        import tempfile
+        import cli
+        import config
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            regions_file = os.path.join(tmp, "regions.txt")
+            with open(regions_file, "w") as f:
+                f.write("# x,y,w,h [output]\n")
+                f.write("0,0,10,10\n")
+                f.write(f"50,20,30,40 {os.path.join(tmp, 'named.png')}\n")
+            
+            session = make_fake_session()
+            args = cli.build_parser().parse_args(["--regions-file", regions_file, "-o", tmp + os.sep])
+            written = cli.run_capture(args, dict(config.DEFAULT_SETTINGS), session)
+            
+            self.assertEqual(session.grab.call_count, 1)
+            self.assertEqual(session.grab.call_args[0][0], {'top': 0, 'left': 0, 'width': 80, 'height': 60})
+            self.assertEqual(len(written), 2)
+            self.assertEqual(written[1], os.path.join(tmp, 'named.png'))
+            for path in written:
+                self.assertTrue(os.path.exists(path))
+    
+    def test_parse_region_rejects_bad_input(self):
+        """Test region parsing"""
+        import argparse
+        import cli
+        
+        self.assertEqual(cli.parse_region("1,2,3,4"), (1, 2, 3, 4))
+        self.assertRaises(argparse.ArgumentTypeError, cli.parse_region, "1,2,3")
+        self.assertRaises(argparse.ArgumentTypeError, cli.parse_region, "1,2,0,4")
+
+
+class TestCaptureDaemon(unittest.TestCase):
+    """Test cases for the daemon's trigger socket"""
+    
+    @unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "needs Unix-domain sockets")
+    def test_trigger_commands_are_queued_for_tk(self):
+        """Test that socket commands are acknowledged and queued for the Tk loop"""
+        import tempfile
+        import daemon
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            capture_daemon = daemon.CaptureDaemon(os.path.join(tmp, "test.sock"))
+            capture_daemon.start_listener()
+            try:
+                self.assertEqual(daemon.send_command(capture_daemon.socket_path, {"cmd": "ping"}), {"ok": True})
+                self.assertEqual(daemon.send_command(capture_daemon.socket_path, {"cmd": "show"}), {"ok": True})
+                self.assertFalse(daemon.send_command(capture_daemon.socket_path, {"cmd": "bogus"})["ok"])
+                self.assertRaises(RuntimeError, daemon.prepare_socket_path, capture_daemon.socket_path)
+            finally:
+                capture_daemon.stop()
+            
+            self.assertEqual(capture_daemon.commands.get_nowait(), "show")
+            self.assertTrue(capture_daemon.commands.empty())
+            self.assertFalse(os.path.exists(capture_daemon.socket_path))
+
+
+class TestCaptureServer(unittest.TestCase):
+    """Test cases for the local capture API"""
+    
+    @unittest.skipUnless(hasattr(__import__('socket'), 'AF_UNIX'), "needs Unix-domain sockets")
+    def test_png_raw_and_error_responses(self):
+        """Test that requests are served concurrently with latency reported"""
+        import io
+        import tempfile
+        import threading
+        from PIL import Image
+        import capture_server
+        
+        session = make_fake_session()
+        service = capture_server.CaptureService(session, workers=2)
+        with tempfile.TemporaryDirectory() as tmp:
+            server = capture_server.CaptureServer(os.path.join(tmp, "capture.sock"), service)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                def client_requests(results):
+                    with capture_server.CaptureClient(server.socket_path) as client:
+                        results.append(client.request(id=1, region=[10, 10, 20, 5]))
+                        results.append(client.request(target="monitor", monitor=1, output="raw"))
+                        results.append(client.request(target="monitor", monitor=7))
+                
+                results = [[], []]
+                clients = [threading.Thread(target=client_requests, args=(r,)) for r in results]
+                for t in clients:
+                    t.start()
+                for t in clients:
+                    t.join()
+            finally:
+                server.shutdown()
+                server.server_close()
+                service.close()
+        
+        for (png, png_data), (raw, raw_data), (error, error_data) in results:
+            self.assertTrue(png["ok"])
+            self.assertEqual(png["id"], 1)
+            self.assertEqual(Image.open(io.BytesIO(png_data)).size, (20, 5))
+            self.assertIn("total", png["latency_ms"])
+            self.assertEqual((raw["format"], len(raw_data)), ("BGRA", 200 * 100 * 4))
+            self.assertFalse(error["ok"])
+            self.assertIsNone(error_data)
+        self.assertEqual((service.requests_served, service.requests_failed), (4, 2))
+
+    def test_raw_captures_are_indexed_with_their_hash(self):
+        """Test that a raw capture, never decoded for its reply, is still hashed by the index"""
+        import tempfile
+        import capture_index
+        import capture_server
+        import capture_store
+        import frame
+        
+        session = make_fake_session()
+        with tempfile.TemporaryDirectory() as tmp:
+            with capture_index.CaptureIndex(os.path.join(tmp, "captures.db")) as index:
+                service = capture_server.CaptureService(session, workers=1, index=index)
+                try:
+                    header, _ = service.handle({"target": "monitor", "monitor": 1, "output": "raw"}, 0)
+                finally:
+                    service.close()
+                digest = capture_store.pixel_digest(frame.frame_to_image(session.grab(session.monitors[1])))
+                self.assertEqual([row['uid'] for row in index.query(digest=digest)], [header["capture"]])
+
+
+class TestSavePipeline(unittest.TestCase):
+    """Test cases for saving captures on background threads"""
+    
+    def test_backpressure_callbacks_and_flush(self):
+        """Test that a full queue pushes back and close() writes everything queued"""
+        import queue
+        import tempfile
+        import threading
+        from PIL import Image
+        import capture
+        import save_pipeline
+        
+        release = threading.Event()
+        real_save = capture.save_image
+        
+        def slow_save(img, filename, image_format, **options):
+            release.wait(5)
+            return real_save(img, filename, image_format, **options)
+        
+        done = []
+        img = Image.new("RGB", (32, 16), (0, 128, 255))
+        with tempfile.TemporaryDirectory() as tmp, patch('capture.save_image', side_effect=slow_save):
+            pipeline = save_pipeline.SavePipeline(workers=1, max_pending=1)
+            first = pipeline.submit(img, os.path.join(tmp, "a.png"), on_done=done.append)
+            # One job is being encoded and one waits in the queue; a third is refused
+            for _ in range(100):
+                if first.state == 'encoding':
+                    break
+                threading.Event().wait(0.01)
+            pipeline.submit(img, os.path.join(tmp, "missing", "b.png"), on_done=done.append)
+            self.assertRaises(queue.Full, pipeline.submit, img, os.path.join(tmp, "c.png"), block=False)
+            self.assertEqual(pipeline.pending, 2)
+            self.assertEqual(done, [])
+            
+            release.set()
+            self.assertTrue(pipeline.close(timeout=5))
+            self.assertEqual([job.ok for job in done], [True, False])
+            self.assertEqual(Image.open(done[0].path).size, (32, 16))
+            self.assertIsInstance(done[1].error, OSError)
+            self.assertEqual(pipeline.get_stats(), {'queued': 0, 'active': 0, 'done': 1, 'failed': 1})
+            self.assertRaises(RuntimeError, pipeline.submit, img, os.path.join(tmp, "d.png"))
+
+    def test_store_backed_pngs_carry_their_record(self):
+        """Test that a capture saved through the capture store is tagged like a plain save"""
+        import tempfile
+        from PIL import Image
+        import capture_index
+        import capture_store
+        import save_pipeline
+        
+        img = Image.new("RGB", (32, 16), (0, 128, 255))
+        record = {'uid': "abc", 'time': 1.0, 'source': 'save', 'x': 0, 'y': 0, 'width': 32, 'height': 16}
+        with tempfile.TemporaryDirectory() as tmp:
+            store = capture_store.CaptureStore(os.path.join(tmp, "store"))
+            pipeline = save_pipeline.SavePipeline(workers=1, store=store)
+            job = pipeline.submit(img, os.path.join(tmp, "a.png"), record=record)
+            self.assertTrue(pipeline.close(timeout=5))
+            self.assertTrue(job.ok)
+            self.assertEqual(capture_index.read_png_record(job.path)['uid'], "abc")
+
+
+class TestEncodeCache(unittest.TestCase):
+    """Test cases for encoding each capture at most once"""
+    
+    def test_copy_then_save_encodes_once(self):
+        """Test that clipboard, prefetch and save share one PNG encode"""
+        import tempfile
+        from PIL import Image
+        import clipboard
+        import encode_cache
+        import save_pipeline
+        
+        img = Image.new("RGB", (64, 48), (10, 20, 30))
+        cache = encode_cache.EncodeCache()
+        root = MagicMock()
+        with patch('clipboard._win32', return_value=None):
+            prefetched = cache.prefetch(img, 'PNG')
+            self.assertTrue(clipboard.copy_image_to_clipboard(img, root, cache.get))
+            self.assertTrue(clipboard.copy_image_to_clipboard(img, root, cache.get))
+        self.assertEqual(root.clipboard_append.call_args[0][0], prefetched.result())
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            with save_pipeline.SavePipeline(workers=1, encode_cache=cache) as pipeline:
+                job = pipeline.submit(img, os.path.join(tmp, "shot"))
+            self.assertEqual(job.path, os.path.join(tmp, "shot.png"))
+            with open(job.path, 'rb') as f:
+                self.assertEqual(f.read(), prefetched.result())
+        
+        self.assertEqual(cache.get_stats()['encodes'], 1)
+        cache.get(img, 'PNG', compress_level=1)
+        self.assertEqual(cache.get_stats()['encodes'], 2)
+        cache.evict(img)
+        self.assertEqual(cache.get_stats()['entries'], 0)
+        cache.close()
+
+
+@unittest.skipUnless(importlib.util.find_spec("Xlib"), "needs python-xlib")
+class TestX11Clipboard(unittest.TestCase):
+    """Test cases for the lazy X11 clipboard owner"""
+    
+    def test_paste_encodes_only_the_requested_target(self):
+        """Test TARGETS, on-demand encoding and INCR transfers without an X server"""
+        from types import SimpleNamespace
+        from PIL import Image
+        from Xlib import X
+        import x11_clipboard
+        
+        owner = x11_clipboard.X11ClipboardOwner.__new__(x11_clipboard.X11ClipboardOwner)
+        names = ['CLIPBOARD', 'TARGETS', 'TIMESTAMP', 'INCR', 'ATOM', 'INTEGER', *x11_clipboard.IMAGE_TARGETS]
+        owner.X = X
+        owner.atoms = {name: 100 + i for i, name in enumerate(names)}
+        owner.selection = owner.atoms['CLIPBOARD']
+        owner.target_formats = {owner.atoms[n]: f for n, f in x11_clipboard.IMAGE_TARGETS.items()}
+        owner.max_chunk = 1000
+        owner.owner_time = 42
+        owner.transfers = {}
+        encode = MagicMock(side_effect=lambda img, fmt: fmt.encode() * (700 if fmt == 'JPEG' else 200))
+        owner.image, owner.encode, owner.encoded = Image.new("RGB", (4, 4)), encode, {}
+        
+        requestor = MagicMock(id=7)
+        def paste(target, prop=500):
+            requestor.reset_mock()
+            owner._handle(SimpleNamespace(
+                type=X.SelectionRequest, requestor=requestor, selection=owner.selection,
+                target=owner.atoms[target], property=prop, time=1
+            ))
+            return requestor.send_event.call_args[0][0]
+        
+        with patch('Xlib.protocol.event.SelectionNotify', side_effect=SimpleNamespace):
+            notify = paste('TARGETS')
+            self.assertEqual(notify.property, 500)
+            advertised = requestor.change_property.call_args[0][3]
+            self.assertEqual(set(advertised) - set(owner.target_formats), {owner.atoms['TARGETS'], owner.atoms['TIMESTAMP']})
+            encode.assert_not_called()
+            
+            # BMP fits in one property write; only that format is encoded, and only once
+            paste('image/bmp')
+            paste('image/bmp')
+            self.assertEqual(encode.call_count, 1)
+            self.assertEqual(requestor.change_property.call_args[0][3], b"BMP" * 200)
+            
+            # JPEG is larger than a chunk and goes out incrementally as the requestor deletes the property
+            notify = paste('image/jpeg', prop=X.NONE)
+            self.assertEqual(notify.property, owner.atoms['image/jpeg'])
+            self.assertEqual(requestor.change_property.call_args[0][1:], (owner.atoms['INCR'], 32, [2800]))
+            received = []
+            for _ in range(4):
+                requestor.reset_mock()
+                owner._handle(SimpleNamespace(
+                    type=X.PropertyNotify, state=X.PropertyDelete, window=requestor, atom=owner.atoms['image/jpeg']
+                ))
+                received.append(requestor.change_property.call_args[0][3])
+            self.assertEqual(b"".join(received), b"JPEG" * 700)
+            self.assertEqual(received[-1], b"")
+            self.assertEqual(owner.transfers, {})
+            self.assertEqual([c[0][1] for c in encode.call_args_list], ['BMP', 'JPEG'])
+
+
+class TestExport(unittest.TestCase):
+    """Test cases for content-aware output format selection"""
+    
+    def test_auto_format_follows_content_and_policy(self):
+        """Test that flat captures become exact PNG8 and noisy ones WebP or JPEG"""
+        import io
+        import tempfile
+        from PIL import Image, ImageDraw
+        import export
+        
+        flat = Image.new("RGB", (320, 200), (236, 236, 236))
+        draw = ImageDraw.Draw(flat)
+        for i in range(12):
+            draw.rectangle((10 + 25 * i, 20, 30 + 25 * i, 180), fill=(20 * i, 120, 215))
+        gradient = Image.linear_gradient("L").resize((320, 200))
+        noisy = Image.merge("RGB", (gradient, gradient.rotate(90), Image.effect_noise((320, 200), 20)))
+        
+        self.assertEqual(export.analyze(flat).kind, 'palette')
+        self.assertEqual(export.analyze(noisy).kind, 'photo')
+        
+        # Lossless policy never changes a pixel
+        for img, expected in ((flat, 'PNG8'), (noisy, 'WEBP lossless')):
+            data, plan = export.encode(img, 'auto', 'lossless')
+            self.assertEqual(plan.label, expected)
+            self.assertEqual(Image.open(io.BytesIO(data)).convert("RGB").tobytes(), img.tobytes())
+        self.assertEqual(export.plan_export(noisy, 'auto', 'small').label, 'JPEG q80')
+        if 'QOI' in export.EXPORT_FORMATS:
+            self.assertEqual(export.plan_export(noisy, 'qoi').image_format, 'QOI')
+        else:
+            # Pillow before 11.0 cannot write QOI
+            self.assertRaises(ValueError, export.plan_export, noisy, 'qoi')
+        with self.assertRaises(ValueError):
+            export.plan_export(noisy, 'auto', 'tiny')
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path, plan = export.save(noisy, os.path.join(tmp, "shot.png"), 'auto', 'balanced')
+            self.assertEqual(path, os.path.join(tmp, "shot.jpg"))
+            self.assertEqual(Image.open(path).format, 'JPEG')
+
+
+class TestPngWriter(unittest.TestCase):
+    """Test cases for the parallel PNG writer"""
+    
+    def test_strips_join_into_a_standard_png(self):
+        """Test that strips deflated on several threads decode to the original pixels"""
+        import io
+        import struct
+        import zlib
+        from PIL import Image
+        import export
+        import png_writer
+        
+        gradient = Image.linear_gradient("L").resize((300, 257))
+        rgb = Image.merge("RGB", (gradient, gradient.rotate(90), Image.effect_noise((300, 257), 30)))
+        for img in (rgb, rgb.convert("RGBA"), rgb.convert("L"), export.palettize(rgb)):
+            # Tiny strips so the image is split many times, with a primed window on each
+            data = png_writer.encode_png(img, 6, workers=3, strip_bytes=4096)
+            decoded = Image.open(io.BytesIO(data))
+            self.assertEqual(decoded.mode, img.mode)
+            self.assertEqual(decoded.tobytes(), img.tobytes())
+            
+            # One valid zlib stream across all IDAT chunks (zlib checks the combined Adler-32)
+            pos, idat = 8, b""
+            while pos < len(data):
+                length, tag = struct.unpack(">I4s", data[pos:pos + 8])
+                if tag == b'IDAT':
+                    idat += data[pos + 8:pos + 8 + length]
+                pos += length + 12
+            self.assertGreater(len(zlib.decompress(idat)), 0)
+        
+        self.assertFalse(png_writer.wanted(rgb, {}))
+        self.assertFalse(png_writer.supported(rgb.convert("I")))
+
+
+class TestOutputWriter(unittest.TestCase):
+    """Test cases for atomic, collision-free output files"""
+    
+    def test_burst_gets_unique_ordered_names(self):
+        """Test that a burst of writes in one millisecond neither collides nor leaves temp files"""
+        import tempfile
+        import output_writer
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = output_writer.OutputWriter(tmp, "shot", sharding='day', fsync='none')
+            # Another process already holds the first name of this millisecond
+            with patch('time.time_ns', return_value=1760000000123 * 1000000):
+                taken = writer.next_path(".png")
+                writer.last_ms = 0
+                with open(taken, "wb") as f:
+                    f.write(b"theirs")
+                paths = [writer.write(b"%d" % i, ".png") for i in range(50)]
+            
+            self.assertEqual(len(set(paths)), 50)
+            self.assertEqual(paths, sorted(paths))
+            self.assertNotIn(taken, paths)
+            self.assertEqual(writer.get_stats(), {'written': 50, 'collisions': 1})
+            with open(taken, "rb") as f:
+                self.assertEqual(f.read(), b"theirs")
+            shard = os.path.dirname(taken)
+            self.assertEqual(os.path.relpath(shard, tmp).count(os.sep), 2)
+            
+            # A failed write publishes nothing and removes its temp file
+            def fail(f):
+                f.write(b"partial")
+                raise IOError("disk full")
+            self.assertRaises(IOError, writer.write_with, fail, ".png")
+            self.assertEqual(len(os.listdir(shard)), 51)
+            
+            # Explicit names are replaced atomically
+            target = os.path.join(tmp, "named.png")
+            output_writer.atomic_write(target, b"one")
+            output_writer.atomic_write(target, b"two", fsync='full')
+            with open(target, "rb") as f:
+                self.assertEqual(f.read(), b"two")
+
+
+class TestCaptureStore(unittest.TestCase):
+    """Test cases for the content-addressed capture store"""
+    
+    def test_duplicates_are_linked_without_encoding(self):
+        """Test that identical pixels are encoded once and exposed under every name"""
+        import tempfile
+        from PIL import Image
+        import capture
+        import capture_store
+        import output_writer
+        import save_pipeline
+        
+        idle = Image.new("RGB", (40, 30), (12, 34, 56))
+        changed = idle.copy()
+        changed.putpixel((5, 5), (255, 0, 0))
+        with tempfile.TemporaryDirectory() as tmp:
+            store = capture_store.CaptureStore(os.path.join(tmp, "store"), fsync='none')
+            writer = output_writer.OutputWriter(tmp, "shot", sharding='none', fsync='none')
+            encode = MagicMock(side_effect=capture.encode_image)
+            with patch('capture.encode_image', encode):
+                with save_pipeline.SavePipeline(workers=1, writer=writer, store=store) as pipeline:
+                    jobs = [pipeline.submit(img, None, 'PNG') for img in (idle, idle.copy(), changed)]
+                    jobs.append(pipeline.submit(idle, os.path.join(tmp, "named"), 'PNG'))
+            
+            self.assertTrue(all(job.ok for job in jobs))
+            self.assertEqual([job.duplicate for job in jobs], [False, True, False, True])
+            self.assertEqual(encode.call_count, 2)
+            self.assertEqual(jobs[3].path, os.path.join(tmp, "named.png"))
+            self.assertTrue(os.path.samefile(jobs[0].path, jobs[1].path))
+            self.assertTrue(os.path.samefile(jobs[0].path, jobs[3].path))
+            self.assertEqual(Image.open(jobs[1].path).tobytes(), idle.tobytes())
+            
+            stats = store.get_stats()
+            self.assertEqual((stats['captures'], stats['duplicates'], stats['objects']), (4, 2, 2))
+            self.assertEqual(stats['bytes_saved'], 2 * os.path.getsize(jobs[0].path))
+            # A fresh store reads the same history back from its logs
+            reopened = capture_store.CaptureStore(os.path.join(tmp, "store"), links='manifest')
+            self.assertEqual(reopened.get_stats(), stats)
+            name = os.path.join(tmp, "auto.png")
+            with patch.object(writer, 'next_path', return_value=name):
+                path, duplicate = reopened.save(changed, None, 'PNG', writer=writer)
+            self.assertTrue(duplicate)
+            self.assertFalse(os.path.exists(name))
+            self.assertEqual(reopened.resolve(name), path)
+            # A name the user picked is always written, even without hard links
+            path, _ = reopened.save(changed, os.path.join(tmp, "elsewhere.png"), 'PNG')
+            self.assertEqual(Image.open(path).tobytes(), changed.tobytes())
+
+
+class TestHistoryStore(unittest.TestCase):
+    """Test cases for the delta-compressed capture history"""
+    
+    def test_deltas_rebuild_exactly_and_compaction_bounds_chains(self):
+        """Test that frames round-trip through keyframes, deltas and compaction"""
+        import tempfile
+        from PIL import Image, ImageDraw
+        import history_store
+        
+        img = Image.effect_noise((200, 150), 40).convert("RGB")
+        captures = []
+        for i in range(8):
+            img = img.copy()
+            ImageDraw.Draw(img).rectangle((i * 20, 10, i * 20 + 5, 15), fill=(255, 0, 0))
+            captures.append(img)
+        # The whole screen changes: a new keyframe
+        captures.append(Image.effect_noise((200, 150), 60).convert("RGB"))
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            with history_store.HistoryStore(tmp, keyframe_interval=2, max_chain=8, fsync='none') as store:
+                ids = [store.add(capture, (0, 0, 200, 150)) for capture in captures]
+                self.assertEqual([store.depth(frame_id) for frame_id in ids], [0, 1, 2, 3, 4, 5, 6, 7, 0])
+                self.assertLess(store.frames[ids[1]]['bytes'], store.frames[ids[0]]['bytes'] / 4)
+                self.assertTrue(store.compact_wanted.is_set())
+            
+            # A fresh store decodes from the files alone, before and after compaction
+            for compact in (False, True):
+                store = history_store.HistoryStore(tmp, keyframe_interval=2, max_chain=8)
+                if compact:
+                    self.assertEqual(store.compact(), 2)
+                    self.assertLessEqual(store.get_stats()['longest_chain'], 2)
+                    store = history_store.HistoryStore(tmp)
+                for frame_id, capture in reversed(list(zip(ids, captures))):
+                    self.assertEqual(store.get(frame_id).tobytes(), capture.tobytes())
+            
+            # Decoded frames are kept for the most recently used regions only
+            with patch('history_store.CACHED_REGIONS', 2):
+                for region in ("a", "b", "a", "c"):
+                    store.add(img, region)
+            self.assertEqual(list(store.latest), ["a", "c"])
+
+
+class TestCaptureIndex(unittest.TestCase):
+    """Test cases for the SQLite capture index"""
+    
+    def test_headless_captures_are_queryable_and_survive_moves(self):
+        """Test that captures are indexed, queried by every key and found again after a move"""
+        import tempfile
+        from PIL import Image
+        import capture_index
+        import capture_store
+        import cli
+        import config
+        import topology
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "out")
+            regions_file = os.path.join(tmp, "regions.txt")
+            with open(regions_file, "w") as f:
+                f.write("0,0,10,10\n50,20,30,40\n")
+            db = os.path.join(tmp, "captures.db")
+            index = capture_index.CaptureIndex(db)
+            session = make_fake_session()
+            args = cli.build_parser().parse_args(["--regions-file", regions_file, "-o", out + os.sep])
+            written = cli.run_capture(args, dict(config.DEFAULT_SETTINGS), session, index)
+            uid = index.record(None, 'copy', time=1000.0, x=150, y=50, width=10, height=10, monitor="HDMI-1", clipboard=True)
+            # A file gone before its update is written loses nothing else in the batch
+            index.update(uid, path=os.path.join(tmp, "gone.png"))
+            
+            rows = index.query(region=(60, 30, 5, 5))
+            self.assertEqual([row['path'] for row in rows], [os.path.abspath(written[1])])
+            self.assertEqual((rows[0]['source'], rows[0]['format']), ('cli', 'PNG'))
+            self.assertEqual(rows[0]['monitor'], topology.monitor_id(session.monitors[1], 1))
+            self.assertEqual([row['monitor'] for row in index.query(until=2000.0)], ["HDMI-1"])
+            copied = index.query(monitor="HDMI-1", source='copy')[0]
+            self.assertEqual((copied['clipboard'], copied['path']), (1, os.path.join(tmp, "gone.png")))
+            with Image.open(written[0]) as img:
+                digest = capture_store.pixel_digest(img)
+                self.assertIn(capture_index.META_KEY, img.info)
+            self.assertEqual([row['path'] for row in index.query(digest=digest)], [os.path.abspath(written[0])])
+            self.assertEqual(len(index.query(since=2000.0)), 2)
+            index.close()
+            
+            # A moved file is re-attached to its row; a lost database is rebuilt from the files
+            moved = os.path.join(out, "moved.png")
+            os.rename(written[0], moved)
+            with capture_index.CaptureIndex(db) as index:
+                counts = index.rebuild([out])
+                self.assertEqual((counts['moved'], counts['unchanged'], counts['restored'], counts['missing']),
+                                 (1, 1, 0, 0))
+                self.assertEqual(index.query(region=(0, 0, 5, 5))[0]['path'], moved)
+            with capture_index.CaptureIndex(os.path.join(tmp, "rebuilt.db")) as index:
+                self.assertEqual(index.rebuild([out])['restored'], 2)
+                row = index.query(digest=digest)[0]
+                self.assertEqual((row['path'], row['x'], row['width'], row['source']), (moved, 0, 10, 'cli'))
+
+    def test_recording_a_capture_again_keeps_one_region(self):
+        """Test that a row written twice under one uid leaves no stale region behind"""
+        import tempfile
+        import capture_index
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            with capture_index.CaptureIndex(os.path.join(tmp, "captures.db")) as index:
+                conn = index._connection()
+                for x in (0, 500):
+                    with conn:
+                        index._insert(conn, {'uid': "a", 'time': 1.0, 'source': 'cli', 'x': x, 'y': 0,
+                                             'width': 10, 'height': 10})
+                self.assertEqual(index.query(region=(0, 0, 5, 5)), [])
+                self.assertEqual([row['x'] for row in index.query(region=(500, 0, 5, 5))], [500])
+                if index.rtree:
+                    self.assertEqual(conn.execute("SELECT COUNT(*) FROM capture_regions").fetchone()[0], 1)
+
+    def test_unavailable_index_drops_records_quietly(self):
+        """Test that without a database records are dropped once, not failed per batch"""
+        import io
+        import sqlite3
+        import capture_index
+        
+        index = capture_index.CaptureIndex(":memory:")
+        stderr = io.StringIO()
+        with patch.object(index, '_connection', side_effect=sqlite3.OperationalError("disk I/O error")), \
+                patch('sys.stderr', stderr):
+            index.record(None, 'copy', x=0, y=0, width=1, height=1)
+            self.assertTrue(index.flush(5))
+            index.record(None, 'copy', x=0, y=0, width=1, height=1)
+            index.close()
+        self.assertIn("unavailable", stderr.getvalue())
+        self.assertNotIn("write failed", stderr.getvalue())
+
+
+class TestSelectionRenderer(unittest.TestCase):
+    """Test cases for drawing the selection on an overlay canvas"""
+    
+    def test_drags_reuse_the_items_made_up_front(self):
+        """Test that dragging only moves existing items, clipped to the overlay's monitor"""
+        from PIL import Image
+        import overlay
+        
+        canvas = MagicMock()
+        canvas.create_image.return_value = "cutout"
+        bright = MagicMock()
+        bright.width.return_value, bright.height.return_value = 200, 100
+        with patch('overlay.tk.PhotoImage') as photo:
+            # The right-hand monitor of two, 200 pixels wide
+            renderer = overlay.SelectionRenderer(canvas, "bg", {}, origin=(200, 0))
+        renderer.set_background(Image.new("RGB", (200, 100)), bright, "dim")
+        renderer.begin()
+        canvas.itemconfig.assert_called_with("bg", image="dim")
+        for x in range(150, 260, 10):
+            renderer.update(150, 10, x, 60)
+        
+        canvas.create_image.assert_called_once()
+        self.assertEqual(photo.call_count, 1)
+        # Canvas x 150..250 is pixels 0..50 of this monitor
+        canvas.tk.call.assert_called_with(
+            str(photo.return_value), "copy", str(bright), "-from", 0, 10, 50, 60, "-to", 0, 0, "-shrink"
+        )
+        canvas.coords.assert_called_with("cutout", 200, 10)
+        renderer.end()
+        canvas.itemconfig.assert_called_with("bg", image=bright)
+        self.assertEqual(renderer.get_stats()['updates'], 11)
+        
+        # The stippled renderer moves its four shades instead
+        canvas = MagicMock()
+        canvas.create_rectangle.side_effect = ["top", "bottom", "left", "right"]
+        stipple = overlay.StippleSelectionRenderer(canvas, "bg", {})
+        stipple.set_background(Image.new("RGB", (200, 100)))
+        stipple.begin()
+        stipple.update(20, 10, 500, 60)
+        stipple.update(20, 10, 80, 60)
+        self.assertEqual(canvas.create_rectangle.call_count, 4)
+        canvas.coords.assert_any_call("right", 200, 10, 200, 60)
+        for call in (("top", 0, 0, 200, 10), ("bottom", 0, 60, 200, 100), ("left", 0, 10, 20, 60),
+                     ("right", 80, 10, 200, 60)):
+            canvas.coords.assert_any_call(*call)
+        self.assertEqual(canvas.coords.call_args, (("right", 80, 10, 200, 60),))
+
+
+class TestMagnifier(unittest.TestCase):
+    """Test cases for the magnifier's sampling and placement"""
+    
+    def test_samples_the_frozen_frame_and_stays_on_the_pointer_monitor(self):
+        """Test the source rectangle, the crop fallback and monitor-aware placement"""
+        from PIL import Image
+        import magnifier
+        
+        # Two 200x100 monitors side by side; every pixel's red/green is its position
+        frozen = Image.new("RGB", (400, 100))
+        frozen.putdata([(x % 256, y, x // 256) for y in range(100) for x in range(400)])
+        monitors = [{'left': 0, 'top': 0, 'width': 400, 'height': 100},
+                    {'left': 0, 'top': 0, 'width': 200, 'height': 100},
+                    {'left': 200, 'top': 0, 'width': 200, 'height': 100}]
+        settings = {'magnifier_size': 40, 'magnifier_zoom': 4}
+        with patch('magnifier.tk') as mock_tk, patch('magnifier.ImageTk') as mock_imagetk:
+            mag = magnifier.Magnifier(None, settings, 0, 0, 400, 100, None, None, frozen, monitors)
+            window = mock_tk.Toplevel.return_value
+            canvas = mock_tk.Canvas.return_value
+            
+            # No background photo: the 10x10 source rectangle is cropped and zoomed, clamped to the frame
+            mag.update_magnifier(398, 50)
+            sample = mock_imagetk.PhotoImage.call_args[0][0]
+            self.assertEqual(sample.size, (40, 40))
+            self.assertEqual(sample.getpixel((0, 0)), frozen.getpixel((390, 45)))
+            self.assertEqual(sample.getpixel((39, 39)), frozen.getpixel((399, 54)))
+            canvas.itemconfig.assert_called_with(mag.readout_id, text="398, 50  #8e3201")
+            # Flipped left and up, then kept on the right-hand monitor
+            window.geometry.assert_called_with("+338+0")
+            
+            mag.update_magnifier(150, 50)
+            self.assertEqual(mock_imagetk.PhotoImage.call_count, 1)
+            mag.live_photo.paste.assert_called_once()
+            window.geometry.assert_called_with("+90+0")
+            
+            # With a background photo Tk copies and zooms the same rectangle
+            mag.set_source("photo", frozen)
+            mag.update_magnifier(5, 5)
+            canvas.tk.call.assert_called_with(
+                str(mag.zoom_photo), "copy", "photo", "-from", 0, 0, 10, 10, "-to", 0, 0, "-zoom", 4
+            )
+            window.geometry.assert_called_with("+25+25")
+
+
+class TestRedrawScheduler(unittest.TestCase):
+    """Test cases for coalescing pointer redraws"""
+    
+    def test_events_coalesce_into_one_frame(self):
+        """Test that a burst of motion events renders once with the latest position"""
+        from overlay import RedrawScheduler
+        
+        widget = MagicMock()
+        scheduler = RedrawScheduler(widget, target_fps=60)
+        rendered = []
+        for x in range(10):
+            scheduler.post(lambda *pos: rendered.append(pos), x, x * 2)
+        
+        # Only the first post schedules a callback with the Tk loop
+        self.assertEqual(widget.after_idle.call_count + widget.after.call_count, 1)
+        scheduler.run_pending()
+        
+        self.assertEqual(rendered, [(9, 18)])
+        stats = scheduler.get_stats()
+        self.assertEqual((stats['events'], stats['frames'], stats['dropped']), (10, 1, 9))
+    
+    def test_interval_adapts_to_render_cost(self):
+        """Test that slow renders stretch the frame interval"""
+        import time
+        from overlay import RedrawScheduler
+        
+        scheduler = RedrawScheduler(MagicMock(), target_fps=1000)
+        for _ in range(5):
+            scheduler.post(time.sleep, 0.01)
+            scheduler.run_pending()
+        
+        self.assertGreater(scheduler.interval_ms, scheduler.min_interval_ms)
+        scheduler.post(time.sleep, 0)
+        scheduler.widget.after.assert_called()
+
+
+class TestStartup(unittest.TestCase):
+    """Test cases for fast, lazily importing startup"""
+    
+    def test_optional_modules_are_not_imported_with_the_tool(self):
+        """Test that importing capture_tool leaves dialogs and optional dependencies unloaded"""
+        import subprocess
+        code = ("import sys, capture_tool; "
+                "print(' '.join(m for m in ('pyautogui', 'pyperclip', 'settings', 'ui_elements', 'magnifier', "
+                "'clipboard', 'capture_index', 'capture_store', 'sqlite3') if m in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertEqual(result.stdout.split(), [])
+    
+    def test_profile_times_phases_and_imports(self):
+        """Test that phases are only recorded while profiling is enabled"""
+        import startup_profile
+        
+        with startup_profile.phase("ignored"):
+            pass
+        profile = startup_profile.StartupProfile()
+        profile.install()
+        try:
+            startup_profile._profile = profile
+            with startup_profile.phase("load settings"):
+                sys.modules.pop('colorsys', None)
+                import colorsys  # noqa: F401
+        finally:
+            startup_profile._profile = None
+            profile.uninstall()
+        
+        self.assertEqual([name for name, _ in profile.phases], ["load settings"])
+        self.assertIn("colorsys", [name for name, _, _ in profile.imports])
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -0,0 +1,187 @@
+"""
+Monitor topology service.
+
+Keeps the current monitor layout (geometry plus an ID for each monitor),
+caches it on disk across launches, and detects hotplug and resolution
+changes by re-querying the monitor list, which is a single RandR
+round-trip. Listeners, such as the overlay windows and their background
+buffers, are notified only when the layout actually changed.
+
+With use_cache, a launch starts from the cached layout without querying
+the display at all; start_check() queries it on a background thread and
+verify() then applies the answer, notifying listeners if it differs.
+invalidate() does the same for a layout that may have gone stale, e.g.
+while a resident overlay was hidden.
+
+Nothing in here imports tkinter.
+"""
+
+import json
+import os
+import threading
+
+GEOMETRY_KEYS = ('left', 'top', 'width', 'height')
+
+
+def default_cache_path():
+    """Per-user cache location, preferring XDG_CACHE_HOME"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "screenshot-tool", "topology.json")
+
+
+def monitor_id(monitor, index):
+    """ID for a monitor: its RandR output or unique id when mss reports one, else its geometry"""
+    for key in ('unique_id', 'output', 'name'):
+        if monitor.get(key):
+            return str(monitor[key])
+    return f"monitor{index}:{monitor['width']}x{monitor['height']}+{monitor['left']}+{monitor['top']}"
+
+
+def layout_signature(monitors):
+    """Hashable summary of a monitor list; equal signatures mean an unchanged layout"""
+    return tuple(tuple(monitor[key] for key in GEOMETRY_KEYS) for monitor in monitors)
+
+
+def monitor_at(monitors, x, y):
+    """The physical monitor containing screen point x, y, else the nearest one"""
+    physical = monitors[1:] or monitors
+
+    def distance(monitor):
+        dx = max(monitor['left'] - x, 0, x - (monitor['left'] + monitor['width'] - 1))
+        dy = max(monitor['top'] - y, 0, y - (monitor['top'] + monitor['height'] - 1))
+        return dx * dx + dy * dy
+
+    return min(physical, key=distance)
+
+
+def clamp_to_monitor(x, y, width, height, monitor):
+    """Move a width x height window at x, y so that it lies on monitor"""
+    x = max(monitor['left'], min(x, monitor['left'] + monitor['width'] - width))
+    y = max(monitor['top'], min(y, monitor['top'] + monitor['height'] - height))
+    return x, y
+
+
+class MonitorTopology:
+    """Current monitor layout with change detection and an on-disk cache"""
+
+    def __init__(self, session, cache_path=None, use_cache=False):
+        self.session = session
+        self.cache_path = default_cache_path() if cache_path is None else cache_path
+        self.monitors = []
+        self.ids = []
+        self.generation = 0
+        self.listeners = []
+        self.cached = previous_run = self.load_cache()
+        # Background query started by start_check(): (thread, [monitors or exception])
+        self.check = None
+        # False while the layout is the cached one, not yet compared with the display
+        self.verified = not (use_cache and previous_run is not None)
+        if self.verified:
+            self.refresh(requery=False)
+        else:
+            self._apply([dict(monitor) for monitor in previous_run['monitors']])
+        # True if the layout differs from the one a previous launch cached
+        self.changed_since_last_run = (
+            previous_run is not None and layout_signature(previous_run['monitors']) != self.signature
+        )
+
+    @property
+    def signature(self):
+        return layout_signature(self.monitors)
+
+    def add_listener(self, callback):
+        """Call callback(topology) whenever the layout changes"""
+        self.listeners.append(callback)
+
+    def refresh(self, requery=True, monitors=None):
+        """Check the monitor layout; returns True and notifies listeners if it changed.
+
+        monitors is a list the caller already queried, e.g. on another thread.
+        """
+        if monitors is None:
+            monitors = self.session.refresh_monitors() if requery else self.session.monitors
+        self.verified = True
+        monitors = [dict({key: monitor[key] for key in GEOMETRY_KEYS}, id=monitor_id(monitor, index))
+                    for index, monitor in enumerate(monitors)]
+        if self.monitors and layout_signature(monitors) == self.signature:
+            return False
+        first = not self.monitors
+        self._apply(monitors)
+        if not self.cached or layout_signature(self.cached['monitors']) != self.signature:
+            self.save_cache()
+        if not first:
+            for callback in self.listeners:
+                callback(self)
+        return True
+
+    def _apply(self, monitors):
+        self.monitors = monitors
+        self.ids = [monitor['id'] for monitor in monitors]
+        self.generation += 1
+
+    def invalidate(self):
+        """Treat the layout as unconfirmed and start re-querying it in the background"""
+        self.verified = False
+        self.start_check()
+
+    def start_check(self):
+        """Query the display's layout on a background thread, for verify()"""
+        if self.verified or self.check is not None:
+            return
+        result = []
+
+        def query():
+            try:
+                # A new backend instance on this thread, so the query is fresh
+                result.append([dict(monitor) for monitor in self.session.monitors])
+            except Exception as e:
+                result.append(e)
+            finally:
+                self.session.release_thread()
+
+        thread = threading.Thread(target=query, name="topology-check", daemon=True)
+        thread.start()
+        self.check = (thread, result)
+
+    def verify(self):
+        """Compare a cached layout with the display's; returns True (and notifies) if it changed"""
+        if self.verified:
+            return False
+        self.start_check()
+        thread, result = self.check
+        thread.join()
+        self.check = None
+        if isinstance(result[0], Exception):
+            # Query again on this thread, where a failure is the caller's to handle
+            changed = self.refresh()
+        else:
+            changed = self.refresh(monitors=result[0])
+        self.changed_since_last_run = changed
+        return changed
+
+    def load_cache(self):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                cached = json.load(f)
+            layout_signature(cached['monitors'])
+            return cached
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def save_cache(self):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            tmp_path = self.cache_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({'monitors': self.monitors}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+            self.cached = {'monitors': self.monitors}
+        except OSError as e:
+            print(f"⚠️  Failed to cache monitor layout: {e}")
+
+    def monitor_at(self, x, y):
+        return monitor_at(self.monitors, x, y)
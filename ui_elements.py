@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
-from PIL import Image, ImageTk
+from PIL import ImageTk
+import frame
 
 class AnnotationToolbar(tk.Toplevel):
     def __init__(self, parent, on_capture, on_cancel, on_undo, on_redo, current_tool_var):
@@ -63,11 +64,10 @@ class PreviewWindow:
         
         # Resize image for preview (maintain aspect ratio)
         display_size = (600, 400)
-        img_copy = self.img.copy()
-        img_copy.thumbnail(display_size, Image.Resampling.LANCZOS)
+        preview_img = frame.make_thumbnail(self.img, display_size)
         
         # Convert to PhotoImage for display
-        photo = ImageTk.PhotoImage(img_copy)
+        photo = ImageTk.PhotoImage(preview_img)
         
         # Create image label
         img_label = tk.Label(preview_frame, image=photo, bg='#2c2c2c')
@@ -79,6 +79,10 @@ class PreviewWindow:
         info_label = tk.Label(preview_frame, text=info_text, bg='#2c2c2c', fg='white', font=("Arial", 10))
         info_label.pack(pady=5)
         
+        # Progress of background saves
+        self.status_label = tk.Label(preview_frame, text="", bg='#2c2c2c', fg='#aaaaaa', font=("Arial", 9))
+        self.status_label.pack()
+        
         # Create button frame
         button_frame = tk.Frame(preview_frame, bg='#2c2c2c')
         button_frame.pack(pady=20)
@@ -115,6 +119,10 @@ class PreviewWindow:
         # Bind escape key to close
         self.window.bind("<Escape>", lambda e: self.on_close())
 
+    def set_status(self, text):
+        if self.window:
+            self.status_label.config(text=text)
+
     def destroy(self):
         if self.window:
             self.window.destroy()
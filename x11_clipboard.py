@@ -0,0 +1,299 @@
+"""
+X11 CLIPBOARD owner that encodes lazily.
+
+Copying through Tk or pyperclip encodes PNG up front and offers the bytes
+as text. X11ClipboardOwner instead takes ownership of the CLIPBOARD
+selection and advertises image/png, image/bmp and image/jpeg. A target is
+encoded only when a client actually pastes it, and each encoding is kept
+for as long as the image stays on the clipboard. Payloads larger than the
+server's request size are sent with the ICCCM INCR protocol, so large
+screenshots paste correctly.
+
+All X traffic runs on one server thread with its own display connection;
+offer(), clear() and close() hand commands to it. An X selection lives
+only as long as its owner, so persist() moves the image into a small
+background process ("python x11_clipboard.py --serve-stdin") that keeps
+serving pastes after the tool exits, until another client takes the
+clipboard. The daemon simply keeps owning it.
+
+Needs python-xlib (installed with pyautogui). Nothing in here imports tkinter.
+"""
+
+import concurrent.futures
+import json
+import os
+import queue
+import select
+import subprocess
+import sys
+import threading
+
+from PIL import Image
+
+import capture
+
+# Clipboard targets served and the format each is encoded in
+IMAGE_TARGETS = {'image/png': 'PNG', 'image/bmp': 'BMP', 'image/jpeg': 'JPEG'}
+
+# Upper bound for one property write; larger payloads use INCR
+MAX_CHUNK = 256 * 1024
+
+
+def available():
+    """True if an X display and python-xlib are available"""
+    if not sys.platform.startswith('linux') or not os.environ.get('DISPLAY'):
+        return False
+    try:
+        import Xlib.display  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class X11ClipboardOwner:
+    """Owns an X selection on a background thread and serves images from it"""
+
+    def __init__(self, display_name=None, selection='CLIPBOARD'):
+        from Xlib import X, display
+        self.X = X
+        self.display = display.Display(display_name)
+        self.window = self.display.screen().root.create_window(
+            0, 0, 1, 1, 0, X.CopyFromParent, event_mask=X.PropertyChangeMask
+        )
+        self.atoms = {name: self.display.intern_atom(name) for name in (
+            selection, 'TARGETS', 'TIMESTAMP', 'INCR', 'ATOM', 'INTEGER', 'SCREENSHOT_TOOL_TIME', *IMAGE_TARGETS
+        )}
+        self.selection = self.atoms[selection]
+        self.target_formats = {self.atoms[name]: fmt for name, fmt in IMAGE_TARGETS.items()}
+        max_request = self.display.display.info.max_request_length * 4
+        self.max_chunk = min(MAX_CHUNK, max_request - 1024)
+
+        self.image = None
+        self.encode = None
+        self.on_release = None
+        self.encoded = {}
+        self.owner_time = None
+        # (requestor id, property) -> [requestor, target, data, offset] of INCR transfers in progress
+        self.transfers = {}
+        self.lost = threading.Event()
+        self.lost.set()
+
+        self.commands = queue.Queue()
+        self.wake_r, self.wake_w = os.pipe()
+        self.running = True
+        self.thread = threading.Thread(target=self._serve, name="x11-clipboard", daemon=True)
+        self.thread.start()
+
+    # Public API, safe to call from any thread
+
+    def offer(self, img, encode=capture.encode_image, on_release=None, timeout=5):
+        """Put img on the clipboard; encode(img, format) runs only when a target is pasted.
+
+        on_release(img) runs on the server thread once img leaves the clipboard.
+        """
+        return self._call('offer', img, encode, on_release).result(timeout)
+
+    def clear(self):
+        """Give up the clipboard if we own it"""
+        return self._call('clear').result(5)
+
+    @property
+    def owns(self):
+        return not self.lost.is_set()
+
+    def wait_until_lost(self, timeout=None):
+        """Block until another client takes the clipboard; returns False on timeout"""
+        return self.lost.wait(timeout)
+
+    def persist(self):
+        """Keep serving the current image from a background process; returns it or None"""
+        img = self.image
+        if img is None or not self.owns:
+            return None
+        img = img if img.mode in ('RGB', 'RGBA', 'L') else img.convert('RGB')
+        child = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), '--serve-stdin'],
+            stdin=subprocess.PIPE, start_new_session=True
+        )
+        header = json.dumps({'mode': img.mode, 'size': list(img.size)}).encode('utf-8')
+        # Raw pixels: the child encodes only what is pasted, like we would
+        child.stdin.write(header + b"\n")
+        child.stdin.write(img.tobytes())
+        child.stdin.close()
+        # The child's ownership shows up here as a SelectionClear
+        self.wait_until_lost(2)
+        return child
+
+    def close(self):
+        if not self.running:
+            return
+        self._call('close')
+        self.thread.join(5)
+
+    # Server thread
+
+    def _call(self, *command):
+        if not self.running:
+            raise RuntimeError("X11 clipboard is closed")
+        future = concurrent.futures.Future()
+        self.commands.put((future, command))
+        os.write(self.wake_w, b"x")
+        return future
+
+    def _serve(self):
+        fd = self.display.fileno()
+        try:
+            while self.running:
+                while self.display.pending_events():
+                    self._handle(self.display.next_event())
+                self.display.flush()
+                readable, _, _ = select.select([fd, self.wake_r], [], [])
+                if self.wake_r in readable:
+                    os.read(self.wake_r, 64)
+                    self._run_commands()
+        except Exception as e:
+            print(f"⚠️  X11 clipboard stopped: {e}")
+        finally:
+            self.running = False
+            self.lost.set()
+            self._run_commands()
+            self.display.close()
+            os.close(self.wake_r)
+            os.close(self.wake_w)
+
+    def _run_commands(self):
+        while True:
+            try:
+                future, (name, *args) = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if not self.running and name != 'close':
+                    raise RuntimeError("X11 clipboard is closed")
+                future.set_result(getattr(self, f"_do_{name}")(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _do_offer(self, img, encode, on_release):
+        self._forget()
+        self.image, self.encode, self.on_release = img, encode, on_release
+        self.owner_time = self._server_time()
+        self.window.set_selection_owner(self.selection, self.owner_time)
+        owned = self.display.get_selection_owner(self.selection) == self.window
+        if owned:
+            self.lost.clear()
+        return owned
+
+    def _do_clear(self):
+        if self.owns:
+            self.window.set_selection_owner(self.X.NONE, self.owner_time)
+        self._forget()
+
+    def _do_close(self):
+        self._do_clear()
+        self.running = False
+
+    def _forget(self):
+        img, on_release = self.image, self.on_release
+        self.image = self.encode = self.on_release = None
+        self.encoded = {}
+        self.transfers = {}
+        self.lost.set()
+        if img is not None and on_release is not None:
+            try:
+                on_release(img)
+            except Exception as e:
+                print(f"⚠️  Clipboard release callback failed: {e}")
+
+    def _server_time(self):
+        """Current server time, from the PropertyNotify of an empty append (ICCCM forbids CurrentTime)"""
+        atom = self.atoms['SCREENSHOT_TOOL_TIME']
+        self.window.change_property(atom, self.atoms['INTEGER'], 32, [], self.X.PropModeAppend)
+        while True:
+            ev = self.display.next_event()
+            if ev.type == self.X.PropertyNotify and ev.window == self.window and ev.atom == atom:
+                return ev.time
+            self._handle(ev)
+
+    def _handle(self, ev):
+        X = self.X
+        if ev.type == X.SelectionRequest:
+            self._on_selection_request(ev)
+        elif ev.type == X.SelectionClear and ev.selection == self.selection:
+            self._forget()
+        elif ev.type == X.PropertyNotify and ev.state == X.PropertyDelete:
+            self._continue_transfer(ev)
+
+    def _encoded(self, image_format):
+        if image_format not in self.encoded:
+            self.encoded[image_format] = self.encode(self.image, image_format)
+        return self.encoded[image_format]
+
+    def _on_selection_request(self, ev):
+        """Answer one paste request, encoding the requested target on first use"""
+        from Xlib.protocol import event
+        X, atoms = self.X, self.atoms
+        # Obsolete clients pass no property and expect the target's name
+        prop = ev.property or ev.target
+        requestor = ev.requestor
+        ok = self.image is not None and ev.selection == self.selection
+        if ok and ev.target == atoms['TARGETS']:
+            targets = [atoms['TARGETS'], atoms['TIMESTAMP'], *self.target_formats]
+            requestor.change_property(prop, atoms['ATOM'], 32, targets)
+        elif ok and ev.target == atoms['TIMESTAMP']:
+            requestor.change_property(prop, atoms['INTEGER'], 32, [self.owner_time])
+        elif ok and ev.target in self.target_formats:
+            try:
+                data = self._encoded(self.target_formats[ev.target])
+            except Exception as e:
+                print(f"⚠️  Failed to encode clipboard image: {e}")
+                data = None
+            if data is None:
+                ok = False
+            elif len(data) > self.max_chunk:
+                # Too big for one request: announce the size and send chunks as the requestor deletes them
+                requestor.change_attributes(event_mask=X.PropertyChangeMask)
+                requestor.change_property(prop, atoms['INCR'], 32, [len(data)])
+                self.transfers[(requestor.id, prop)] = [requestor, ev.target, data, 0]
+            else:
+                requestor.change_property(prop, ev.target, 8, data)
+        else:
+            ok = False
+        notify = event.SelectionNotify(
+            time=ev.time, requestor=requestor, selection=ev.selection,
+            target=ev.target, property=prop if ok else X.NONE
+        )
+        requestor.send_event(notify, event_mask=0)
+
+    def _continue_transfer(self, ev):
+        transfer = self.transfers.get((ev.window.id, ev.atom))
+        if transfer is None:
+            return
+        requestor, target, data, offset = transfer
+        chunk = data[offset:offset + self.max_chunk]
+        requestor.change_property(ev.atom, target, 8, chunk)
+        if chunk:
+            transfer[3] = offset + len(chunk)
+        else:
+            # The zero-length chunk ends the transfer
+            del self.transfers[(ev.window.id, ev.atom)]
+            requestor.change_attributes(event_mask=0)
+
+
+def serve_stdin(timeout=None):
+    """Background owner started by persist(): read one image from stdin and serve it until replaced"""
+    header = json.loads(sys.stdin.buffer.readline())
+    size = tuple(header['size'])
+    raw = sys.stdin.buffer.read()
+    img = Image.frombytes(header['mode'], size, raw)
+    owner = X11ClipboardOwner()
+    try:
+        if owner.offer(img):
+            owner.wait_until_lost(timeout)
+    finally:
+        owner.close()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ['--serve-stdin']:
+        serve_stdin()